@@ -1,9 +1,19 @@
 """
 SentinelAI X ML Service
 AI/ML Engine for document learning, threat detection, and simulation
+
+Start the service with `python server.py` (or `python app.py`, which runs it).
 """
 
-from flask import Flask, request, jsonify
+if __name__ == '__main__':
+    # Worker processes started with spawn re-run the main module, so the main
+    # module must be server.py, which does nothing at import; alter_sys makes
+    # it __main__ for the life of the process
+    import runpy
+    runpy.run_module('server', run_name='__main__', alter_sys=True)
+    raise SystemExit(0)
+
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from flask_restful import Api, Resource
 import redis
@@ -11,19 +21,27 @@ import psycopg2
 from neo4j import GraphDatabase
 import os
 from dotenv import load_dotenv
+import json
 import logging
+import time
+
+# Process start, used to report startup time on /health
+_STARTED_AT = time.time()
 
 from services.document_processor import DocumentProcessor
 from services.threat_detector import ThreatDetector
 from services.simulation_engine import SimulationEngine
 from services.knowledge_graph import KnowledgeGraphService
 from services.self_learning_engine import SelfLearningEngine
+from services.model_server import ModelServer
 from services.dataset_manager import DatasetManager
 from services.auto_learner import AutoLearner
 from services.attacker_profiler import AttackerProfiler
 from services.target_validator import TargetValidator
 from services.counter_offensive_engine import CounterOffensiveEngine
 from services.continuous_war_loop import ContinuousWarLoop
+from services.model_registry import model_registry
+from services.job_queue import JobQueue
 
 # Load environment variables
 load_dotenv()
@@ -78,13 +96,61 @@ except Exception as e:
     logger.warning(f'Neo4j unavailable ({e}); knowledge graph using in-memory fallback')
 
 # Initialize services
-document_processor = DocumentProcessor()
-threat_detector = ThreatDetector()
+# Also used to build the DocumentProcessor of each ingestion worker process
+document_processor_config = {
+    'keyword_dictionary_path': os.getenv('KEYWORD_DICTIONARY_PATH'),
+    'ner_max_tokens': int(os.getenv('NER_MAX_TOKENS', DocumentProcessor.NER_MAX_TOKENS)),
+    'ner_batch_size': int(os.getenv('NER_BATCH_SIZE', DocumentProcessor.NER_BATCH_SIZE)),
+    # 'pytorch' (default) or 'onnx' for int8-quantized ONNX Runtime on CPU
+    'inference_backend': os.getenv('ML_INFERENCE_BACKEND', 'pytorch'),
+    'onnx_cache_dir': os.getenv('ONNX_CACHE_DIR')
+}
+document_processor = DocumentProcessor(**document_processor_config)
+
+# Skip reprocessing identical files: DOCUMENT_CACHE=disk|redis|off. The disk
+# cache keeps at most DOCUMENT_CACHE_MAX_MB (0 = unbounded), oldest entries
+# deleted first; entries expire after DOCUMENT_CACHE_TTL seconds (0 = never)
+_document_cache = os.getenv('DOCUMENT_CACHE', 'disk').lower()
+if _document_cache in ('disk', 'redis'):
+    document_processor.enable_cache(
+        cache_dir=os.getenv('DOCUMENT_CACHE_DIR'),
+        redis_client=redis_client if _document_cache == 'redis' else None,
+        ttl_seconds=int(os.getenv('DOCUMENT_CACHE_TTL', 7 * 24 * 3600)) or None,
+        max_bytes=int(float(os.getenv('DOCUMENT_CACHE_MAX_MB', 1024)) * 1024 * 1024) or None
+    )
 simulation_engine = SimulationEngine()
-knowledge_graph = KnowledgeGraphService(neo4j_driver)
-self_learning_engine = SelfLearningEngine()
-dataset_manager = DatasetManager()
-auto_learner = AutoLearner(neo4j_driver=neo4j_driver)
+# The in-memory fallback keeps at most KNOWLEDGE_MEMORY_CONTEXT_MB of context text
+knowledge_graph = KnowledgeGraphService(
+    neo4j_driver,
+    memory_context_bytes=int(float(os.getenv('KNOWLEDGE_MEMORY_CONTEXT_MB', 64)) * 1024 * 1024) or None
+)
+# Large CSV datasets are streamed in chunks; DATASET_MAX_ROWS caps the rows
+# trained on (stratified sample, 0 = all rows). Trained model sets are
+# versioned under models/store; the latest one is loaded at startup and
+# ML_MODEL_RELOAD_SECONDS > 0 polls for sets trained by other processes
+self_learning_engine = SelfLearningEngine(
+    dataset_chunksize=int(os.getenv('DATASET_CHUNK_SIZE', 100000)),
+    dataset_max_rows=int(os.getenv('DATASET_MAX_ROWS', 1000000)) or None,
+    keep_model_versions=int(os.getenv('ML_KEEP_MODEL_VERSIONS', 5))
+)
+# Threat types come from the learned classifiers once trained (rules until
+# then); ML_SERVE_LEARNED_MODELS=0 keeps the rule classifiers only
+model_server = ModelServer(self_learning_engine)
+threat_detector = ThreatDetector(
+    rules_path=os.getenv('THREAT_RULES_PATH'),
+    model_server=model_server if os.getenv('ML_SERVE_LEARNED_MODELS', '1') != '0' else None
+)
+dataset_manager = DatasetManager(download_segments=int(os.getenv('DATASET_DOWNLOAD_SEGMENTS', 4)))
+auto_learner = AutoLearner(
+    neo4j_driver=neo4j_driver,
+    document_processor=document_processor,
+    processor_config=document_processor_config,
+    # Concurrent downloads, document processing processes (0 = in-process)
+    # and downloaded documents allowed to wait for processing
+    download_workers=int(os.getenv('INGEST_DOWNLOAD_WORKERS', 4)),
+    process_workers=int(os.getenv('INGEST_PROCESS_WORKERS', 2)),
+    queue_size=int(os.getenv('INGEST_QUEUE_SIZE', 8))
+)
 attacker_profiler = AttackerProfiler()
 target_validator = TargetValidator()
 counter_offensive_engine = CounterOffensiveEngine()
@@ -97,6 +163,14 @@ real_time_monitor = RealTimeMonitor(
     counter_offensive_engine=counter_offensive_engine
 )
 
+# Long learning/training requests run as background jobs tracked in Redis
+# (in-memory if Redis is down). With Redis they run in job worker processes
+# (worker.py); otherwise, or with JOB_WORKERS set, the web process runs them.
+job_queue = JobQueue(redis_client, result_ttl_seconds=int(os.getenv('JOB_RESULT_TTL', 24 * 3600)))
+
+STARTUP_SECONDS = time.time() - _STARTED_AT
+logger.info(f'ML Service initialized in {STARTUP_SECONDS:.1f}s')
+
 
 class HealthCheck(Resource):
     """Health check endpoint"""
@@ -104,10 +178,40 @@ class HealthCheck(Resource):
         return {
             'status': 'healthy',
             'service': 'ML Service',
-            'version': '1.0.0'
+            'version': '1.0.0',
+            'startup_seconds': round(STARTUP_SECONDS, 2),
+            'models': {
+                'threat_detector': threat_detector.get_model_info(),
+                'self_learning': self_learning_engine.get_model_info(),
+                'threat_classifier': model_server.get_stats(),
+                'nlp': model_registry.get_stats()
+            },
+            'document_cache': document_processor.cache.get_stats() if document_processor.cache else None,
+            'jobs': job_queue.get_stats()
         }
 
 
+def submit_job(job_type, data):
+    """Queue a request body as a background job and answer 202 with its status URL"""
+    job = job_queue.submit(job_type, {k: v for k, v in data.items() if k != 'async'})
+    return {
+        'success': True,
+        'job': job,
+        'status_url': f"/api/v1/jobs/{job['job_id']}",
+        'result_url': f"/api/v1/jobs/{job['job_id']}/result"
+    }, 202
+
+
+def resource_job(run):
+    """Adapt a resource's run(data, context) -> (body, status) to a job handler"""
+    def handler(params, context):
+        body, status = run(params, context)
+        if status >= 400:
+            raise RuntimeError(body.get('error', f'Request failed with status {status}'))
+        return body
+    return handler
+
+
 class DocumentProcessResource(Resource):
     """Process cybersecurity documents"""
     def post(self):
@@ -116,6 +220,8 @@ class DocumentProcessResource(Resource):
             document_id = data.get('document_id')
             file_path = data.get('file_path')
             file_type = data.get('file_type')
+            streaming = data.get('streaming')  # None = decide by file size
+            use_cache = data.get('use_cache', True)
 
             if not all([document_id, file_path, file_type]):
                 return {'error': 'Missing required fields'}, 400
@@ -128,7 +234,9 @@ class DocumentProcessResource(Resource):
 
             # Process document
             logger.info(f"Processing document {document_id} from {file_path}")
-            result = document_processor.process_document(document_id, file_path, file_type)
+            result = document_processor.process_document(
+                document_id, file_path, file_type, streaming=streaming, use_cache=use_cache
+            )
 
             # Store extracted knowledge in Neo4j
             try:
@@ -185,6 +293,39 @@ class ThreatDetectResource(Resource):
             return {'error': str(e)}, 500
 
 
+class ThreatDetectBatchResource(Resource):
+    """Detect cyber threats for a batch of events"""
+    def post(self):
+        try:
+            data = request.get_json()
+            # Accept either {"events": [...]} or a bare list of events
+            events = data.get('events') if isinstance(data, dict) else data
+            
+            if not isinstance(events, list):
+                return {'error': 'events must be a list'}, 400
+            
+            max_batch = int(os.getenv('THREAT_DETECT_MAX_BATCH', 50000))
+            if len(events) > max_batch:
+                return {'error': f'Batch too large (max {max_batch} events)'}, 413
+            
+            # Detect threats for the whole batch at once
+            inference = {}
+            detections = threat_detector.detect_threats(events, inference=inference)
+
+            return {
+                'success': True,
+                'count': len(detections),
+                'threats_detected': sum(1 for d in detections if d['threat_detected']),
+                'detections': detections,
+                'inference': inference,
+                'message': 'Batch threat detection completed'
+            }, 200
+
+        except Exception as e:
+            logger.error(f"Error detecting threats in batch: {str(e)}")
+            return {'error': str(e)}, 500
+
+
 class SimulationResource(Resource):
     """Run cyber-offensive simulation"""
     def post(self):
@@ -220,11 +361,22 @@ class KnowledgeGraphResource(Resource):
             if not query:
                 return {'error': 'Missing query parameter'}, 400
 
-            results = knowledge_graph.query_knowledge(query)
+            # mode=fulltext (relevance-ranked, default) or substring; labels is comma-separated
+            mode = request.args.get('mode', 'fulltext')
+            if mode not in ('fulltext', 'substring'):
+                return {'error': f'Invalid mode: {mode}'}, 400
+            labels = [l.strip() for l in request.args.get('labels', '').split(',') if l.strip()] or None
+            skip = max(0, request.args.get('skip', 0, type=int))
+            limit = min(max(1, request.args.get('limit', 50, type=int)), 500)
+
+            results = knowledge_graph.query_knowledge(query, mode=mode, labels=labels, skip=skip, limit=limit)
 
             return {
                 'success': True,
-                'results': results
+                'results': results,
+                'mode': mode,
+                'skip': skip,
+                'limit': limit
             }, 200
 
         except Exception as e:
@@ -238,21 +390,34 @@ class KnowledgeGraphStatusResource(Resource):
         return {
             'success': True,
             'neo4j': neo4j_driver is not None,
-            'backend': 'neo4j' if neo4j_driver else 'in-memory'
+            'backend': 'neo4j' if neo4j_driver else 'in-memory',
+            'schema_version': knowledge_graph.schema_version,
+            'memory': knowledge_graph.memory_stats()
         }, 200
 
 
 class SelfLearningResource(Resource):
     """Self-learning from datasets, threats, and documents"""
     def post(self):
+        data = request.get_json() or {}
+        if data.get('async'):
+            return submit_job('learning', data)
+        return self.run(data)
+
+    @staticmethod
+    def run(data, context=None):
         try:
-            data = request.get_json()
             learning_type = data.get('type')  # 'dataset', 'threats', 'documents', 'hybrid'
             
             if learning_type == 'dataset':
                 dataset_path = data.get('dataset_path')
                 dataset_type = data.get('dataset_type', 'auto')
-                result = self_learning_engine.learn_from_dataset(dataset_path, dataset_type)
+                result = self_learning_engine.learn_from_dataset(
+                    dataset_path, dataset_type,
+                    max_rows=data.get('max_rows'),
+                    stratified=data.get('stratified', True),
+                    progress_callback=context.update_progress if context else None
+                )
             
             elif learning_type == 'threats':
                 threats = data.get('threats', [])
@@ -269,7 +434,8 @@ class SelfLearningResource(Resource):
                 result = self_learning_engine.hybrid_learn(
                     datasets=datasets,
                     threats=threats,
-                    documents=documents
+                    documents=documents,
+                    progress_callback=context.update_progress if context else None
                 )
             else:
                 return {'error': 'Invalid learning type'}, 400
@@ -302,15 +468,19 @@ class DatasetManagerResource(Resource):
         }, 200
     
     def post(self):
-        """Download or add a dataset. Actions: download, add, download-url."""
+        """Download, add or compile a dataset. Actions: download, add, download-url, compile."""
         try:
             data = request.get_json() or {}
-            action = data.get('action')  # 'download', 'add', or 'download-url'
+            action = data.get('action')  # 'download', 'add', 'download-url' or 'compile'
             
             if action == 'download':
                 dataset_id = data.get('dataset_id')
                 url = data.get('url')
-                result = dataset_manager.download_dataset(dataset_id, url)
+                result = dataset_manager.download_dataset(
+                    dataset_id, url, sha256=data.get('sha256'),
+                    stream_extract=data.get('stream_extract', False),
+                    delete_archive=data.get('delete_archive', False)
+                )
             
             elif action == 'add':
                 file_path = data.get('file_path')
@@ -323,11 +493,26 @@ class DatasetManagerResource(Resource):
                 dataset_id = data.get('dataset_id')
                 if not url:
                     return {'error': 'Missing url for download-url'}, 400
-                result = dataset_manager.download_from_url_to_project(url, dataset_id)
+                result = dataset_manager.download_from_url_to_project(
+                    url, dataset_id, sha256=data.get('sha256'),
+                    stream_extract=data.get('stream_extract', False),
+                    delete_archive=data.get('delete_archive', False)
+                )
                 if not result.get('success'):
                     return {'error': result.get('error', 'Download failed')}, 400
+            
+            elif action == 'compile':
+                # Parse once into memory-mappable arrays reused by later training runs
+                dataset_id = data.get('dataset_id') or data.get('dataset_path')
+                if not dataset_id:
+                    return {'error': 'Missing dataset_id for compile'}, 400
+                result = dataset_manager.compile_dataset(
+                    dataset_id,
+                    force=data.get('force', False),
+                    chunksize=self_learning_engine.dataset_chunksize
+                )
             else:
-                return {'error': 'Invalid action. Use download, add, or download-url.'}, 400
+                return {'error': 'Invalid action. Use download, add, download-url, or compile.'}, 400
             
             return {
                 'success': True,
@@ -419,6 +604,16 @@ class BatchDriveLearnerResource(Resource):
             
             logger.info(f"Processing {len(drive_links)} Drive link(s)")
             
+            if data.get('async'):
+                return submit_job('drive_links', data)
+            
+            # Stream one NDJSON line per link as it finishes, then a summary line
+            if data.get('stream'):
+                return Response(
+                    stream_with_context(self._stream_results(drive_links, auto_learn)),
+                    mimetype='application/x-ndjson'
+                )
+            
             # Learn from multiple links
             result = auto_learner.learn_from_multiple_links(
                 drive_links,
@@ -438,7 +633,37 @@ class BatchDriveLearnerResource(Resource):
                 'success': False,
                 'error': error_msg
             }, 500
-    
+
+    @staticmethod
+    def run_job(data, context):
+        """Job handler: learn from the links, reporting per-link progress"""
+        drive_links = data.get('drive_links') or data.get('urls', [])
+        results = {
+            'successful': [],
+            'failed': [],
+            'total': len(drive_links),
+            'learned_patterns': 0
+        }
+        for done, result in enumerate(
+                auto_learner.iter_learn_from_links(drive_links, auto_learn=data.get('auto_learn', True)), 1):
+            if result.get('success'):
+                results['successful'].append(result)
+                results['learned_patterns'] += (result.get('learning_result') or {}).get('patterns_learned', 0)
+            else:
+                results['failed'].append({'link': result.get('link'), 'error': result.get('error', 'Unknown error')})
+            context.update_progress(done / len(drive_links), f"{done}/{len(drive_links)} links processed")
+        results['success_count'] = len(results['successful'])
+        results['failure_count'] = len(results['failed'])
+        return results
+
+    @staticmethod
+    def _stream_results(drive_links, auto_learn):
+        summary = {'summary': True, 'total': len(drive_links), 'success_count': 0, 'failure_count': 0}
+        for result in auto_learner.iter_learn_from_links(drive_links, auto_learn=auto_learn):
+            summary['success_count' if result.get('success') else 'failure_count'] += 1
+            yield json.dumps(result, default=str) + '\n'
+        yield json.dumps(summary) + '\n'
+
     def options(self):
         """Handle CORS preflight requests"""
         return {}, 200
@@ -519,9 +744,15 @@ class TrainingResource(Resource):
     """Train ML models"""
     def post(self):
         """Train threat detection or document processing models"""
+        data = request.get_json() or {}
+        if data.get('async'):
+            return submit_job('training', data)
+        return self.run(data)
+
+    @staticmethod
+    def run(data, context=None):
         try:
-            data = request.get_json()
-            model_type = data.get('model_type', 'threat_detector')  # 'threat_detector' or 'document_processor'
+            model_type = data.get('model_type', 'threat_detector')  # 'threat_detector', 'anomaly_detector' or 'document_processor'
             dataset = data.get('dataset')  # Dataset ID or path
             epochs = data.get('epochs', 10)
             batch_size = data.get('batch_size', 32)
@@ -533,9 +764,14 @@ class TrainingResource(Resource):
                     # Download dataset if needed
                     dataset_path = dataset_manager.download_dataset(dataset)
                     if dataset_path.get('success'):
+                        if context:
+                            context.update_progress(0.1, 'Dataset ready')
                         result = self_learning_engine.learn_from_dataset(
                             dataset_path.get('path'),
-                            dataset_type=dataset.lower()
+                            dataset_type=dataset.lower(),
+                            max_rows=data.get('max_rows'),
+                            stratified=data.get('stratified', True),
+                            progress_callback=context.update_progress if context else None
                         )
                         return {
                             'success': True,
@@ -555,6 +791,22 @@ class TrainingResource(Resource):
                         'result': result
                     }, 200
             
+            elif model_type == 'anomaly_detector':
+                # Fit the baseline anomaly model once; detection stays inference-only
+                baseline_path = data.get('baseline_path')
+                baseline_events = data.get('baseline_events')
+                if baseline_path:
+                    model_info = threat_detector.fit_baseline_from_file(baseline_path)
+                elif baseline_events:
+                    model_info = threat_detector.fit_baseline(baseline_events)
+                else:
+                    return {'error': 'Missing baseline_path or baseline_events'}, 400
+                return {
+                    'success': True,
+                    'model_type': model_type,
+                    'model': model_info
+                }, 200
+            
             elif model_type == 'document_processor':
                 # Train document processing model
                 documents = data.get('documents', [])
@@ -573,6 +825,59 @@ class TrainingResource(Resource):
             return {'error': str(e)}, 500
 
 
+class JobSubmitResource(Resource):
+    """Submit a background job"""
+    def post(self):
+        data = request.get_json() or {}
+        job_type = data.get('type')
+        if job_type not in job_queue.handlers:
+            return {'error': f"Invalid job type, expected one of {sorted(job_queue.handlers)}"}, 400
+        return submit_job(job_type, data.get('params') or {})
+
+
+class JobStatusResource(Resource):
+    """Status and progress of a background job"""
+    def get(self, job_id):
+        job = job_queue.get_status(job_id)
+        if job is None:
+            return {'error': 'Job not found'}, 404
+        return {'success': True, 'job': job}, 200
+
+
+class JobProgressResource(Resource):
+    """Progress of a background job"""
+    def get(self, job_id):
+        job = job_queue.get_status(job_id)
+        if job is None:
+            return {'error': 'Job not found'}, 404
+        return {
+            'job_id': job_id,
+            'state': job['state'],
+            'progress': job['progress'],
+            'message': job['message']
+        }, 200
+
+
+class JobCancelResource(Resource):
+    """Cancel a background job"""
+    def post(self, job_id):
+        job = job_queue.cancel(job_id)
+        if job is None:
+            return {'error': 'Job not found'}, 404
+        return {'success': True, 'job': job}, 200
+
+
+class JobResultResource(Resource):
+    """Result of a finished background job"""
+    def get(self, job_id):
+        job = job_queue.get_result(job_id)
+        if job is None:
+            return {'error': 'Job not found'}, 404
+        if job['state'] in ('queued', 'running'):
+            return {'success': False, 'error': 'Job not finished', 'job': job}, 409
+        return {'success': job['state'] == 'succeeded', 'job': job}, 200
+
+
 class WarLoopResource(Resource):
     """Continuous War Loop Management"""
     def get(self):
@@ -623,6 +928,7 @@ class WarLoopResource(Resource):
 api.add_resource(HealthCheck, '/health')
 api.add_resource(DocumentProcessResource, '/api/v1/documents/process')
 api.add_resource(ThreatDetectResource, '/api/v1/threats/detect')
+api.add_resource(ThreatDetectBatchResource, '/api/v1/threats/detect/batch')
 api.add_resource(SimulationResource, '/api/v1/simulations/run')
 api.add_resource(KnowledgeGraphResource, '/api/v1/knowledge/query')
 api.add_resource(KnowledgeGraphStatusResource, '/api/v1/knowledge/status')
@@ -634,6 +940,46 @@ api.add_resource(LearningSummaryResource, '/api/v1/learning/summary')
 api.add_resource(CounterOffensiveResource, '/api/v1/counter-offensive/execute')
 api.add_resource(WarLoopResource, '/api/v1/war-loop')
 api.add_resource(TrainingResource, '/api/v1/training/train')
+api.add_resource(JobSubmitResource, '/api/v1/jobs')
+api.add_resource(JobStatusResource, '/api/v1/jobs/<string:job_id>')
+api.add_resource(JobProgressResource, '/api/v1/jobs/<string:job_id>/progress')
+api.add_resource(JobCancelResource, '/api/v1/jobs/<string:job_id>/cancel')
+api.add_resource(JobResultResource, '/api/v1/jobs/<string:job_id>/result')
+
+# Job handlers; requests with "async": true return 202 and run on the job workers
+job_queue.register('training', resource_job(TrainingResource.run))
+job_queue.register('learning', resource_job(SelfLearningResource.run))
+job_queue.register('drive_links', BatchDriveLearnerResource.run_job)
+
+
+def start_background_services():
+    """
+    Start the service's background threads
+
+    Called by the server entrypoint only, never at import: importing this
+    module (tests, tools) must not start consuming jobs or loading models.
+    """
+    # Poll for model sets trained by other processes
+    model_reload_seconds = float(os.getenv('ML_MODEL_RELOAD_SECONDS', 0))
+    if model_reload_seconds > 0:
+        self_learning_engine.start_model_watcher(model_reload_seconds)
+
+    # NLP models load on first use; optionally warm them up in the background
+    # (ML_WARMUP_MODELS=all or a comma-separated list, e.g. "ner") and evict
+    # models idle for longer than ML_MODEL_IDLE_TTL seconds (0 disables eviction)
+    warmup_models = os.getenv('ML_WARMUP_MODELS', '').strip()
+    if warmup_models:
+        model_registry.warm_up(
+            None if warmup_models.lower() in ('all', 'true', '1')
+            else [name.strip() for name in warmup_models.split(',') if name.strip()]
+        )
+    model_idle_ttl = float(os.getenv('ML_MODEL_IDLE_TTL', 0))
+    if model_idle_ttl > 0:
+        model_registry.start_idle_reaper(model_idle_ttl, interval_seconds=min(60.0, model_idle_ttl))
+
+    # Jobs in Redis are left to worker.py processes unless JOB_WORKERS asks for
+    # some here too; jobs in the in-memory store can only run in this process
+    job_queue.start_workers(int(os.getenv('JOB_WORKERS', 0 if job_queue.backend == 'redis' else 2)))
 
 
 # Real-Time Monitoring Resources
@@ -693,6 +1039,7 @@ def index():
             'health': '/health',
             'process_document': '/api/v1/documents/process',
             'detect_threat': '/api/v1/threats/detect',
+            'detect_threats_batch': '/api/v1/threats/detect/batch',
             'run_simulation': '/api/v1/simulations/run',
             'query_knowledge': '/api/v1/knowledge/query',
             'knowledge_status': '/api/v1/knowledge/status',
@@ -704,13 +1051,13 @@ def index():
             'counter_offensive': '/api/v1/counter-offensive/execute',
             'war_loop': '/api/v1/war-loop',
             'training': '/api/v1/training/train',
+            'jobs': '/api/v1/jobs',
+            'job_status': '/api/v1/jobs/<job_id>',
+            'job_progress': '/api/v1/jobs/<job_id>/progress',
+            'job_cancel': '/api/v1/jobs/<job_id>/cancel',
+            'job_result': '/api/v1/jobs/<job_id>/result',
             'monitor_start': '/api/v1/monitor/start',
             'monitor_stop': '/api/v1/monitor/stop',
             'monitor_status': '/api/v1/monitor/status'
         }
     })
-
-
-if __name__ == '__main__':
-    port = int(os.getenv('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=os.getenv('DEBUG', 'False') == 'True')
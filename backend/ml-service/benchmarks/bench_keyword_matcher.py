@@ -0,0 +1,46 @@
+"""
+Microbenchmark: KeywordMatcher vs nested `keyword in sentence` loops
+
+Run from backend/ml-service:
+    python -m benchmarks.bench_keyword_matcher [n_keywords]
+"""
+
+import random
+import string
+import sys
+import time
+
+from services.keyword_matcher import KeywordMatcher
+
+
+def make_keywords(n: int, rng: random.Random):
+    return [" ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9)))
+                     for _ in range(rng.randint(1, 3)))
+            for _ in range(n)]
+
+
+def main(n_keywords: int = 5000, n_sentences: int = 2000):
+    rng = random.Random(3)
+    keywords = make_keywords(n_keywords, rng)
+    words = [k.split()[0] for k in keywords[:200]] + ["the", "attack", "network", "host", "payload"]
+    sentences = [" ".join(rng.choices(words, k=25)) + "." for _ in range(n_sentences)]
+
+    start = time.perf_counter()
+    matcher = KeywordMatcher({'attack_techniques': keywords})
+    compile_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    naive_hits = sum(1 for s in sentences for k in keywords if k in s.lower())
+    naive_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matcher_hits = sum(len(matcher.match(s)[0].get('attack_techniques', ())) for s in sentences)
+    matcher_seconds = time.perf_counter() - start
+
+    print(f"keywords: {n_keywords}, sentences: {n_sentences}, compile: {compile_seconds * 1e3:.1f} ms")
+    print(f"nested loops  {naive_seconds * 1e6 / n_sentences:10.1f} us/sentence ({naive_hits} hits)")
+    print(f"matcher       {matcher_seconds * 1e6 / n_sentences:10.1f} us/sentence ({matcher_hits} hits)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,70 @@
+"""
+Benchmark: document NER throughput on PyTorch vs quantized ONNX Runtime
+
+Needs the Hugging Face models (network or local cache) and, for the ONNX
+backend, optimum[onnxruntime]. Run from backend/ml-service:
+    python -m benchmarks.bench_nlp_backends [file ...]
+
+Without files, synthetic threat-report paragraphs are used.
+"""
+
+import random
+import sys
+import time
+
+from services.document_processor import DocumentProcessor
+from services.inference_backend import check_parity, load_pipeline, onnx_available
+from services.model_registry import model_registry
+
+SAMPLE_SENTENCES = [
+    "APT29 used spear phishing emails to deliver a backdoor to Microsoft Exchange servers.",
+    "The Lazarus Group deployed ransomware across hospitals in Germany and France.",
+    "Researchers at Mandiant linked the campaign to infrastructure hosted in Amsterdam.",
+    "CVE-2021-44228 in Apache Log4j was exploited to install a cryptominer on Linux hosts.",
+    "The malware communicated with a command server operated from Moscow over HTTPS.",
+    "CISA and the FBI advised patching Fortinet VPN appliances and enabling multi-factor authentication.",
+]
+
+
+def synthetic_documents(n_documents: int, sentences_per_document: int = 40):
+    rng = random.Random(7)
+    return [" ".join(rng.choices(SAMPLE_SENTENCES, k=sentences_per_document)) for _ in range(n_documents)]
+
+
+def run(backend: str, processor: DocumentProcessor, documents):
+    """Register the backend's NER model, then time entity extraction over the documents"""
+    ner = load_pipeline("ner", DocumentProcessor.NER_MODEL, backend=backend, aggregation_strategy="simple")
+    model_registry.register(DocumentProcessor.NER_MODEL_NAME, lambda: ner, replace=True)
+
+    processor._extract_entities(documents[0])  # warm-up
+    start = time.perf_counter()
+    n_entities = sum(len(processor._extract_entities(doc)) for doc in documents)
+    seconds = time.perf_counter() - start
+    print(f"{backend:8s} {len(documents) / seconds:8.2f} docs/s  ({n_entities} entities, {seconds:.1f}s)")
+    return ner
+
+
+def main(paths=None, n_documents: int = 20):
+    if paths:
+        documents = []
+        for path in paths:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                documents.append(f.read())
+    else:
+        documents = synthetic_documents(n_documents)
+
+    processor = DocumentProcessor()
+    reference = run('pytorch', processor, documents)
+
+    if not onnx_available():
+        print("onnx     skipped (pip install 'optimum[onnxruntime]')")
+        return
+    candidate = run('onnx', processor, documents)
+
+    parity = check_parity('ner', reference, candidate, SAMPLE_SENTENCES + documents[:5])
+    print(f"parity   F1 {parity['f1']:.3f}, precision {parity['precision']:.3f}, "
+          f"recall {parity['recall']:.3f}, max score diff {parity['max_score_diff']:.3f}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
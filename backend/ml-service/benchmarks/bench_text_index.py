@@ -0,0 +1,51 @@
+"""
+Benchmark: in-memory knowledge graph search, TextIndex vs a linear scan
+
+Run from backend/ml-service:
+    python -m benchmarks.bench_text_index [n_entries]
+"""
+
+import random
+import string
+import sys
+import time
+
+from services.text_index import TextIndex
+
+QUERIES = ('phishing', 'injection', 'ransom', 'eral mov', 'zzzz')
+
+
+def make_entries(n: int, rng: random.Random):
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))) for _ in range(5000)]
+    words += ['phishing', 'sql', 'injection', 'ransomware', 'lateral', 'movement']
+    return [(" ".join(rng.choices(words, k=2)), " ".join(rng.choices(words, k=25))) for _ in range(n)]
+
+
+def main(n_entries: int = 200000, limit: int = 50):
+    rng = random.Random(3)
+    entries = make_entries(n_entries, rng)
+
+    start = time.perf_counter()
+    index = TextIndex()
+    for name, description in entries:
+        index.add(name, description)
+    build_seconds = time.perf_counter() - start
+    stats = index.get_stats()
+    print(f"entries: {n_entries}, build: {build_seconds:.1f} s, "
+          f"postings: {stats['postings_bytes'] / 1e6:.0f} MB")
+
+    for query in QUERIES:
+        start = time.perf_counter()
+        scan = [i for i, (n, d) in enumerate(entries) if query in n.lower() or query in d.lower()][:limit]
+        scan_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        hits = index.search(query, limit=limit)
+        index_ms = (time.perf_counter() - start) * 1000
+        assert hits == scan
+
+        print(f"{query!r:14} scan {scan_ms:9.2f} ms   index {index_ms:7.3f} ms   ({len(hits)} hits)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,63 @@
+"""
+Benchmark: threat classification latency of the rules vs the learned classifier
+
+Compares per-request latency (p50/p95) for several batch sizes of the rule
+classifiers, the served (compiled) random forest and the same forest called
+through scikit-learn's predict_proba.
+
+Run from backend/ml-service:
+    python -m benchmarks.bench_threat_classifier [n_requests]
+"""
+
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from services.model_server import ModelServer
+from services.self_learning_engine import SelfLearningEngine
+from services.threat_detector import ThreatDetector
+
+CLASSES = ('malware', 'ransomware', 'phishing', 'trojan')
+
+
+def make_batch(rng: np.random.Generator, n: int, n_features: int):
+    y = rng.choice(CLASSES, size=n)
+    X = rng.normal(size=(n, n_features))
+    X[:, 0] += np.searchsorted(CLASSES, y) * 2.0  # learnable signal
+    return X, np.asarray(y, dtype=object)
+
+
+def percentiles(fn, n_requests: int):
+    times = []
+    for _ in range(n_requests):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return np.percentile(times, 50), np.percentile(times, 95)
+
+
+def main(n_requests: int = 200):
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as model_dir:
+        engine = SelfLearningEngine(model_dir=model_dir)
+        n_features = engine.threat_schema.n_features
+        for _ in range(5):
+            engine._update_online_models(*make_batch(rng, 1000, n_features))
+        server = ModelServer(engine)
+        forest = engine.online_models['random_forest']
+        rules = ThreatDetector(model_dir=model_dir).rule_engine
+
+        print(f"online forest: {len(forest.estimators_)} trees")
+        print(f"{'batch':>6} {'rules p50/p95 (ms)':>20} {'served p50/p95 (ms)':>20} {'sklearn p50/p95 (ms)':>21}")
+        for batch_size in (1, 10, 100, 1000):
+            X, _ = make_batch(rng, batch_size, n_features)
+            r = percentiles(lambda: rules.evaluate(X), n_requests)
+            s = percentiles(lambda: server.predict_proba(X), n_requests)
+            k = percentiles(lambda: forest.predict_proba(X), n_requests)
+            print(f"{batch_size:6d} {r[0]:9.3f}/{r[1]:<9.3f} {s[0]:9.3f}/{s[1]:<9.3f} {k[0]:10.3f}/{k[1]:<9.3f}")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,26 @@
+"""
+ML Service entrypoint
+
+    python server.py
+
+Worker processes started with the spawn method (document processing,
+parallel model training) re-run the parent's main module. This module
+does nothing at import, so they do not repeat the service startup: app,
+which connects to Redis and Neo4j and builds every service, is imported
+only in main().
+"""
+
+import os
+
+
+def main():
+    from app import app, start_background_services
+
+    start_background_services()
+    port = int(os.getenv('PORT', 5000))
+    # The reloader would start a second copy of the service and its workers
+    app.run(host='0.0.0.0', port=port, debug=os.getenv('DEBUG', 'False') == 'True', use_reloader=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Archive Extractor
+Selective, streaming extraction of dataset archives (tar, tar.gz, zip)
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import tarfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Any, BinaryIO, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+ZIP_SUFFIXES = ('.zip',)
+
+
+def archive_type(filename: str) -> Optional[str]:
+    """'tar', 'zip' or None, from the file name"""
+    name = filename.lower()
+    if name.endswith(TAR_SUFFIXES):
+        return 'tar'
+    if name.endswith(ZIP_SUFFIXES):
+        return 'zip'
+    return None
+
+
+class HashingReader:
+    """File-like wrapper that hashes and counts the bytes read through it"""
+
+    def __init__(self, raw: BinaryIO):
+        self.raw = raw
+        self.sha256 = hashlib.sha256()
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.raw.read(size)
+        self.sha256.update(data)
+        self.bytes_read += len(data)
+        return data
+
+    def drain(self, chunk_size: int = 1024 * 1024):
+        """Read (and hash) whatever is left, e.g. the padding after the last tar member"""
+        while self.read(chunk_size):
+            pass
+
+    def hexdigest(self) -> str:
+        return self.sha256.hexdigest()
+
+
+class ArchiveExtractor:
+    """Extract only the wanted members of an archive, one member at a time
+
+    Members are copied in fixed-size blocks, so memory stays flat whatever the
+    member size. tar archives can be read from a non-seekable stream (e.g. an
+    HTTP response) and extracted while they download, without storing the
+    archive. zip keeps its directory at the end of the file, so it is read
+    from disk, member by member. Member paths that would land outside the
+    destination directory, and links or devices, are skipped.
+    """
+
+    def __init__(self, extensions: Optional[Tuple[str, ...]] = ('.csv', '.json'),
+                 block_size: int = 1024 * 1024):
+        """
+        Args:
+            extensions: Extract only members with these suffixes (None = all files)
+            block_size: Bytes copied per read
+        """
+        self.extensions = tuple(e.lower() for e in extensions) if extensions else None
+        self.block_size = block_size
+
+    def extract_tar_stream(self, fileobj: BinaryIO, dest_path: Path, mode: str = 'r|*') -> Dict[str, Any]:
+        """
+        Extract a tar archive read sequentially from a stream
+
+        Args:
+            fileobj: Readable binary stream (need not be seekable)
+            dest_path: Destination directory
+            mode: tarfile stream mode (compression detected by default)
+
+        Returns:
+            Extraction stats (files, extracted/skipped counts, bytes, seconds)
+        """
+        stats = self._new_stats()
+        with tarfile.open(fileobj=fileobj, mode=mode) as archive:
+            for member in archive:
+                if not member.isfile() or not self._wanted(member.name):
+                    stats['skipped'] += 1
+                    continue
+                target = self._target(dest_path, member.name)
+                if target is None:
+                    stats['skipped'] += 1
+                    continue
+                self._copy(archive.extractfile(member), target, stats)
+        return self._finish(stats)
+
+    def extract_tar(self, tar_path: Path, dest_path: Path) -> Dict[str, Any]:
+        """Extract a tar archive from disk"""
+        with open(tar_path, 'rb') as f:
+            return self.extract_tar_stream(f, dest_path)
+
+    def extract_zip(self, zip_path: Path, dest_path: Path) -> Dict[str, Any]:
+        """Extract a zip archive from disk, one member at a time"""
+        stats = self._new_stats()
+        with zipfile.ZipFile(zip_path, 'r') as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not self._wanted(info.filename):
+                    stats['skipped'] += 1
+                    continue
+                target = self._target(dest_path, info.filename)
+                if target is None:
+                    stats['skipped'] += 1
+                    continue
+                with archive.open(info) as member:
+                    self._copy(member, target, stats)
+        return self._finish(stats)
+
+    def extract(self, archive_path: Path, dest_path: Path) -> Dict[str, Any]:
+        """Extract a tar or zip archive from disk, by file name"""
+        kind = archive_type(archive_path.name)
+        if kind == 'tar':
+            return self.extract_tar(archive_path, dest_path)
+        if kind == 'zip':
+            return self.extract_zip(archive_path, dest_path)
+        raise ValueError(f"Not a supported archive: {archive_path}")
+
+    @staticmethod
+    def remove(files: List[str]):
+        """Delete extracted files (e.g. after a failed checksum)"""
+        for path in files:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def _wanted(self, name: str) -> bool:
+        return self.extensions is None or name.lower().endswith(self.extensions)
+
+    @staticmethod
+    def _target(dest_path: Path, name: str) -> Optional[Path]:
+        """Destination of a member, or None if its path escapes dest_path"""
+        root = dest_path.resolve()
+        target = (root / name).resolve()
+        if os.path.isabs(name) or root not in target.parents:
+            logger.warning(f"Skipping archive member outside the destination: {name}")
+            return None
+        return target
+
+    def _copy(self, source: BinaryIO, target: Path, stats: Dict[str, Any]):
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, 'wb') as out:
+            shutil.copyfileobj(source, out, self.block_size)
+        stats['files'].append(str(target))
+        stats['extracted'] += 1
+        stats['bytes'] += target.stat().st_size
+
+    @staticmethod
+    def _new_stats() -> Dict[str, Any]:
+        return {'files': [], 'extracted': 0, 'skipped': 0, 'bytes': 0, '_start': time.perf_counter()}
+
+    @staticmethod
+    def _finish(stats: Dict[str, Any]) -> Dict[str, Any]:
+        stats['seconds'] = time.perf_counter() - stats.pop('_start')
+        logger.info(f"Extracted {stats['extracted']} files ({stats['bytes']} bytes), "
+                    f"skipped {stats['skipped']} members in {stats['seconds']:.1f}s")
+        return stats
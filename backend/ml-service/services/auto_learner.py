@@ -4,12 +4,14 @@ Automatically downloads documents from Drive links and learns from them
 """
 
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Iterator, Optional
 from pathlib import Path
 import os
 
 from services.drive_downloader import DriveDownloader
+from services.document_cache import file_sha256
 from services.document_processor import DocumentProcessor
+from services.ingestion_pipeline import IngestionPipeline
 from services.self_learning_engine import SelfLearningEngine
 from services.knowledge_graph import KnowledgeGraphService
 
@@ -21,9 +23,25 @@ class AutoLearner:
     
     def __init__(self, 
                  download_dir: str = "downloads",
-                 neo4j_driver=None):
+                 neo4j_driver=None,
+                 document_processor: Optional[DocumentProcessor] = None,
+                 processor_config: Optional[Dict[str, Any]] = None,
+                 download_workers: int = 4,
+                 process_workers: int = 2,
+                 queue_size: int = 8):
         self.drive_downloader = DriveDownloader(download_dir)
-        self.document_processor = DocumentProcessor()
+        # Reuse the caller's processor when given; NLP models are shared either way
+        self.document_processor = document_processor or DocumentProcessor()
+        
+        # Batch links are downloaded and processed concurrently; processor_config
+        # configures the DocumentProcessor of each worker process
+        self.ingestion_pipeline = IngestionPipeline(
+            self.document_processor,
+            processor_config=processor_config,
+            download_workers=download_workers,
+            process_workers=process_workers,
+            queue_size=queue_size
+        )
         self.self_learning_engine = SelfLearningEngine()
         self.knowledge_graph = KnowledgeGraphService(neo4j_driver)
         
@@ -38,95 +56,25 @@ class AutoLearner:
         
         Args:
             drive_link: Google Drive link to document
-            document_id: Optional document ID (auto-generated if not provided)
+            document_id: Optional document ID (derived from the file content if not provided)
             auto_learn: Whether to automatically learn from the document
         
         Returns:
             Learning results
         """
         try:
-            # Generate document ID if not provided
-            if not document_id:
-                import hashlib
-                document_id = f"doc_{hashlib.md5(drive_link.encode()).hexdigest()[:12]}"
-            
-            logger.info(f"Downloading document from Drive: {drive_link}")
+            job = self._download_drive_link(drive_link, document_id)
+            if not job.get('success'):
+                return job
             
-            # Download document
-            download_result = self.drive_downloader.download_from_drive_link(drive_link)
-            
-            if not download_result.get('success'):
-                error_msg = 'Failed to download document'
-                details = download_result
-                
-                # Provide helpful error message for folder links
-                if 'folder' in drive_link.lower() or 'folders' in drive_link.lower():
-                    error_msg = 'Folder links are not supported. Please use individual file links instead.'
-                    details = {
-                        **download_result,
-                        'help': 'To use a folder, please share each file individually and use their file links. File links look like: https://drive.google.com/file/d/FILE_ID/view'
-                    }
-                
-                return {
-                    'success': False,
-                    'error': error_msg,
-                    'details': details
-                }
-            
-            file_path = download_result['file_path']
-            filename = download_result['filename']
-            
-            # Detect file type
-            file_type = self._detect_file_type(filename)
-            
-            logger.info(f"Processing document: {filename} ({file_type})")
+            logger.info(f"Processing document: {job['filename']} ({job['file_type']})")
             
             # Process document
             extracted_data = self.document_processor.process_document(
-                document_id, file_path, file_type
+                job['document_id'], job['file_path'], job['file_type'], content_hash=job['content_hash']
             )
             
-            # Store in knowledge graph (Neo4j or in-memory fallback)
-            self.knowledge_graph.store_document_knowledge(document_id, extracted_data)
-            
-            # Auto-learn from document if enabled
-            learning_result = None
-            if auto_learn:
-                logger.info("Auto-learning from document...")
-                try:
-                    learning_result = self.self_learning_engine.learn_from_documents([extracted_data])
-                    logger.info(f"Learning completed: {learning_result.get('patterns_learned', 0)} patterns learned")
-                except Exception as e:
-                    logger.error(f"Error during learning: {e}")
-                    learning_result = {'error': str(e)}
-            
-            # Track processed document
-            self.processed_documents.append({
-                'document_id': document_id,
-                'drive_link': drive_link,
-                'filename': filename,
-                'file_path': file_path,
-                'extracted_data': extracted_data,
-                'learning_result': learning_result or {}
-            })
-            
-            logger.info(f"Document tracked in learning system: {filename}")
-            
-            return {
-                'success': True,
-                'document_id': document_id,
-                'filename': filename,
-                'file_path': file_path,
-                'extracted_data': {
-                    'attack_techniques': len(extracted_data.get('attack_techniques', [])),
-                    'exploit_patterns': len(extracted_data.get('exploit_patterns', [])),
-                    'defense_strategies': len(extracted_data.get('defense_strategies', [])),
-                    'keywords': len(extracted_data.get('keywords', [])),
-                    'summary': extracted_data.get('summary', '')[:200]
-                },
-                'learning_result': learning_result,
-                'message': 'Document processed and learned successfully'
-            }
+            return self._learn_from_extracted(drive_link, job, extracted_data, auto_learn)
             
         except Exception as e:
             logger.error(f"Error learning from Drive link: {str(e)}")
@@ -135,6 +83,119 @@ class AutoLearner:
                 'error': str(e)
             }
     
+    def _download_drive_link(self, drive_link: str, document_id: Optional[str] = None) -> Dict[str, Any]:
+        """Download a Drive document and describe it for processing (safe to call from worker threads)"""
+        logger.info(f"Downloading document from Drive: {drive_link}")
+        
+        # Download document
+        download_result = self.drive_downloader.download_from_drive_link(drive_link)
+        
+        if not download_result.get('success'):
+            error_msg = 'Failed to download document'
+            details = download_result
+            
+            # Provide helpful error message for folder links
+            if 'folder' in drive_link.lower() or 'folders' in drive_link.lower():
+                error_msg = 'Folder links are not supported. Please use individual file links instead.'
+                details = {
+                    **download_result,
+                    'help': 'To use a folder, please share each file individually and use their file links. File links look like: https://drive.google.com/file/d/FILE_ID/view'
+                }
+            
+            return {
+                'success': False,
+                'error': error_msg,
+                'details': details
+            }
+        
+        file_path = download_result['file_path']
+        filename = download_result['filename']
+        
+        # Identical files reached through different links get the same ID
+        content_hash = file_sha256(file_path)
+        
+        return {
+            'success': True,
+            'document_id': document_id or f"doc_{content_hash[:12]}",
+            'file_path': file_path,
+            'filename': filename,
+            'file_type': self._detect_file_type(filename),
+            'content_hash': content_hash
+        }
+    
+    def _learn_from_extracted(self, drive_link: str, job: Dict[str, Any],
+                              extracted_data: Dict[str, Any], auto_learn: bool) -> Dict[str, Any]:
+        """Store, learn from and track one processed Drive document"""
+        document_id = job['document_id']
+        filename = job['filename']
+        file_path = job['file_path']
+        
+        # Store in knowledge graph (Neo4j or in-memory fallback)
+        self.knowledge_graph.store_document_knowledge(document_id, extracted_data)
+        
+        # Auto-learn from document if enabled
+        learning_result = None
+        if auto_learn:
+            logger.info("Auto-learning from document...")
+            try:
+                learning_result = self.self_learning_engine.learn_from_documents([extracted_data])
+                logger.info(f"Learning completed: {learning_result.get('patterns_learned', 0)} patterns learned")
+            except Exception as e:
+                logger.error(f"Error during learning: {e}")
+                learning_result = {'error': str(e)}
+        
+        # Track processed document
+        self.processed_documents.append({
+            'document_id': document_id,
+            'drive_link': drive_link,
+            'filename': filename,
+            'file_path': file_path,
+            'extracted_data': extracted_data,
+            'learning_result': learning_result or {}
+        })
+        
+        logger.info(f"Document tracked in learning system: {filename}")
+        
+        return {
+            'success': True,
+            'document_id': document_id,
+            'filename': filename,
+            'file_path': file_path,
+            'extracted_data': {
+                'attack_techniques': len(extracted_data.get('attack_techniques', [])),
+                'exploit_patterns': len(extracted_data.get('exploit_patterns', [])),
+                'defense_strategies': len(extracted_data.get('defense_strategies', [])),
+                'keywords': len(extracted_data.get('keywords', [])),
+                'summary': extracted_data.get('summary', '')[:200]
+            },
+            'cached': extracted_data.get('cached', False),
+            'learning_result': learning_result,
+            'message': 'Document processed and learned successfully'
+        }
+    
+    def iter_learn_from_links(self,
+                              drive_links: List[str],
+                              auto_learn: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Download and learn from Drive links concurrently
+        
+        Downloads run on the ingestion pipeline's thread pool and documents are
+        processed on its process pool; storing and learning happen on the
+        calling thread.
+        
+        Returns:
+            Iterator of learn_from_drive_link-style results (with 'link'), in
+            completion order
+        """
+        return self.ingestion_pipeline.run(
+            drive_links,
+            download=self._download_drive_link,
+            finish=lambda link, job, extracted_data: {
+                **self._learn_from_extracted(link, job, extracted_data, auto_learn),
+                'link': link
+            }
+        )
+    
     def learn_from_multiple_links(self, 
                                  drive_links: List[str],
                                  auto_learn: bool = True) -> Dict[str, Any]:
@@ -155,24 +216,15 @@ class AutoLearner:
             'learned_patterns': 0
         }
         
-        for link in drive_links:
-            try:
-                result = self.learn_from_drive_link(link, auto_learn=auto_learn)
-                
-                if result.get('success'):
-                    results['successful'].append(result)
-                    if result.get('learning_result'):
-                        results['learned_patterns'] += result['learning_result'].get('patterns_learned', 0)
-                else:
-                    results['failed'].append({
-                        'link': link,
-                        'error': result.get('error', 'Unknown error')
-                    })
-                    
-            except Exception as e:
+        for result in self.iter_learn_from_links(drive_links, auto_learn=auto_learn):
+            if result.get('success'):
+                results['successful'].append(result)
+                if result.get('learning_result'):
+                    results['learned_patterns'] += result['learning_result'].get('patterns_learned', 0)
+            else:
                 results['failed'].append({
-                    'link': link,
-                    'error': str(e)
+                    'link': result.get('link'),
+                    'error': result.get('error', 'Unknown error')
                 })
         
         results['success_count'] = len(results['successful'])
@@ -204,16 +256,16 @@ class AutoLearner:
             file_path = download_result['file_path']
             filename = download_result['filename']
             
-            # Generate document ID
-            import hashlib
-            document_id = f"doc_{hashlib.md5(url.encode()).hexdigest()[:12]}"
+            # Generate document ID from the content, like Drive documents
+            content_hash = file_sha256(file_path)
+            document_id = f"doc_{content_hash[:12]}"
             
             # Detect file type
             file_type = self._detect_file_type(filename)
             
             # Process document
             extracted_data = self.document_processor.process_document(
-                document_id, file_path, file_type
+                document_id, file_path, file_type, content_hash=content_hash
             )
             
             # Store in knowledge graph (Neo4j or in-memory fallback)
@@ -0,0 +1,342 @@
+"""
+Chunked Dataset Loader
+Loads large labelled CSV datasets (e.g. CICIDS2017) in a bounded amount of memory
+"""
+
+import logging
+import time
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def find_label_column(columns: List[str]) -> Optional[str]:
+    """First label-like column, using the same rule as SelfLearningEngine"""
+    for col in columns:
+        if 'label' in col.lower() or 'attack' in col.lower() or col == 'Class':
+            return col
+    return None
+
+
+def decode_labels(y: np.ndarray, label_values: List[Any]) -> Tuple[np.ndarray, List[Any]]:
+    """
+    Turn label codes into training labels
+
+    Args:
+        y: Codes indexing label_values
+        label_values: Label value of each code
+
+    Returns:
+        Tuple of (labels, classes). Numeric labels keep their values; text
+        labels become codes in sorted order (like LabelEncoder)
+    """
+    numeric = pd.to_numeric(pd.Series(label_values, dtype=object), errors='coerce')
+    if len(label_values) and numeric.notna().all():
+        lookup = numeric.to_numpy()
+        decoded = lookup[y] if len(y) else lookup[:0]
+        if np.all(np.mod(lookup, 1) == 0):
+            return decoded.astype(np.int64), sorted(int(v) for v in lookup)
+        return decoded, sorted(float(v) for v in lookup)
+
+    classes = sorted(str(v) for v in label_values)
+    rank = {str(value): i for i, value in enumerate(classes)}
+    lookup = np.array([rank[str(value)] for value in label_values], dtype=np.int32)
+    return (lookup[y] if len(y) else np.empty(0, dtype=np.int32)), classes
+
+
+def sample_indices(y: np.ndarray, max_rows: int, stratified: bool = True,
+                   min_per_class: int = 50, seed: int = 42) -> np.ndarray:
+    """
+    Row indices of a sample of at most about max_rows rows of in-memory labels
+
+    Stratified samples are allocated proportionally to class frequency, with at
+    least min_per_class rows of every class (or all of its rows)
+    """
+    rng = np.random.default_rng(seed)
+    if len(y) <= max_rows:
+        return np.arange(len(y))
+    if not stratified:
+        return np.sort(rng.choice(len(y), size=max_rows, replace=False))
+    parts = []
+    for label in np.unique(y):
+        rows = np.flatnonzero(y == label)
+        share = int(round(max_rows * len(rows) / len(y)))
+        n = min(len(rows), max(share, min_per_class))
+        parts.append(rng.choice(rows, size=n, replace=False))
+    return np.sort(np.concatenate(parts))
+
+
+class _Reservoir:
+    """Uniform fixed-size sample of a row stream (vectorized Algorithm R)
+
+    Each kept row carries its id (position in the whole file), so rows held
+    by several reservoirs can be told apart.
+    """
+
+    def __init__(self, capacity: int, n_features: int, rng: np.random.Generator):
+        self.capacity = capacity
+        self.X = np.empty((capacity, n_features), dtype=np.float32)
+        self.y = np.empty(capacity, dtype=np.int32)
+        self.ids = np.empty(capacity, dtype=np.int64)
+        self.size = 0
+        self.seen = 0
+        self._rng = rng
+
+    def add(self, X: np.ndarray, y: np.ndarray, ids: np.ndarray):
+        n = len(y)
+        fill = min(n, self.capacity - self.size)
+        if fill:
+            self.X[self.size:self.size + fill] = X[:fill]
+            self.y[self.size:self.size + fill] = y[:fill]
+            self.ids[self.size:self.size + fill] = ids[:fill]
+            self.size += fill
+        if fill < n:
+            # Row t (0-based position in the stream) replaces slot j ~ U[0, t] if j < capacity
+            positions = self.seen + np.arange(fill, n)
+            slots = (self._rng.random(len(positions)) * (positions + 1)).astype(np.int64)
+            keep = slots < self.capacity
+            rows = np.arange(fill, n)[keep]
+            slots = slots[keep]
+            # When a slot is hit several times, the latest row wins
+            slots_reversed, first = np.unique(slots[::-1], return_index=True)
+            rows = rows[::-1][first]
+            self.X[slots_reversed] = X[rows]
+            self.y[slots_reversed] = y[rows]
+            self.ids[slots_reversed] = ids[rows]
+        self.seen += n
+
+
+class ChunkedDatasetLoader:
+    """Read a CSV in chunks with compact dtypes, cleaning and sampling each chunk
+
+    Numeric columns are read as float32 and text columns as pandas categories.
+    Each chunk is cleaned (inf -> NaN, rows with missing values dropped), its
+    text features are encoded with codes that stay stable across chunks, and
+    the rows are either appended (no row limit) or offered to a reservoir of
+    max_rows rows, a uniform sample and so proportional to class frequency.
+    With stratified sampling every class also has a reservoir of
+    min_per_class rows, which tops up classes too rare to get that many rows
+    in the uniform sample; the rows added are taken out of the largest class.
+    Memory stays bounded by max_rows + min_per_class rows per class no matter
+    how large the file is.
+    """
+
+    def __init__(self, chunksize: int = 100000,
+                 max_rows: Optional[int] = None,
+                 stratified: bool = True,
+                 sample_fraction: Optional[float] = None,
+                 min_per_class: int = 50,
+                 seed: int = 42):
+        """
+        Args:
+            chunksize: Rows per chunk
+            max_rows: Sample at most this many rows (None = keep every row)
+            stratified: Sample per class instead of uniformly over all rows
+            sample_fraction: Keep each row with this probability before sampling
+            min_per_class: Minimum rows per class in a stratified sample
+            seed: Random seed for sampling
+        """
+        self.chunksize = chunksize
+        self.max_rows = max_rows
+        self.stratified = stratified
+        self.sample_fraction = sample_fraction
+        self.min_per_class = min_per_class
+        self.seed = seed
+
+    def scan(self, path: str, label_column: Optional[str] = None) -> Tuple[Dict[str, Any], Iterator[Tuple[np.ndarray, np.ndarray]]]:
+        """
+        Stream a CSV file as cleaned chunks
+
+        Args:
+            path: CSV file path
+            label_column: Label column (detected from the header if None)
+
+        Returns:
+            Tuple of (schema, chunks). chunks yields (float32 features, int32
+            label codes); schema holds label_column, feature_names, the code
+            mappings of text features ('categories') and labels ('label_codes')
+            and running stats, all complete once chunks is exhausted
+        """
+        # Infer compact dtypes from a sample of rows
+        head = pd.read_csv(path, nrows=1000, low_memory=False)
+        raw_columns = list(head.columns)
+        columns = [str(col).strip() for col in raw_columns]
+        label_column = label_column or find_label_column(columns)
+        if label_column is None:
+            raise ValueError("No label column found in dataset")
+
+        # Other label-like columns (e.g. attack_cat next to label) would leak the label
+        feature_names = [col for col in columns if col != label_column and find_label_column([col]) is None]
+        used = [(raw, col) for raw, col in zip(raw_columns, columns) if col == label_column or col in feature_names]
+        dtypes = {}
+        categories: Dict[str, Dict[Any, int]] = {}
+        for raw, col in used:
+            if col == label_column:
+                dtypes[raw] = 'category'
+            elif pd.api.types.is_numeric_dtype(head[raw]):
+                dtypes[raw] = np.float32
+            else:
+                dtypes[raw] = 'category'
+                categories[col] = {}
+
+        schema = {
+            'label_column': label_column,
+            'feature_names': feature_names,
+            'categories': categories,
+            'label_codes': {},
+            'stats': {'rows_read': 0, 'rows_dropped': 0, 'chunks': 0},
+        }
+
+        def chunks():
+            reader = pd.read_csv(path, chunksize=self.chunksize, dtype=dtypes, low_memory=False,
+                                 usecols=[raw for raw, _ in used])
+            for chunk in reader:
+                schema['stats']['chunks'] += 1
+                schema['stats']['rows_read'] += len(chunk)
+                chunk = chunk.rename(columns={raw: col for raw, col in used})
+                X, y, dropped = self._prepare_chunk(chunk, feature_names, label_column,
+                                                    categories, schema['label_codes'])
+                schema['stats']['rows_dropped'] += dropped
+                yield X, y
+
+        return schema, chunks()
+
+    def load(self, path: str, label_column: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Load features and labels from a CSV file
+
+        Args:
+            path: CSV file path
+            label_column: Label column (detected from the header if None)
+
+        Returns:
+            Dictionary with X (float32 matrix), y (labels: numeric values if
+            the labels are numeric, otherwise codes into 'classes'), classes,
+            feature_names, categories (text feature values in code order) and
+            loading stats
+        """
+        start = time.perf_counter()
+        rng = np.random.default_rng(self.seed)
+        schema, chunks = self.scan(path, label_column)
+        feature_names = schema['feature_names']
+
+        parts_X: List[np.ndarray] = []
+        parts_y: List[np.ndarray] = []
+        sample = _Reservoir(self.max_rows, len(feature_names), rng) if self.max_rows is not None else None
+        # Per class: the min_per_class rows that top up rare classes
+        class_reservoirs: Dict[int, _Reservoir] = {}
+        rows_kept = 0
+
+        for X, y in chunks:
+            if self.sample_fraction is not None and self.sample_fraction < 1.0:
+                keep = rng.random(len(y)) < self.sample_fraction
+                X, y = X[keep], y[keep]
+            ids = np.arange(rows_kept, rows_kept + len(y))
+            rows_kept += len(y)
+
+            if sample is None:
+                parts_X.append(X)
+                parts_y.append(y)
+                continue
+            sample.add(X, y, ids)
+            if self.stratified and self.min_per_class > 0:
+                for label in np.unique(y):
+                    mask = y == label
+                    reservoir = class_reservoirs.get(int(label))
+                    if reservoir is None:
+                        reservoir = class_reservoirs[int(label)] = _Reservoir(
+                            self.min_per_class, len(feature_names), rng)
+                    reservoir.add(X[mask], y[mask], ids[mask])
+
+        if sample is None:
+            X = np.concatenate(parts_X) if parts_X else np.empty((0, len(feature_names)), dtype=np.float32)
+            y = np.concatenate(parts_y) if parts_y else np.empty(0, dtype=np.int32)
+        elif self.stratified:
+            X, y = self._allocate(sample, class_reservoirs, rng)
+        else:
+            X, y = sample.X[:sample.size], sample.y[:sample.size]
+
+        y, classes = decode_labels(y, list(schema['label_codes']))
+        stats = schema['stats']
+        seconds = time.perf_counter() - start
+        logger.info(f"Loaded {len(y)} of {stats['rows_read']} rows from {path} in {stats['chunks']} chunks ({seconds:.1f}s)")
+
+        return {
+            'X': X,
+            'y': y,
+            'classes': classes,
+            'feature_names': feature_names,
+            'categories': {col: list(mapping) for col, mapping in schema['categories'].items()},
+            'label_column': schema['label_column'],
+            'stats': {
+                **stats,
+                'rows_loaded': len(y),
+                'sampled': self.max_rows is not None or self.sample_fraction is not None,
+                'stratified': self.max_rows is not None and self.stratified,
+                'memory_mb': round(X.nbytes / (1024 * 1024), 2),
+                'seconds': seconds,
+            },
+        }
+
+    @staticmethod
+    def _prepare_chunk(chunk: pd.DataFrame, feature_names: List[str], label_column: str,
+                       codes: Dict[str, Dict[Any, int]], label_codes: Dict[Any, int]) -> Tuple[np.ndarray, np.ndarray, int]:
+        """Clean one chunk and convert it to (float32 features, int32 label codes, rows dropped)"""
+        n_rows = len(chunk)
+        numeric = [col for col in feature_names if col not in codes]
+        values = chunk[numeric].to_numpy(dtype=np.float32, copy=True) if numeric else None
+        if values is not None:
+            values[~np.isfinite(values)] = np.nan
+
+        X = np.empty((n_rows, len(feature_names)), dtype=np.float32)
+        valid = chunk[label_column].notna().to_numpy(copy=True)
+        numeric_index = {col: i for i, col in enumerate(numeric)}
+        for i, col in enumerate(feature_names):
+            if col in codes:
+                X[:, i] = ChunkedDatasetLoader._encode(chunk[col], codes[col])
+            else:
+                X[:, i] = values[:, numeric_index[col]]
+        valid &= ~np.isnan(X).any(axis=1)
+
+        y = ChunkedDatasetLoader._encode(chunk[label_column], label_codes)
+        return X[valid], y[valid].astype(np.int32), int(n_rows - valid.sum())
+
+    @staticmethod
+    def _encode(series: pd.Series, mapping: Dict[Any, int]) -> np.ndarray:
+        """Map category values to stable codes, extending the mapping with unseen values"""
+        categories = series.cat.categories if hasattr(series, 'cat') else pd.Index(series.dropna().unique())
+        for value in categories:
+            if value not in mapping:
+                mapping[value] = len(mapping)
+        if hasattr(series, 'cat'):
+            table = np.array([mapping[value] for value in categories] + [np.nan], dtype=np.float64)
+            return table[series.cat.codes.to_numpy()]  # code -1 (missing) picks the trailing NaN
+        return series.map(mapping).to_numpy(dtype=np.float64)
+
+    def _allocate(self, sample: _Reservoir, class_reservoirs: Dict[int, _Reservoir],
+                  rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+        """Top up the uniform sample to min_per_class rows per class, keeping it at max_rows rows"""
+        X, y, ids = sample.X[:sample.size], sample.y[:sample.size], sample.ids[:sample.size]
+        counts = dict(zip(*np.unique(y, return_counts=True)))
+        extra_X, extra_y = [], []
+        for label, reservoir in sorted(class_reservoirs.items()):
+            missing = min(self.min_per_class, reservoir.size) - counts.get(label, 0)
+            if missing <= 0:
+                continue
+            rows = np.flatnonzero(~np.isin(reservoir.ids[:reservoir.size], ids))
+            rows = rng.choice(rows, size=min(missing, len(rows)), replace=False)
+            extra_X.append(reservoir.X[rows])
+            extra_y.append(reservoir.y[rows])
+        if not extra_y:
+            return X, y
+
+        # Make room in the largest class, which stays far above the minimum
+        n_extra = sum(len(part) for part in extra_y)
+        largest = max(counts, key=counts.get)
+        n_drop = min(n_extra, max(counts[largest] - self.min_per_class, 0))
+        drop = rng.choice(np.flatnonzero(y == largest), size=n_drop, replace=False)
+        keep = np.ones(len(y), dtype=bool)
+        keep[drop] = False
+        return np.concatenate([X[keep]] + extra_X), np.concatenate([y[keep]] + extra_y)
@@ -3,17 +3,21 @@ Dataset Manager
 Downloads, manages, and preprocesses cybersecurity datasets
 """
 
+import json
 import logging
 import os
-import requests
-import zipfile
-import tarfile
+import time
 from pathlib import Path
 from typing import Dict, List, Optional, Any
+import numpy as np
 import pandas as pd
 from urllib.parse import urlparse
 import hashlib
 
+from services.archive_extractor import ArchiveExtractor, HashingReader, archive_type
+from services.dataset_loader import ChunkedDatasetLoader, decode_labels
+from services.segmented_downloader import ChecksumMismatch, SegmentedDownloader
+
 logger = logging.getLogger(__name__)
 
 
@@ -60,21 +64,39 @@ class DatasetManager:
         }
     }
     
-    def __init__(self, datasets_dir: str = "datasets"):
+    # Bump when the compiled layout or preprocessing changes; older compiled
+    # datasets are then treated as missing and rebuilt
+    COMPILED_VERSION = 1
+    
+    def __init__(self, datasets_dir: str = "datasets", download_segments: int = 4,
+                 extract_extensions: Optional[tuple] = ('.csv', '.json')):
+        """
+        Args:
+            datasets_dir: Directory datasets are stored in
+            download_segments: Parallel byte ranges per download
+            extract_extensions: Archive members extracted from downloads (None = all files)
+        """
         self.datasets_dir = Path(datasets_dir)
         self.datasets_dir.mkdir(parents=True, exist_ok=True)
+        self.downloader = SegmentedDownloader(segments=download_segments)
+        self.extractor = ArchiveExtractor(extensions=extract_extensions)
     
     def list_available_datasets(self) -> Dict[str, Dict]:
         """List all available datasets"""
         return self.DATASETS
     
-    def download_dataset(self, dataset_id: str, url: Optional[str] = None) -> Dict[str, Any]:
+    def download_dataset(self, dataset_id: str, url: Optional[str] = None,
+                         sha256: Optional[str] = None, stream_extract: bool = False,
+                         delete_archive: bool = False) -> Dict[str, Any]:
         """
         Download a dataset
         
         Args:
             dataset_id: ID of dataset to download
             url: Optional direct download URL
+            sha256: Expected SHA-256 of the downloaded file
+            stream_extract: Extract tar archives while downloading, without storing them
+            delete_archive: Delete a downloaded archive once verified and extracted
         
         Returns:
             Download status and file path
@@ -88,7 +110,8 @@ class DatasetManager:
         try:
             # If URL provided, download directly
             if url:
-                return self._download_from_url(url, dataset_path, dataset_id)
+                return self._download_from_url(url, dataset_path, dataset_id, sha256 or dataset_info.get('sha256'),
+                                               stream_extract=stream_extract, delete_archive=delete_archive)
             
             # Otherwise, provide instructions
             return {
@@ -167,7 +190,8 @@ class DatasetManager:
                     'id': dataset_id,
                     'name': self.DATASETS[dataset_id]['name'],
                     'path': str(dataset_path),
-                    'status': 'downloaded'
+                    'status': 'downloaded',
+                    'compiled': self._is_compiled(dataset_path)
                 })
         
         # Check for custom datasets (top-level and datasets/custom/*)
@@ -182,7 +206,8 @@ class DatasetManager:
                         'id': custom_dir.name,
                         'name': metadata.get('name', custom_dir.name),
                         'path': str(custom_dir),
-                        'status': 'custom'
+                        'status': 'custom',
+                        'compiled': self._is_compiled(custom_dir)
                     })
         custom_root = self.datasets_dir / 'custom'
         if custom_root.exists():
@@ -198,61 +223,248 @@ class DatasetManager:
                         'id': f"custom/{custom_dir.name}",
                         'name': meta.get('name', custom_dir.name),
                         'path': str(custom_dir),
-                        'status': 'custom'
+                        'status': 'custom',
+                        'compiled': self._is_compiled(custom_dir)
                     })
         
         return datasets
     
-    def _download_from_url(self, url: str, dest_path: Path, dataset_id: str) -> Dict[str, Any]:
-        """Download dataset from URL"""
+    def compile_dataset(self, dataset: str, force: bool = False, chunksize: int = 100000) -> Dict[str, Any]:
+        """
+        Compile the CSV files of a dataset into typed, preprocessed binary form
+        
+        Each CSV is parsed once (in chunks, see ChunkedDatasetLoader) into a
+        row-major float32 feature matrix and int32 label codes, with the schema,
+        label column and category mappings in a metadata file. Training then
+        memory-maps these files instead of reparsing the CSV.
+        
+        Args:
+            dataset: Dataset ID (including custom/<name>), dataset directory or CSV file
+            force: Recompile even if an up-to-date compiled version exists
+            chunksize: CSV rows parsed per chunk
+        
+        Returns:
+            Compilation status with the metadata of every compiled file
+        """
+        path = Path(dataset)
+        if not path.exists():
+            path = self.datasets_dir / dataset
+        if not path.exists():
+            raise ValueError(f"Dataset not found: {dataset}")
+        
+        sources = [path] if path.is_file() else self._csv_files(path)
+        if not sources:
+            return {'success': False, 'message': f"No CSV files to compile in {path}"}
+        
+        compiled = []
+        for source in sources:
+            meta = None if force else self.compiled_metadata(str(source))
+            compiled.append(meta or self._compile_file(source, chunksize))
+        
+        return {
+            'success': True,
+            'dataset': dataset,
+            'files': compiled
+        }
+    
+    @staticmethod
+    def compiled_dir(source_path: str) -> Path:
+        """Directory holding the compiled version of a dataset file"""
+        source = Path(source_path)
+        return source.parent / 'compiled' / source.name
+    
+    @classmethod
+    def compiled_metadata(cls, source_path: str) -> Optional[Dict[str, Any]]:
+        """Metadata of the compiled version of a file, or None if missing or stale"""
+        meta_path = cls.compiled_dir(source_path) / 'meta.json'
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            stat = os.stat(source_path)
+        except (OSError, ValueError):
+            return None
+        if (meta.get('version') != cls.COMPILED_VERSION or meta.get('source_size') != stat.st_size
+                or meta.get('source_mtime_ns') != stat.st_mtime_ns):
+            return None
+        return meta
+    
+    @classmethod
+    def load_compiled(cls, source_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Memory-map the compiled version of a dataset file
+        
+        Args:
+            source_path: Original CSV path
+        
+        Returns:
+            Dictionary with X (read-only float32 memmap), y, classes,
+            feature_names, categories and metadata, or None if there is no
+            up-to-date compiled version
+        """
+        meta = cls.compiled_metadata(source_path)
+        if meta is None:
+            return None
+        
+        directory = cls.compiled_dir(source_path)
+        rows, n_features = meta['rows'], len(meta['feature_names'])
+        if rows:
+            X = np.memmap(directory / 'X.f32', dtype=np.float32, mode='r', shape=(rows, n_features))
+            codes = np.memmap(directory / 'y.i32', dtype=np.int32, mode='r', shape=(rows,))
+        else:
+            X, codes = np.empty((0, n_features), dtype=np.float32), np.empty(0, dtype=np.int32)
+        y, classes = decode_labels(np.asarray(codes), meta['label_values'])
+        
+        return {
+            'X': X,
+            'y': y,
+            'classes': classes,
+            'feature_names': meta['feature_names'],
+            'categories': meta['categories'],
+            'label_column': meta['label_column'],
+            'metadata': meta
+        }
+    
+    def _compile_file(self, source: Path, chunksize: int) -> Dict[str, Any]:
+        """Parse one CSV into X.f32 / y.i32 / meta.json"""
+        start = time.perf_counter()
+        directory = self.compiled_dir(str(source))
+        directory.mkdir(parents=True, exist_ok=True)
+        
+        # meta.json marks a complete compilation, so it goes first and comes back last
+        meta_path = directory / 'meta.json'
+        if meta_path.exists():
+            meta_path.unlink()
+        
+        stat = source.stat()
+        schema, chunks = ChunkedDatasetLoader(chunksize=chunksize).scan(str(source))
+        rows = 0
+        with open(directory / 'X.f32.tmp', 'wb') as fx, open(directory / 'y.i32.tmp', 'wb') as fy:
+            for X, y in chunks:
+                fx.write(np.ascontiguousarray(X, dtype=np.float32).tobytes())
+                fy.write(np.ascontiguousarray(y, dtype=np.int32).tobytes())
+                rows += len(y)
+        os.replace(directory / 'X.f32.tmp', directory / 'X.f32')
+        os.replace(directory / 'y.i32.tmp', directory / 'y.i32')
+        
+        meta = {
+            'version': self.COMPILED_VERSION,
+            'source': str(source),
+            'source_size': stat.st_size,
+            'source_mtime_ns': stat.st_mtime_ns,
+            'rows': rows,
+            'feature_names': schema['feature_names'],
+            'label_column': schema['label_column'],
+            'label_values': [self._json_value(v) for v in schema['label_codes']],
+            'categories': {col: [self._json_value(v) for v in mapping]
+                           for col, mapping in schema['categories'].items()},
+            'stats': schema['stats'],
+            'compiled_at': time.time(),
+            'compile_seconds': round(time.perf_counter() - start, 3)
+        }
+        with open(directory / 'meta.json.tmp', 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(directory / 'meta.json.tmp', meta_path)
+        
+        logger.info(f"Compiled {source} ({rows} rows) in {meta['compile_seconds']:.1f}s")
+        return meta
+    
+    @staticmethod
+    def _json_value(value: Any) -> Any:
+        """Category value as a JSON-compatible scalar"""
+        return value.item() if isinstance(value, np.generic) else value
+    
+    @staticmethod
+    def _csv_files(directory: Path) -> List[Path]:
+        """CSV files of a dataset directory (compiled output excluded)"""
+        return sorted(p for p in directory.rglob('*.csv') if 'compiled' not in p.relative_to(directory).parts[:-1])
+    
+    def _is_compiled(self, directory: Path) -> bool:
+        """Whether every CSV file of a dataset directory has an up-to-date compiled version"""
+        sources = self._csv_files(directory)
+        return bool(sources) and all(self.compiled_metadata(str(p)) for p in sources)
+    
+    def _download_from_url(self, url: str, dest_path: Path, dataset_id: str,
+                           sha256: Optional[str] = None, stream_extract: bool = False,
+                           delete_archive: bool = False) -> Dict[str, Any]:
+        """
+        Download dataset from URL and extract the wanted members of archives
+        
+        Files are downloaded in parallel ranges (resumed if interrupted before)
+        and verified, then archives are extracted member by member. With
+        stream_extract, tar archives are instead extracted from the response
+        as it arrives and never stored; the checksum is computed on the fly
+        and the extracted files are removed if it does not match.
+        """
+        start = time.perf_counter()
         dest_path.mkdir(parents=True, exist_ok=True)
         
         logger.info(f"Downloading {url} to {dest_path}")
         
-        # Download file
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-        
         filename = urlparse(url).path.split('/')[-1]
         file_path = dest_path / filename
+        kind = archive_type(filename)
+        download = None
+        archive_deleted = False
         
-        # Download with progress
-        total_size = int(response.headers.get('content-length', 0))
-        downloaded = 0
-        
-        with open(file_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-                    downloaded += len(chunk)
-                    if total_size > 0:
-                        progress = (downloaded / total_size) * 100
-                        logger.info(f"Download progress: {progress:.1f}%")
-        
-        # Extract if archive
-        if filename.endswith('.zip'):
-            self._extract_zip(file_path, dest_path)
-        elif filename.endswith('.tar.gz') or filename.endswith('.tgz'):
-            self._extract_tar(file_path, dest_path)
+        if stream_extract and kind == 'tar':
+            extraction, digest = self._stream_extract_tar(url, dest_path, sha256)
+            archive_bytes, peak_bytes = 0, extraction['bytes']
+            file_path = None
+        else:
+            download = self.downloader.download(url, str(file_path), sha256=sha256)
+            digest = download['sha256']
+            archive_bytes = download['size'] if kind else 0
+            extraction = self.extractor.extract(file_path, dest_path) if kind else None
+            peak_bytes = download['size'] + (extraction['bytes'] if extraction else 0)
+            if kind and delete_archive:
+                # Already verified against the checksum by the downloader
+                file_path.unlink()
+                archive_deleted = True
+        
+        seconds = time.perf_counter() - start
+        if extraction:
+            logger.info(f"Dataset {dataset_id}: {extraction['extracted']} files extracted, "
+                        f"peak disk {peak_bytes / 1e6:.1f} MB, {seconds:.1f}s")
         
         return {
             'success': True,
             'dataset_id': dataset_id,
             'path': str(dest_path),
-            'file': str(file_path)
+            'file': str(file_path) if file_path and file_path.exists() else None,
+            'sha256': digest,
+            'download': download,
+            'extraction': extraction,
+            'disk': {
+                'peak_bytes': peak_bytes,
+                'archive_bytes': archive_bytes,
+                'extracted_bytes': extraction['bytes'] if extraction else 0,
+                'archive_deleted': archive_deleted
+            },
+            'seconds': seconds
         }
     
-    def _extract_zip(self, zip_path: Path, dest_path: Path):
-        """Extract ZIP archive"""
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(dest_path)
-        logger.info(f"Extracted {zip_path} to {dest_path}")
+    def _stream_extract_tar(self, url: str, dest_path: Path, sha256: Optional[str]) -> tuple:
+        """Extract a tar archive straight from the HTTP response; returns (stats, sha256)"""
+        session = self.downloader.session
+        with session.get(url, stream=True, timeout=self.downloader.timeout) as response:
+            response.raise_for_status()
+            reader = HashingReader(response.raw)
+            extraction = self.extractor.extract_tar_stream(reader, dest_path)
+            reader.drain()
+        
+        digest = reader.hexdigest()
+        if sha256 and digest != sha256.lower():
+            self.extractor.remove(extraction['files'])
+            raise ChecksumMismatch(f"SHA-256 mismatch for {url}: expected {sha256}, got {digest}")
+        return extraction, digest
+    
+    def _extract_zip(self, zip_path: Path, dest_path: Path) -> Dict[str, Any]:
+        """Extract the wanted members of a ZIP archive"""
+        return self.extractor.extract_zip(zip_path, dest_path)
     
-    def _extract_tar(self, tar_path: Path, dest_path: Path):
-        """Extract TAR archive"""
-        with tarfile.open(tar_path, 'r:gz') as tar_ref:
-            tar_ref.extractall(dest_path)
-        logger.info(f"Extracted {tar_path} to {dest_path}")
+    def _extract_tar(self, tar_path: Path, dest_path: Path) -> Dict[str, Any]:
+        """Extract the wanted members of a TAR archive"""
+        return self.extractor.extract_tar(tar_path, dest_path)
     
     def _get_download_instructions(self, dataset_id: str) -> str:
         """Get download instructions for a dataset"""
@@ -274,7 +486,9 @@ class DatasetManager:
         
         return instructions
 
-    def download_from_url_to_project(self, url: str, dataset_id: Optional[str] = None) -> Dict[str, Any]:
+    def download_from_url_to_project(self, url: str, dataset_id: Optional[str] = None,
+                                     sha256: Optional[str] = None, stream_extract: bool = False,
+                                     delete_archive: bool = False) -> Dict[str, Any]:
         """
         Download any file from URL and store in project datasets folder.
         Use for your own datasets (CSV, JSON, ZIP, etc.). Extracts ZIP/TAR automatically.
@@ -282,6 +496,9 @@ class DatasetManager:
         Args:
             url: Direct download URL
             dataset_id: Optional folder name (default: derived from filename)
+            sha256: Expected SHA-256 of the downloaded file
+            stream_extract: Extract tar archives while downloading, without storing them
+            delete_archive: Delete a downloaded archive once verified and extracted
 
         Returns:
             {'success': True, 'dataset_id': str, 'path': str, 'file': str} or error dict
@@ -297,7 +514,8 @@ class DatasetManager:
                 dataset_id = f"custom_{dataset_id}"
             dest_path = self.datasets_dir / 'custom' / dataset_id
             dest_path.mkdir(parents=True, exist_ok=True)
-            result = self._download_from_url(url, dest_path, dataset_id)
+            result = self._download_from_url(url, dest_path, dataset_id, sha256,
+                                             stream_extract=stream_extract, delete_archive=delete_archive)
             metadata = {
                 'name': dataset_id,
                 'description': f"Downloaded from {url[:80]}{'...' if len(url) > 80 else ''}",
@@ -0,0 +1,178 @@
+"""
+Document Cache
+Content-addressed cache of extracted document knowledge, keyed by file SHA-256
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Hash a file's content without reading it into memory at once"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DocumentCache:
+    """Store extracted-knowledge dicts by content hash on local disk or in Redis
+
+    Entries live under a namespace (normally the extractor version plus a
+    fingerprint of its configuration), so changing the extractor makes old
+    entries unreachable instead of serving stale results. On disk, entries
+    older than ttl_seconds are misses, and once the cache directory (all
+    namespaces together) holds more than max_bytes, the oldest entries are
+    deleted. The cache is best-effort: storage errors are logged and treated
+    as misses.
+    """
+
+    def __init__(self, namespace: str, cache_dir: str = os.path.join("cache", "documents"),
+                 redis_client=None, ttl_seconds: Optional[int] = None,
+                 max_bytes: Optional[int] = None):
+        """
+        Args:
+            namespace: Version namespace for entries
+            cache_dir: Directory for on-disk entries (ignored when redis_client is given)
+            redis_client: Redis client to store entries in instead of local disk
+            ttl_seconds: Entry lifetime (None = no expiry)
+            max_bytes: Size bound of the on-disk cache (None = unbounded; Redis
+                bounds itself with its maxmemory policy)
+        """
+        self.namespace = namespace
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.root_dir = Path(cache_dir)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Bytes on disk as of the last scan plus those written since (None = not scanned yet)
+        self._disk_bytes: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self) -> str:
+        return 'redis' if self.redis_client is not None else 'disk'
+
+    @property
+    def cache_dir(self) -> Path:
+        return self.root_dir / self.namespace
+
+    def _redis_key(self, key: str) -> str:
+        return f"document_cache:{self.namespace}:{key}"
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get a cached entry, or None on a miss"""
+        try:
+            if self.redis_client is not None:
+                raw = self.redis_client.get(self._redis_key(key))
+            else:
+                raw = self._read(self._path(key))
+            entry = json.loads(raw) if raw else None
+        except Exception as e:
+            logger.warning(f"Document cache read failed for {key}: {e}")
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def _read(self, path: Path) -> Optional[str]:
+        try:
+            if self.ttl_seconds and time.time() - path.stat().st_mtime > self.ttl_seconds:
+                path.unlink()
+                return None
+            return path.read_text(encoding='utf-8')
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, data: Dict[str, Any]) -> bool:
+        """Store an entry; returns False if it could not be stored"""
+        try:
+            raw = json.dumps(data)
+            if self.redis_client is not None:
+                self.redis_client.set(self._redis_key(key), raw, ex=self.ttl_seconds)
+            else:
+                self._write(self._path(key), raw.encode('utf-8'))
+            return True
+        except Exception as e:
+            logger.warning(f"Document cache write failed for {key}: {e}")
+            return False
+
+    def _write(self, path: Path, raw: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # A temp file of its own per writer; replacing is atomic, so readers
+        # and concurrent writers of the same key never see a partial entry
+        with tempfile.NamedTemporaryFile(dir=path.parent, suffix='.tmp', delete=False) as f:
+            f.write(raw)
+        try:
+            os.replace(f.name, path)
+        except OSError:
+            os.unlink(f.name)
+            raise
+
+        if self.max_bytes is None:
+            return
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += len(raw)
+            if self._disk_bytes is None or self._disk_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Delete expired entries, then the oldest ones until under max_bytes (all namespaces)"""
+        now = time.time()
+        entries = []
+        for path in self.root_dir.glob('*/*/*.json'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        # Trim below the bound, so that not every write has to scan again
+        target = self.max_bytes * 0.9 if total > self.max_bytes else total
+        evicted = 0
+        for mtime, size, path in entries:
+            expired = self.ttl_seconds and now - mtime > self.ttl_seconds
+            if total <= target and not expired:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        self._disk_bytes = total
+        if evicted:
+            self.evictions += evicted
+            logger.info(f"Document cache evicted {evicted} entries ({total} bytes kept)")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'backend': self.backend,
+            'namespace': self.namespace,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'disk_bytes': self._disk_bytes,
+            'max_bytes': self.max_bytes,
+        }
@@ -3,12 +3,22 @@ Document Learning Engine
 Extracts knowledge from cybersecurity documents using NLP
 """
 
+import hashlib
+import json
 import logging
-from typing import Dict, List, Any
+import os
+import re
+import time
+from collections import Counter
+from typing import Dict, List, Any, Iterable, Iterator, Optional
 import PyPDF2
 from docx import Document
 import nltk
-from transformers import pipeline
+
+from services.document_cache import DocumentCache, file_sha256
+from services.inference_backend import load_pipeline
+from services.keyword_matcher import KeywordMatcher
+from services.model_registry import model_registry
 
 logger = logging.getLogger(__name__)
 
@@ -16,22 +26,70 @@ logger = logging.getLogger(__name__)
 class DocumentProcessor:
     """Process cybersecurity documents and extract knowledge"""
     
-    def __init__(self):
-        # Initialize NLP models
-        try:
-            self.ner_model = pipeline(
-                "ner",
-                model="dbmdz/bert-large-cased-finetuned-conll03-english",
-                aggregation_strategy="simple"
-            )
-            self.text_classifier = pipeline(
-                "text-classification",
-                model="distilbert-base-uncased-finetuned-sst-2-english"
+    # Files above this size are processed chunk by chunk (streaming mode)
+    STREAMING_THRESHOLD_BYTES = 20 * 1024 * 1024
+    
+    # Upper bound on a single streamed chunk, so one huge paragraph can't blow memory
+    MAX_CHUNK_CHARS = 20000
+    
+    # In streaming mode only this much of the raw text is kept in the result
+    STREAMING_TEXT_PREVIEW_CHARS = 100000
+    
+    # Common attack technique keywords
+    ATTACK_KEYWORDS = [
+        'trojan', 'ransomware', 'phishing', 'malware', 'virus',
+        'sql injection', 'xss', 'ddos', 'mitm', 'zero-day',
+        'backdoor', 'rootkit', 'spyware', 'adware', 'botnet'
+    ]
+    
+    DEFENSE_KEYWORDS = [
+        'firewall', 'antivirus', 'ids', 'ips', 'encryption',
+        'authentication', 'authorization', 'patch', 'update',
+        'monitoring', 'logging', 'backup', 'incident response'
+    ]
+    
+    # NER runs on sentence-aligned windows of at most this many tokens
+    # (below the 512-token limit of the BERT model, leaving room for special tokens)
+    NER_MAX_TOKENS = 384
+    
+    NER_BATCH_SIZE = 8
+    
+    # Streaming mode collects this many batches of windows before running NER,
+    # so length bucketing has windows to choose from
+    NER_STREAM_BUFFER_BATCHES = 4
+    
+    # Names of the shared NLP models in the model registry
+    NER_MODEL_NAME = 'ner'
+    TEXT_CLASSIFIER_MODEL_NAME = 'text_classifier'
+    
+    # Bump whenever extraction output changes; cached results of other versions are ignored
+    EXTRACTOR_VERSION = 2
+    
+    NER_MODEL = "dbmdz/bert-large-cased-finetuned-conll03-english"
+    TEXT_CLASSIFIER_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+    
+    # Backend of the process-wide NLP pipelines, set by the registration that won
+    registered_backend: Optional[str] = None
+    
+    def __init__(self, keyword_dictionary_path: Optional[str] = None,
+                 ner_max_tokens: Optional[int] = None,
+                 ner_batch_size: Optional[int] = None,
+                 inference_backend: str = 'pytorch',
+                 onnx_cache_dir: Optional[str] = None):
+        self.ner_max_tokens = ner_max_tokens or self.NER_MAX_TOKENS
+        self.ner_batch_size = ner_batch_size or self.NER_BATCH_SIZE
+        self.inference_backend = inference_backend
+        
+        # Content-addressed result cache, see enable_cache()
+        self.cache: Optional[DocumentCache] = None
+        
+        # NLP models are loaded on first use and shared by every DocumentProcessor
+        self.register_models(inference_backend, onnx_cache_dir)
+        if self.registered_backend not in (None, inference_backend):
+            logger.warning(
+                f"NLP models are already registered with the {self.registered_backend} backend; "
+                f"this processor uses them instead of {inference_backend}"
             )
-        except Exception as e:
-            logger.warning(f"Could not load NLP models: {e}")
-            self.ner_model = None
-            self.text_classifier = None
         
         # Download required NLTK data
         try:
@@ -43,8 +101,96 @@ class DocumentProcessor:
             nltk.data.find('corpora/stopwords')
         except LookupError:
             nltk.download('stopwords', quiet=True)
+        
+        self._stop_words = None
+        
+        # Attack/defense keywords and CVE IDs are matched in one pass per sentence;
+        # extra dictionaries (e.g. MITRE ATT&CK technique names) extend the built-ins
+        self.keyword_matcher = KeywordMatcher({
+            'attack_techniques': self.ATTACK_KEYWORDS,
+            'defense_strategies': self.DEFENSE_KEYWORDS,
+        })
+        if keyword_dictionary_path:
+            try:
+                for category, keywords in KeywordMatcher.load_dictionary_file(keyword_dictionary_path).items():
+                    self.keyword_matcher.add_keywords(category, keywords)
+                logger.info(f"Loaded keyword dictionary {keyword_dictionary_path} ({len(self.keyword_matcher)} keywords)")
+            except Exception as e:
+                logger.warning(f"Could not load keyword dictionary {keyword_dictionary_path}: {e}")
     
-    def process_document(self, document_id: str, file_path: str, file_type: str) -> Dict[str, Any]:
+    def cache_namespace(self) -> str:
+        """Cache namespace covering the extractor version and everything that shapes its output"""
+        config = {
+            'ner_model': self.NER_MODEL,
+            'ner_max_tokens': self.ner_max_tokens,
+            # The backend of the shared pipelines, which may differ from the one requested
+            'inference_backend': self.registered_backend or self.inference_backend,
+            'keywords': self.keyword_matcher.dictionaries,
+        }
+        fingerprint = hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:12]
+        return f"v{self.EXTRACTOR_VERSION}-{fingerprint}"
+    
+    def enable_cache(self, cache_dir: Optional[str] = None, redis_client=None,
+                     ttl_seconds: Optional[int] = None,
+                     max_bytes: Optional[int] = None) -> DocumentCache:
+        """
+        Cache extracted knowledge by file content hash
+        
+        The namespace follows the extractor configuration: keywords added
+        later move the cache to a new namespace instead of serving results
+        extracted without them.
+        
+        Args:
+            cache_dir: Directory for on-disk entries
+            redis_client: Store entries in Redis instead of on disk
+            ttl_seconds: Entry lifetime (None = no expiry)
+            max_bytes: Size bound of the on-disk cache (None = unbounded)
+        
+        Returns:
+            The document cache
+        """
+        kwargs = {'cache_dir': cache_dir} if cache_dir else {}
+        self.cache = DocumentCache(self.cache_namespace(), redis_client=redis_client,
+                                   ttl_seconds=ttl_seconds, max_bytes=max_bytes, **kwargs)
+        logger.info(f"Document cache enabled ({self.cache.backend}, namespace {self.cache.namespace})")
+        return self.cache
+    
+    @classmethod
+    def register_models(cls, backend: str = 'pytorch', onnx_cache_dir: Optional[str] = None,
+                        replace: bool = False):
+        """
+        Register the NLP model loaders with the process-wide registry
+        
+        Args:
+            backend: 'pytorch' or 'onnx' (int8-quantized ONNX Runtime, CPU)
+            onnx_cache_dir: Cache directory for ONNX exports
+            replace: Replace already registered loaders; otherwise the first
+                registration wins and later calls are no-ops
+        """
+        registered = model_registry.register(cls.NER_MODEL_NAME, lambda: load_pipeline(
+            "ner", cls.NER_MODEL, backend=backend, cache_dir=onnx_cache_dir,
+            aggregation_strategy="simple"
+        ), replace=replace)
+        model_registry.register(cls.TEXT_CLASSIFIER_MODEL_NAME, lambda: load_pipeline(
+            "text-classification", cls.TEXT_CLASSIFIER_MODEL, backend=backend, cache_dir=onnx_cache_dir
+        ), replace=replace)
+        if registered:
+            cls.registered_backend = backend
+            logger.info(f"Registered NLP models with the {backend} inference backend")
+    
+    @property
+    def ner_model(self):
+        """Shared NER pipeline (None if it could not be loaded)"""
+        return model_registry.get(self.NER_MODEL_NAME)
+    
+    @property
+    def text_classifier(self):
+        """Shared text classification pipeline (None if it could not be loaded)"""
+        return model_registry.get(self.TEXT_CLASSIFIER_MODEL_NAME)
+    
+    def process_document(self, document_id: str, file_path: str, file_type: str,
+                         streaming: Optional[bool] = None, use_cache: bool = True,
+                         content_hash: Optional[str] = None) -> Dict[str, Any]:
         """
         Process a cybersecurity document and extract knowledge
         
@@ -52,33 +198,252 @@ class DocumentProcessor:
             document_id: Unique identifier for the document
             file_path: Path to the document file
             file_type: Type of document (pdf, docx, txt)
+            streaming: Process page/paragraph chunks incrementally instead of
+                loading the whole text. Defaults to True for files larger than
+                STREAMING_THRESHOLD_BYTES.
+            use_cache: Return a cached result for identical file content
+                (when a cache is enabled) and cache new results
+            content_hash: SHA-256 of the file if the caller already computed it
         
         Returns:
             Dictionary containing extracted knowledge
         """
         try:
-            # Extract text from document
-            text = self._extract_text(file_path, file_type)
-            
-            # Extract entities and knowledge
-            extracted_data = {
-                'document_id': document_id,
-                'text': text,
-                'attack_techniques': self._extract_attack_techniques(text),
-                'exploit_patterns': self._extract_exploit_patterns(text),
-                'defense_strategies': self._extract_defense_strategies(text),
-                'entities': self._extract_entities(text),
-                'keywords': self._extract_keywords(text),
-                'summary': self._generate_summary(text),
-            }
-            
-            logger.info(f"Successfully processed document {document_id}")
+            if streaming is None:
+                streaming = self._default_streaming(file_path)
+            
+            if use_cache and self.cache is not None:
+                content_hash = content_hash or file_sha256(file_path)
+                cached = self.get_cached_result(document_id, file_path, file_type, streaming, content_hash)
+                if cached is not None:
+                    return cached
+            
+            if streaming:
+                extracted_data = self._process_chunks(
+                    document_id, self.iter_text_chunks(file_path, file_type)
+                )
+                logger.info(f"Successfully processed document {document_id} (streaming)")
+            else:
+                extracted_data = self._process_text(document_id, self._extract_text(file_path, file_type))
+                logger.info(f"Successfully processed document {document_id}")
+            
+            if content_hash:
+                extracted_data['content_hash'] = content_hash
+            extracted_data['cached'] = False
+            if use_cache:
+                self.cache_result(file_path, file_type, extracted_data, streaming, content_hash)
             return extracted_data
             
         except Exception as e:
             logger.error(f"Error processing document {document_id}: {str(e)}")
             raise
     
+    def _process_text(self, document_id: str, text: str) -> Dict[str, Any]:
+        """Extract knowledge from the full text of a document"""
+        # Split into sentences once; all sentence-level extractors share them
+        sentences = nltk.sent_tokenize(text)
+        attack_techniques, exploit_patterns, defense_strategies = self._extract_patterns(sentences)
+        ner_stats = self._new_ner_stats()
+        
+        # Extract entities and knowledge
+        return {
+            'document_id': document_id,
+            'text': text,
+            'attack_techniques': attack_techniques,
+            'exploit_patterns': exploit_patterns,
+            'defense_strategies': defense_strategies,
+            'entities': self._extract_entities(text, sentences=sentences, stats=ner_stats),
+            'ner_stats': self._finish_ner_stats(ner_stats),
+            'keywords': self._extract_keywords(text),
+            'summary': self._generate_summary(text, sentences=sentences),
+        }
+    
+    def _default_streaming(self, file_path: str) -> bool:
+        return os.path.getsize(file_path) > self.STREAMING_THRESHOLD_BYTES
+    
+    @staticmethod
+    def _cache_key(content_hash: str, file_type: str, streaming: bool) -> str:
+        # Streaming keeps only a text preview, so the two modes are cached separately
+        return f"{content_hash}-{file_type}{'-streaming' if streaming else ''}"
+    
+    def get_cached_result(self, document_id: str, file_path: str, file_type: str,
+                          streaming: Optional[bool] = None,
+                          content_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Look up a previously extracted result for identical file content
+        
+        Returns:
+            The cached result under this document_id (cached=True), or None on
+            a miss or when no cache is enabled
+        """
+        if self.cache is None:
+            return None
+        self._refresh_cache_namespace()
+        if streaming is None:
+            streaming = self._default_streaming(file_path)
+        content_hash = content_hash or file_sha256(file_path)
+        cached = self.cache.get(self._cache_key(content_hash, file_type, streaming))
+        if cached is None:
+            return None
+        logger.info(f"Document {document_id} served from cache ({content_hash[:12]})")
+        return {**cached, 'document_id': document_id, 'cached': True}
+    
+    def _refresh_cache_namespace(self):
+        """Move the cache to a new namespace if the extractor configuration changed"""
+        namespace = self.cache_namespace()
+        if namespace != self.cache.namespace:
+            logger.info(f"Extractor configuration changed; document cache namespace {namespace}")
+            self.cache.namespace = namespace
+    
+    def cache_result(self, file_path: str, file_type: str, extracted_data: Dict[str, Any],
+                     streaming: Optional[bool] = None, content_hash: Optional[str] = None) -> bool:
+        """Store an extracted result (e.g. one produced in a worker process) in the cache"""
+        if self.cache is None:
+            return False
+        self._refresh_cache_namespace()
+        if streaming is None:
+            streaming = self._default_streaming(file_path)
+        content_hash = content_hash or extracted_data.get('content_hash') or file_sha256(file_path)
+        return self.cache.put(self._cache_key(content_hash, file_type, streaming), extracted_data)
+    
+    def _process_chunks(self, document_id: str, chunks: Iterable[str]) -> Dict[str, Any]:
+        """
+        Extract knowledge from a stream of text chunks
+        
+        Every extractor consumes one chunk at a time; only the findings, the
+        keyword counts and a bounded text preview are kept across chunks. The
+        document is the chunks joined by newlines, and entity offsets point
+        into it. NER windows are buffered across chunks (up to
+        NER_STREAM_BUFFER_BATCHES batches) so that large documents get full,
+        length-bucketed batches.
+        """
+        ner_model = self.ner_model
+        ner_windows = []
+        attack_techniques = []
+        exploit_patterns = []
+        defense_strategies = []
+        entities = []
+        ner_stats = self._new_ner_stats()
+        keyword_counts = Counter()
+        preview_parts = []
+        preview_chars = 0
+        text_length = 0
+        sentence_count = 0
+        first_sentence = None
+        last_sentence = None
+        
+        for chunk in chunks:
+            offset = text_length
+            text_length += len(chunk) + 1
+            if preview_chars < self.STREAMING_TEXT_PREVIEW_CHARS:
+                part = chunk[:self.STREAMING_TEXT_PREVIEW_CHARS - preview_chars]
+                preview_parts.append(part)
+                preview_chars += len(part) + 1
+            
+            sentences = nltk.sent_tokenize(chunk)
+            
+            techniques, patterns, strategies = self._extract_patterns(sentences)
+            attack_techniques.extend(techniques)
+            exploit_patterns.extend(patterns)
+            defense_strategies.extend(strategies)
+            if ner_model:
+                try:
+                    ner_windows.extend(
+                        (chunk[a:b], offset + a, n) for a, b, n in self._ner_windows(chunk, sentences, ner_model)
+                    )
+                except Exception as e:
+                    logger.warning(f"Error extracting entities: {e}")
+                if len(ner_windows) >= self.ner_batch_size * self.NER_STREAM_BUFFER_BATCHES:
+                    entities.extend(self._run_ner(ner_windows, ner_model, ner_stats))
+                    ner_windows = []
+            keyword_counts.update(self._count_keywords(chunk))
+            
+            if sentences:
+                if first_sentence is None:
+                    first_sentence = sentences[0]
+                last_sentence = sentences[-1]
+                sentence_count += len(sentences)
+        
+        entities.extend(self._run_ner(ner_windows, ner_model, ner_stats))
+        preview = "\n".join(preview_parts).strip()
+        
+        # Same rule as _generate_summary: short documents are summarized by their start
+        if sentence_count <= 3:
+            summary = preview[:200]
+        else:
+            summary = (first_sentence + " " + last_sentence)[:200]
+        
+        return {
+            'document_id': document_id,
+            'text': preview,
+            'text_length': max(text_length - 1, 0),
+            'text_truncated': text_length - 1 > len(preview),
+            'attack_techniques': attack_techniques,
+            'exploit_patterns': exploit_patterns,
+            'defense_strategies': defense_strategies,
+            'entities': entities,
+            'ner_stats': self._finish_ner_stats(ner_stats),
+            'keywords': [word for word, count in keyword_counts.most_common(20)],
+            'summary': summary,
+        }
+    
+    def iter_text_chunks(self, file_path: str, file_type: str) -> Iterator[str]:
+        """
+        Yield the text of a document as page and paragraph chunks
+        
+        Never materializes the whole text; each chunk is at most MAX_CHUNK_CHARS.
+        
+        Args:
+            file_path: Path to the document file
+            file_type: Type of document (pdf, docx, txt)
+        """
+        try:
+            if file_type.lower() == 'pdf':
+                with open(file_path, 'rb') as file:
+                    pdf_reader = PyPDF2.PdfReader(file)
+                    for page in pdf_reader.pages:
+                        yield from self._split_paragraphs(page.extract_text() or "")
+            
+            elif file_type.lower() in ['docx', 'doc']:
+                doc = Document(file_path)
+                for paragraph in doc.paragraphs:
+                    yield from self._split_paragraphs(paragraph.text)
+            
+            elif file_type.lower() == 'txt':
+                with open(file_path, 'r', encoding='utf-8') as file:
+                    lines = []
+                    size = 0
+                    for line in file:
+                        if not line.strip() or size + len(line) > self.MAX_CHUNK_CHARS:
+                            if lines:
+                                yield from self._split_paragraphs("".join(lines))
+                            lines, size = [], 0
+                        if line.strip():
+                            lines.append(line)
+                            size += len(line)
+                    if lines:
+                        yield from self._split_paragraphs("".join(lines))
+            
+        except Exception as e:
+            logger.error(f"Error streaming text from {file_path}: {str(e)}")
+            raise
+    
+    def _split_paragraphs(self, text: str) -> Iterator[str]:
+        """Split a page of text into non-empty paragraph chunks of bounded size"""
+        for paragraph in re.split(r'\n\s*\n', text):
+            paragraph = paragraph.strip()
+            while len(paragraph) > self.MAX_CHUNK_CHARS:
+                # Cut at the last line or word break inside the limit
+                cut = paragraph.rfind('\n', 0, self.MAX_CHUNK_CHARS)
+                if cut <= 0:
+                    cut = paragraph.rfind(' ', 0, self.MAX_CHUNK_CHARS)
+                if cut <= 0:
+                    cut = self.MAX_CHUNK_CHARS
+                yield paragraph[:cut].strip()
+                paragraph = paragraph[cut:].strip()
+            if paragraph:
+                yield paragraph
+    
     def _extract_text(self, file_path: str, file_type: str) -> str:
         """Extract text content from document"""
         text = ""
@@ -87,13 +452,12 @@ class DocumentProcessor:
             if file_type.lower() == 'pdf':
                 with open(file_path, 'rb') as file:
                     pdf_reader = PyPDF2.PdfReader(file)
-                    for page in pdf_reader.pages:
-                        text += page.extract_text() + "\n"
+                    # Join once instead of repeated string concatenation
+                    text = "".join(f"{page.extract_text()}\n" for page in pdf_reader.pages)
             
             elif file_type.lower() in ['docx', 'doc']:
                 doc = Document(file_path)
-                for paragraph in doc.paragraphs:
-                    text += paragraph.text + "\n"
+                text = "".join(f"{paragraph.text}\n" for paragraph in doc.paragraphs)
             
             elif file_type.lower() == 'txt':
                 with open(file_path, 'r', encoding='utf-8') as file:
@@ -105,122 +469,261 @@ class DocumentProcessor:
             logger.error(f"Error extracting text from {file_path}: {str(e)}")
             raise
     
-    def _extract_attack_techniques(self, text: str) -> List[Dict[str, Any]]:
-        """Extract attack techniques from text"""
-        techniques = []
+    def _extract_patterns(self, sentences: List[str]) -> tuple:
+        """
+        Extract attack techniques, exploit patterns and defense strategies
         
-        # Common attack technique keywords
-        attack_keywords = [
-            'trojan', 'ransomware', 'phishing', 'malware', 'virus',
-            'sql injection', 'xss', 'ddos', 'mitm', 'zero-day',
-            'backdoor', 'rootkit', 'spyware', 'adware', 'botnet'
-        ]
+        Runs the keyword matcher once per sentence instead of scanning each
+        sentence once per keyword.
         
-        sentences = nltk.sent_tokenize(text.lower())
+        Returns:
+            Tuple of (attack_techniques, exploit_patterns, defense_strategies)
+        """
+        techniques = []
+        patterns = []
+        strategies = []
         
         for sentence in sentences:
-            for keyword in attack_keywords:
-                if keyword in sentence:
-                    techniques.append({
-                        'technique': keyword,
-                        'context': sentence[:200],
-                        'confidence': 0.8
-                    })
+            found, cves = self.keyword_matcher.match(sentence)
+            
+            for cve in cves:
+                patterns.append({
+                    'type': 'cve',
+                    'identifier': cve,
+                    'confidence': 0.9
+                })
+            
+            if not found:
+                continue
+            context = sentence.lower()[:200]
+            
+            for keyword in found.get('attack_techniques', ()):
+                techniques.append({
+                    'technique': keyword,
+                    'context': context,
+                    'confidence': 0.8
+                })
+            
+            for keyword in found.get('defense_strategies', ()):
+                strategies.append({
+                    'strategy': keyword,
+                    'context': context,
+                    'confidence': 0.8
+                })
         
-        return techniques
+        return techniques, patterns, strategies
+    
+    def _extract_attack_techniques(self, text: str) -> List[Dict[str, Any]]:
+        """Extract attack techniques from text"""
+        return self._extract_patterns(nltk.sent_tokenize(text))[0]
     
     def _extract_exploit_patterns(self, text: str) -> List[Dict[str, Any]]:
-        """Extract exploit patterns from text"""
-        patterns = []
-        
-        # Look for patterns like CVE numbers, exploit codes, etc.
-        import re
-        
-        cve_pattern = r'CVE-\d{4}-\d{4,7}'
-        cves = re.findall(cve_pattern, text)
-        
-        for cve in cves:
-            patterns.append({
-                'type': 'cve',
-                'identifier': cve,
-                'confidence': 0.9
-            })
-        
-        return patterns
+        """Extract exploit patterns (CVE numbers) from text"""
+        return self._extract_patterns(nltk.sent_tokenize(text))[1]
     
     def _extract_defense_strategies(self, text: str) -> List[Dict[str, Any]]:
         """Extract defense strategies from text"""
-        strategies = []
-        
-        defense_keywords = [
-            'firewall', 'antivirus', 'ids', 'ips', 'encryption',
-            'authentication', 'authorization', 'patch', 'update',
-            'monitoring', 'logging', 'backup', 'incident response'
-        ]
+        return self._extract_patterns(nltk.sent_tokenize(text))[2]
+    
+    def _extract_entities(self, text: str, sentences: Optional[List[str]] = None,
+                          stats: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Extract named entities using NER model
         
-        sentences = nltk.sent_tokenize(text.lower())
+        The text is split at sentence boundaries into windows of at most
+        ner_max_tokens tokens. Windows are sorted by length and run through the
+        pipeline in batches of ner_batch_size, so each batch pads to similar
+        lengths. Entity offsets are mapped back to positions in text.
         
-        for sentence in sentences:
-            for keyword in defense_keywords:
-                if keyword in sentence:
-                    strategies.append({
-                        'strategy': keyword,
-                        'context': sentence[:200],
-                        'confidence': 0.8
-                    })
+        Args:
+            text: Text to analyze
+            sentences: Sentences of text, if already tokenized
+            stats: Optional dict accumulating windows/tokens/seconds
+        """
+        ner_model = self.ner_model
+        if not ner_model:
+            return []
         
-        return strategies
-    
-    def _extract_entities(self, text: str) -> List[Dict[str, Any]]:
-        """Extract named entities using NER model"""
-        if not self.ner_model:
+        try:
+            windows = self._ner_windows(text, sentences, ner_model)
+        except Exception as e:
+            logger.warning(f"Error extracting entities: {e}")
             return []
+        return self._run_ner([(text[a:b], a, n) for a, b, n in windows], ner_model, stats)
+    
+    def _run_ner(self, windows: List[tuple], ner_model: Any,
+                 stats: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Run NER over windows in length-bucketed batches
+        
+        Args:
+            windows: (text, offset, token_count) per window; offset is where the
+                window starts in the document
+            ner_model: NER pipeline
+            stats: Optional dict accumulating windows/tokens/seconds
         
+        Returns:
+            Entities in window order, with document offsets
+        """
+        if not windows:
+            return []
         try:
-            entities = self.ner_model(text)
-            return [
-                {
-                    'entity': ent['word'],
-                    'label': ent['entity_group'],
-                    'score': ent['score']
-                }
-                for ent in entities
-            ]
+            start_time = time.perf_counter()
+            
+            # Bucket by length: consecutive windows in sorted order have similar sizes
+            order = sorted(range(len(windows)), key=lambda i: windows[i][2])
+            window_entities = [None] * len(windows)
+            for batch_start in range(0, len(order), self.ner_batch_size):
+                batch = order[batch_start:batch_start + self.ner_batch_size]
+                outputs = ner_model(
+                    [windows[i][0] for i in batch],
+                    batch_size=self.ner_batch_size
+                )
+                for i, output in zip(batch, outputs):
+                    window_entities[i] = output
+            
+            elapsed = time.perf_counter() - start_time
+            if stats is not None:
+                stats['windows'] += len(windows)
+                stats['tokens'] += sum(w[2] for w in windows)
+                stats['seconds'] += elapsed
+            
+            entities = []
+            for (_, offset, _), output in zip(windows, window_entities):
+                for ent in output:
+                    entities.append({
+                        'entity': ent['word'],
+                        'label': ent['entity_group'],
+                        'score': float(ent['score']),
+                        'start': offset + int(ent['start']),
+                        'end': offset + int(ent['end'])
+                    })
+            return entities
+            
         except Exception as e:
             logger.warning(f"Error extracting entities: {e}")
             return []
     
+    def _ner_windows(self, text: str, sentences: Optional[List[str]] = None,
+                     ner_model: Any = None) -> List[tuple]:
+        """
+        Pack sentences into token-bounded windows
+        
+        Returns:
+            List of (start, end, token_count) character spans into text
+        """
+        if sentences is None:
+            sentences = nltk.sent_tokenize(text)
+        
+        # Locate each sentence in the text to keep exact document offsets
+        spans = []
+        cursor = 0
+        for sentence in sentences:
+            start = text.find(sentence, cursor)
+            if start < 0:
+                continue
+            spans.append((start, start + len(sentence)))
+            cursor = start + len(sentence)
+        if not spans:
+            return []
+        
+        token_counts = self._count_tokens([text[a:b] for a, b in spans], ner_model)
+        
+        windows = []
+        window_start, window_end, window_tokens = None, None, 0
+        for (start, end), n_tokens in zip(spans, token_counts):
+            if n_tokens > self.ner_max_tokens:
+                # A single over-long sentence is split at word boundaries
+                if window_start is not None:
+                    windows.append((window_start, window_end, window_tokens))
+                    window_start, window_tokens = None, 0
+                windows.extend(self._split_long_span(text, start, end, n_tokens))
+                continue
+            
+            if window_start is not None and window_tokens + n_tokens > self.ner_max_tokens:
+                windows.append((window_start, window_end, window_tokens))
+                window_start, window_tokens = None, 0
+            if window_start is None:
+                window_start = start
+            window_end = end
+            window_tokens += n_tokens
+        
+        if window_start is not None:
+            windows.append((window_start, window_end, window_tokens))
+        return windows
+    
+    def _split_long_span(self, text: str, start: int, end: int, n_tokens: int) -> List[tuple]:
+        """Split one span into word-aligned pieces of roughly ner_max_tokens tokens"""
+        words = [(m.start() + start, m.end() + start) for m in re.finditer(r'\S+', text[start:end])]
+        # Scale words per piece by the span's tokens-per-word ratio, with some headroom
+        words_per_piece = max(1, int(len(words) * self.ner_max_tokens * 0.9 / n_tokens))
+        tokens_per_word = n_tokens / max(len(words), 1)
+        pieces = []
+        for i in range(0, len(words), words_per_piece):
+            piece = words[i:i + words_per_piece]
+            pieces.append((piece[0][0], piece[-1][1], int(len(piece) * tokens_per_word) + 1))
+        return pieces
+    
+    def _count_tokens(self, texts: List[str], ner_model: Any = None) -> List[int]:
+        """Count model tokens per text (whitespace words if no tokenizer is available)"""
+        tokenizer = getattr(ner_model, 'tokenizer', None)
+        if tokenizer is not None:
+            try:
+                encoded = tokenizer(texts, add_special_tokens=False)['input_ids']
+                return [len(ids) for ids in encoded]
+            except Exception as e:
+                logger.warning(f"Could not count tokens with NER tokenizer: {e}")
+        return [len(t.split()) for t in texts]
+    
+    @staticmethod
+    def _new_ner_stats() -> Dict[str, Any]:
+        return {'windows': 0, 'tokens': 0, 'seconds': 0.0}
+    
+    def _finish_ner_stats(self, stats: Dict[str, Any]) -> Dict[str, Any]:
+        """Add throughput to accumulated NER stats and log it"""
+        stats['batch_size'] = self.ner_batch_size
+        stats['max_tokens'] = self.ner_max_tokens
+        stats['tokens_per_second'] = stats['tokens'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+        if stats['windows']:
+            logger.info(
+                f"NER: {stats['tokens']} tokens in {stats['windows']} windows, "
+                f"{stats['tokens_per_second']:.0f} tokens/s"
+            )
+        return stats
+    
     def _extract_keywords(self, text: str) -> List[str]:
         """Extract important keywords from text"""
+        # Get most common keywords
+        keyword_counts = self._count_keywords(text)
+        return [word for word, count in keyword_counts.most_common(20)]
+    
+    def _count_keywords(self, text: str) -> Counter:
+        """Count candidate keywords in a piece of text"""
         from nltk.corpus import stopwords
         from nltk.tokenize import word_tokenize
         import string
         
         try:
-            stop_words = set(stopwords.words('english'))
+            if self._stop_words is None:
+                self._stop_words = set(stopwords.words('english'))
             words = word_tokenize(text.lower())
             
-            keywords = [
+            return Counter(
                 word for word in words
-                if word not in stop_words
+                if word not in self._stop_words
                 and word not in string.punctuation
                 and len(word) > 3
-            ]
-            
-            # Get most common keywords
-            from collections import Counter
-            keyword_counts = Counter(keywords)
-            top_keywords = [word for word, count in keyword_counts.most_common(20)]
-            
-            return top_keywords
+            )
             
         except Exception as e:
             logger.warning(f"Error extracting keywords: {e}")
-            return []
+            return Counter()
     
-    def _generate_summary(self, text: str, max_length: int = 200) -> str:
+    def _generate_summary(self, text: str, max_length: int = 200,
+                          sentences: Optional[List[str]] = None) -> str:
         """Generate a summary of the document"""
-        sentences = nltk.sent_tokenize(text)
+        if sentences is None:
+            sentences = nltk.sent_tokenize(text)
         
         if len(sentences) <= 3:
             return text[:max_length]
@@ -6,9 +6,11 @@ Downloads documents from Google Drive links and processes them
 import logging
 import os
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, Optional, List, Any
 import re
+import threading
 from urllib.parse import urlparse, parse_qs
 import zipfile
 import tempfile
@@ -17,12 +19,25 @@ logger = logging.getLogger(__name__)
 
 
 class DriveDownloader:
-    """Download files from Google Drive links"""
+    """Download files from Google Drive links
+    
+    Safe to use from several threads: each thread gets its own HTTP session,
+    and each download is written to a directory of its own, so files with
+    the same name never overwrite each other.
+    """
     
     def __init__(self, download_dir: str = "downloads"):
         self.download_dir = Path(download_dir)
         self.download_dir.mkdir(parents=True, exist_ok=True)
-        self.session = requests.Session()
+        self._local = threading.local()
+    
+    @property
+    def session(self) -> requests.Session:
+        """HTTP session of the calling thread (requests.Session is not thread-safe)"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
     
     def download_from_drive_link(self, drive_link: str, filename: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -120,7 +135,7 @@ class DriveDownloader:
             else:
                 filename = f"drive_file_{file_id}"
         
-        file_path = self.download_dir / filename
+        file_path = self._new_file_path(filename, file_id)
         
         # Download file
         total_size = int(response.headers.get('content-length', 0))
@@ -145,6 +160,11 @@ class DriveDownloader:
             'file_id': file_id
         }
     
+    def _new_file_path(self, filename: str, key: str) -> Path:
+        """Path for a new download named filename, in a fresh directory under download_dir"""
+        directory = tempfile.mkdtemp(prefix=f"{key}_", dir=self.download_dir)
+        return Path(directory) / (os.path.basename(filename) or key)
+    
     def _download_folder(self, folder_id: str, base_filename: Optional[str] = None) -> Dict[str, Any]:
         """
         Download all files from a Google Drive folder
@@ -179,9 +199,9 @@ class DriveDownloader:
             parsed_url = urlparse(url)
             filename = os.path.basename(parsed_url.path) or f"downloaded_file_{hash(url)}"
         
-        file_path = self.download_dir / filename
+        file_path = self._new_file_path(filename, 'url')
         
-        response = requests.get(url, stream=True)
+        response = self.session.get(url, stream=True)
         response.raise_for_status()
         
         total_size = int(response.headers.get('content-length', 0))
@@ -203,21 +223,23 @@ class DriveDownloader:
             'url': url
         }
     
-    def download_multiple(self, links: List[str]) -> Dict[str, List[Dict[str, Any]]]:
-        """Download multiple files from links"""
+    def download_multiple(self, links: List[str], max_workers: int = 4) -> Dict[str, List[Dict[str, Any]]]:
+        """Download multiple files from links, up to max_workers at a time"""
         results = {
             'successful': [],
             'failed': []
         }
         
-        for link in links:
-            try:
-                result = self.download_from_url(link)
-                results['successful'].append(result)
-            except Exception as e:
-                results['failed'].append({
-                    'link': link,
-                    'error': str(e)
-                })
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = [executor.submit(self.download_from_url, link) for link in links]
+            # Report in input order
+            for link, future in zip(links, futures):
+                try:
+                    results['successful'].append(future.result())
+                except Exception as e:
+                    results['failed'].append({
+                        'link': link,
+                        'error': str(e)
+                    })
         
         return results
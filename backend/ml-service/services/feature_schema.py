@@ -0,0 +1,120 @@
+"""
+Feature Schema
+Declarative, fixed-column feature layout shared by threat detection and training
+"""
+
+import logging
+from typing import Dict, List, Any, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# (group, key, kind) - column index is the position in this tuple.
+# kind 'value' reads a number, 'count' reads the length of a list.
+# Append new features at the end so existing column indices stay stable.
+THREAT_FEATURES: Tuple[Tuple[str, str, str], ...] = (
+    ('network', 'packet_count', 'value'),
+    ('network', 'bytes_transferred', 'value'),
+    ('network', 'connection_count', 'value'),
+    ('network', 'port_count', 'value'),
+    ('system_logs', 'error_logs', 'count'),
+    ('system_logs', 'warning_logs', 'count'),
+    ('system_logs', 'process_count', 'value'),
+    ('system_logs', 'file_access_count', 'value'),
+    ('behavior', 'suspicious_file_access', 'value'),
+    ('behavior', 'unusual_network_activity', 'value'),
+    ('behavior', 'privilege_escalation', 'value'),
+    ('behavior', 'unknown_processes', 'value'),
+    ('email', 'suspicious_count', 'value'),
+    ('email', 'suspicious_links', 'value'),
+)
+
+
+class FeatureSchema:
+    """Map nested event fields to fixed column indices of a NumPy feature array"""
+
+    def __init__(self, features: Tuple[Tuple[str, str, str], ...] = THREAT_FEATURES,
+                 dtype: Any = np.float64):
+        self.features = tuple(features)
+        self.dtype = np.dtype(dtype)
+        self.names = tuple(f"{group}.{key}" for group, key, _ in self.features)
+        self.n_features = len(self.features)
+        self.index = {name: col for col, name in enumerate(self.names)}
+
+        # Group columns by input section so each section is looked up once per event
+        groups: Dict[str, List[Tuple[int, str, bool]]] = {}
+        for col, (group, key, kind) in enumerate(self.features):
+            if kind not in ('value', 'count'):
+                raise ValueError(f"Unknown feature kind '{kind}' for {group}.{key}")
+            groups.setdefault(group, []).append((col, key, kind == 'count'))
+        self._groups = tuple((group, tuple(cols)) for group, cols in groups.items())
+
+    def column(self, name: str) -> int:
+        """Get the column index of a feature, e.g. 'behavior.privilege_escalation'"""
+        try:
+            return self.index[name]
+        except KeyError:
+            raise ValueError(f"Unknown feature: {name}")
+
+    def empty(self, n_rows: int = 1) -> np.ndarray:
+        """Allocate a zeroed (n_rows x n_features) feature array"""
+        return np.zeros((n_rows, self.n_features), dtype=self.dtype)
+
+    def has_features(self, data: Dict[str, Any]) -> bool:
+        """Check whether an event contains any section known to the schema"""
+        return any(data.get(group) for group, _ in self._groups)
+
+    def fill_row(self, data: Dict[str, Any], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Write the features of one event into a preallocated row
+
+        Args:
+            data: Event dict with network/system_logs/behavior/email sections
+            out: 1-D array of length n_features to fill (allocated if None)
+
+        Returns:
+            The filled row
+        """
+        if out is None:
+            out = np.zeros(self.n_features, dtype=self.dtype)
+        else:
+            out.fill(0)
+
+        for group, columns in self._groups:
+            section = data.get(group)
+            if not section:
+                continue
+            for col, key, is_count in columns:
+                value = section.get(key)
+                if value:
+                    out[col] = len(value) if is_count else value
+
+        return out
+
+    def fill_matrix(self, events: List[Dict[str, Any]], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Write the features of a batch of events into a preallocated matrix
+
+        Args:
+            events: List of event dicts
+            out: (>= len(events) x n_features) array to fill (allocated if None)
+
+        Returns:
+            View of out with one row per event
+        """
+        if out is None:
+            out = self.empty(len(events))
+        elif out.shape[0] < len(events) or out.shape[1] != self.n_features:
+            raise ValueError(
+                f"Output array {out.shape} too small for {len(events)} x {self.n_features} features"
+            )
+
+        for i, data in enumerate(events):
+            self.fill_row(data, out[i])
+
+        return out[:len(events)]
+
+
+# Shared layout used for both inference (ThreatDetector) and training (SelfLearningEngine)
+THREAT_FEATURE_SCHEMA = FeatureSchema()
@@ -0,0 +1,179 @@
+"""
+Inference Backend
+Loads Hugging Face pipelines on PyTorch or on ONNX Runtime with int8 quantization
+"""
+
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Any, Iterable, Optional
+from transformers import AutoTokenizer, pipeline
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('pytorch', 'onnx')
+
+# Where exported and quantized ONNX models are cached between runs
+DEFAULT_ONNX_CACHE_DIR = os.path.join("models", "onnx")
+
+# Pipeline task -> optimum ORTModel class name
+_ORT_MODEL_CLASSES = {
+    'ner': 'ORTModelForTokenClassification',
+    'token-classification': 'ORTModelForTokenClassification',
+    'text-classification': 'ORTModelForSequenceClassification',
+}
+
+
+def onnx_available() -> bool:
+    """Check whether the optional ONNX Runtime dependencies (optimum[onnxruntime]) are installed"""
+    try:
+        import onnxruntime  # noqa: F401
+        import optimum.onnxruntime  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def load_pipeline(task: str, model_name: str, backend: str = 'pytorch',
+                  cache_dir: Optional[str] = None, quantize: bool = True,
+                  **pipeline_kwargs) -> Any:
+    """
+    Load a Hugging Face pipeline on the requested backend
+
+    Args:
+        task: Pipeline task ('ner' or 'text-classification')
+        model_name: Hugging Face model id
+        backend: 'pytorch' or 'onnx'; 'onnx' falls back to PyTorch if
+            optimum/onnxruntime are not installed or the export fails
+        cache_dir: Cache directory for ONNX exports
+        quantize: Apply dynamic int8 quantization to the ONNX model
+        **pipeline_kwargs: Extra pipeline arguments (e.g. aggregation_strategy)
+
+    Returns:
+        Callable pipeline
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {BACKENDS}")
+
+    if backend == 'onnx':
+        if not onnx_available():
+            logger.warning("ONNX backend requested but optimum[onnxruntime] is not installed; using PyTorch")
+        else:
+            try:
+                return load_onnx_pipeline(task, model_name, cache_dir, quantize, **pipeline_kwargs)
+            except Exception as e:
+                logger.warning(f"Could not load ONNX model for {model_name} ({e}); using PyTorch")
+
+    return pipeline(task, model=model_name, **pipeline_kwargs)
+
+
+def load_onnx_pipeline(task: str, model_name: str, cache_dir: Optional[str] = None,
+                       quantize: bool = True, **pipeline_kwargs) -> Any:
+    """
+    Export a model to ONNX (once), quantize it and wrap it in a pipeline
+
+    The export and the quantized model are cached under
+    cache_dir/<model name>/, so only the first load pays for the conversion.
+    """
+    import optimum.onnxruntime as ort
+
+    model_class = getattr(ort, _ORT_MODEL_CLASSES[task])
+    model_dir = Path(cache_dir or DEFAULT_ONNX_CACHE_DIR) / model_name.replace('/', '__')
+    export_dir = model_dir / "fp32"
+    quantized_dir = model_dir / "int8"
+
+    if not (export_dir / "model.onnx").exists():
+        logger.info(f"Exporting {model_name} to ONNX in {export_dir}")
+        model = model_class.from_pretrained(model_name, export=True)
+        model.save_pretrained(export_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(export_dir)
+
+    load_dir, file_name = export_dir, "model.onnx"
+    if quantize:
+        if not (quantized_dir / "model_quantized.onnx").exists():
+            logger.info(f"Quantizing {model_name} (dynamic int8) in {quantized_dir}")
+            quantizer = ort.ORTQuantizer.from_pretrained(export_dir, file_name="model.onnx")
+            quantizer.quantize(save_dir=quantized_dir, quantization_config=_quantization_config())
+            AutoTokenizer.from_pretrained(export_dir).save_pretrained(quantized_dir)
+        load_dir, file_name = quantized_dir, "model_quantized.onnx"
+
+    model = model_class.from_pretrained(load_dir, file_name=file_name)
+    tokenizer = AutoTokenizer.from_pretrained(load_dir)
+    return pipeline(task, model=model, tokenizer=tokenizer, **pipeline_kwargs)
+
+
+def _quantization_config() -> Any:
+    """Dynamic (calibration-free) int8 config for the widest instruction set of this CPU"""
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    flags = ''
+    try:
+        with open('/proc/cpuinfo') as f:
+            flags = f.read()
+    except OSError:
+        pass
+    if 'avx512_vnni' in flags:
+        return AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+    if 'avx512f' in flags:
+        return AutoQuantizationConfig.avx512(is_static=False, per_channel=False)
+    if 'avx2' in flags:
+        return AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+    return AutoQuantizationConfig.arm64(is_static=False, per_channel=False)
+
+
+def _entity_key(entity: Dict[str, Any]) -> tuple:
+    return entity.get('entity_group', entity.get('entity')), entity.get('start'), entity.get('end')
+
+
+def check_parity(task: str, reference: Any, candidate: Any, texts: Iterable[str]) -> Dict[str, Any]:
+    """
+    Compare a candidate pipeline (e.g. quantized ONNX) against a reference (PyTorch)
+
+    For NER the reference entities are treated as ground truth and entity-level
+    precision/recall/F1 are reported on exact (label, start, end) matches. For
+    text classification the label agreement rate is reported. Both include the
+    largest absolute score difference on agreeing predictions.
+
+    Returns:
+        Dictionary of parity metrics
+    """
+    texts = list(texts)
+    max_score_diff = 0.0
+
+    if task in ('ner', 'token-classification'):
+        true_positives = n_reference = n_candidate = 0
+        for text in texts:
+            ref = {_entity_key(e): float(e['score']) for e in reference(text)}
+            cand = {_entity_key(e): float(e['score']) for e in candidate(text)}
+            n_reference += len(ref)
+            n_candidate += len(cand)
+            for key in ref.keys() & cand.keys():
+                true_positives += 1
+                max_score_diff = max(max_score_diff, abs(ref[key] - cand[key]))
+        precision = true_positives / n_candidate if n_candidate else 1.0
+        recall = true_positives / n_reference if n_reference else 1.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        return {
+            'task': task,
+            'texts': len(texts),
+            'reference_entities': n_reference,
+            'candidate_entities': n_candidate,
+            'precision': precision,
+            'recall': recall,
+            'f1': f1,
+            'max_score_diff': max_score_diff,
+        }
+
+    agree = 0
+    for text in texts:
+        ref = reference(text)[0]
+        cand = candidate(text)[0]
+        if ref['label'] == cand['label']:
+            agree += 1
+            max_score_diff = max(max_score_diff, abs(float(ref['score']) - float(cand['score'])))
+    return {
+        'task': task,
+        'texts': len(texts),
+        'label_agreement': agree / len(texts) if texts else 1.0,
+        'max_score_diff': max_score_diff,
+    }
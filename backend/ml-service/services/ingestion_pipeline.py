@@ -0,0 +1,216 @@
+"""
+Ingestion Pipeline
+Overlaps network-bound downloads with CPU-bound document processing
+"""
+
+import logging
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Callable, Iterable, Iterator, Optional
+
+from services.document_processor import DocumentProcessor
+
+logger = logging.getLogger(__name__)
+
+# DocumentProcessor of a worker process, built once by the pool initializer
+_worker_processor: Optional[DocumentProcessor] = None
+
+
+def _init_worker(processor_config: Dict[str, Any]):
+    global _worker_processor
+    _worker_processor = DocumentProcessor(**processor_config)
+
+
+def _process_in_worker(document_id: str, file_path: str, file_type: str,
+                       content_hash: Optional[str]) -> Dict[str, Any]:
+    # Caching is done by the parent process, which owns the cache backend
+    return _worker_processor.process_document(
+        document_id, file_path, file_type, use_cache=False, content_hash=content_hash
+    )
+
+
+class IngestionPipeline:
+    """Download links on an I/O thread pool and process documents on a process pool
+
+    Download threads put finished downloads on a bounded queue; when processing
+    falls behind they block, which also bounds the number of downloaded files
+    waiting on disk. The caller's thread moves queued documents to the process
+    pool and runs each link's finish step as soon as its document is processed,
+    so results are yielded in completion order.
+
+    Every worker process builds its own DocumentProcessor and loads its own
+    NLP models, so each process worker costs a full model's worth of memory.
+    With process_workers=0 documents are processed in the calling thread.
+    """
+
+    def __init__(self, processor: DocumentProcessor,
+                 processor_config: Optional[Dict[str, Any]] = None,
+                 download_workers: int = 4,
+                 process_workers: int = 2,
+                 queue_size: int = 8):
+        """
+        Args:
+            processor: Processor of this process, used for cache lookups and
+                for in-process processing
+            processor_config: DocumentProcessor keyword arguments for worker processes
+            download_workers: Concurrent downloads
+            process_workers: Worker processes for document processing (0 = in-process)
+            queue_size: Downloaded documents that may wait for processing
+        """
+        self.processor = processor
+        self.processor_config = dict(processor_config or {})
+        self.download_workers = max(1, download_workers)
+        self.process_workers = max(0, process_workers)
+        self.queue_size = max(1, queue_size)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: forking a process that holds model threads and DB drivers is unsafe.
+                # Spawned workers re-run the main module, which must not start the
+                # service (see server.py)
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.process_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(self.processor_config,)
+                )
+                logger.info(f"Started {self.process_workers} document processing workers")
+            return self._pool
+
+    def shutdown(self):
+        """Stop the worker processes (they are restarted on the next run)"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+
+    def _submit(self, job: Dict[str, Any]) -> Future:
+        args = (job['document_id'], job['file_path'], job['file_type'], job.get('content_hash'))
+        if self.process_workers:
+            return self._get_pool().submit(_process_in_worker, *args)
+
+        future = Future()
+        try:
+            future.set_result(self.processor.process_document(*args[:3], use_cache=False, content_hash=args[3]))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def run(self, links: Iterable[str],
+            download: Callable[[str], Dict[str, Any]],
+            finish: Callable[[str, Dict[str, Any], Dict[str, Any]], Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Ingest links, yielding one result per link as it completes
+
+        Args:
+            links: Links to ingest
+            download: Called on a download thread; returns a job dict with
+                'success' and, on success, 'document_id', 'file_path',
+                'file_type' and optionally 'content_hash'
+            finish: Called on the caller's thread with (link, job, extracted
+                data) for every processed document; returns the link's result
+
+        Yields:
+            The finish() result per link, or {'success': False, 'link', 'error', ...}
+            for links that failed to download or process
+        """
+        links = list(links)
+        if not links:
+            return
+
+        ready: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+
+        def fetch(link: str):
+            try:
+                job = download(link)
+            except Exception as e:
+                job = {'success': False, 'error': str(e)}
+            while not stop.is_set():
+                try:
+                    ready.put((link, job), timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+
+        downloads = ThreadPoolExecutor(max_workers=self.download_workers, thread_name_prefix='ingest-download')
+        for link in links:
+            downloads.submit(fetch, link)
+
+        # Keep every worker busy with one document queued behind it
+        max_in_flight = 2 * max(1, self.process_workers)
+        pending: Dict[Future, tuple] = {}
+        not_dequeued = len(links)
+
+        try:
+            while not_dequeued or pending:
+                while not_dequeued and len(pending) < max_in_flight:
+                    try:
+                        link, job = ready.get(timeout=0.05 if pending else None)
+                    except queue.Empty:
+                        break
+                    not_dequeued -= 1
+
+                    if not job.get('success'):
+                        yield {**job, 'success': False, 'link': link}
+                        continue
+
+                    cached = self.processor.get_cached_result(
+                        job['document_id'], job['file_path'], job['file_type'],
+                        content_hash=job.get('content_hash')
+                    )
+                    if cached is not None:
+                        yield self._finish(finish, link, job, cached)
+                    else:
+                        pending[self._submit(job)] = (link, job)
+
+                if not pending:
+                    continue
+                done, _ = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+                for future in done:
+                    link, job = pending.pop(future)
+                    try:
+                        extracted_data = future.result()
+                    except Exception as e:
+                        if isinstance(e, BrokenProcessPool):
+                            self._reset_pool()
+                        logger.error(f"Error processing {link}: {e}")
+                        yield {'success': False, 'link': link, 'error': str(e)}
+                        continue
+                    self.processor.cache_result(
+                        job['file_path'], job['file_type'], extracted_data,
+                        content_hash=job.get('content_hash')
+                    )
+                    yield self._finish(finish, link, job, extracted_data)
+        finally:
+            stop.set()
+            for future in pending:
+                future.cancel()
+            downloads.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _finish(finish: Callable, link: str, job: Dict[str, Any], extracted_data: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return finish(link, job, extracted_data)
+        except Exception as e:
+            logger.error(f"Error finishing {link}: {e}")
+            return {'success': False, 'link': link, 'error': str(e)}
+
+    def _reset_pool(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def get_config(self) -> Dict[str, Any]:
+        return {
+            'download_workers': self.download_workers,
+            'process_workers': self.process_workers,
+            'queue_size': self.queue_size,
+        }
@@ -0,0 +1,347 @@
+"""
+Job Queue
+Runs long learning/training requests on background workers, tracked in Redis
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+JOB_STATES = ('queued', 'running', 'succeeded', 'failed', 'cancelled')
+FINISHED_STATES = ('succeeded', 'failed', 'cancelled')
+
+
+class JobCancelled(BaseException):
+    """Raised inside a handler when its job was cancelled
+
+    A BaseException, like asyncio.CancelledError, so that the `except Exception`
+    error handling in handlers and the services they call lets it through.
+    """
+
+
+class JobContext:
+    """Handle given to job handlers for progress reporting and cooperative cancellation"""
+
+    # Progress writes closer together than this are dropped (except the last one)
+    PROGRESS_INTERVAL_SECONDS = 0.5
+
+    def __init__(self, job_queue: 'JobQueue', job_id: str):
+        self.job_queue = job_queue
+        self.job_id = job_id
+        self._last_progress = 0.0
+
+    def update_progress(self, progress: float, message: Optional[str] = None):
+        """Report progress in [0, 1]; raises JobCancelled if the job was cancelled"""
+        now = time.time()
+        if progress < 1.0 and now - self._last_progress < self.PROGRESS_INTERVAL_SECONDS:
+            return
+        self._last_progress = now
+        fields = {'progress': round(min(max(progress, 0.0), 1.0), 4)}
+        if message is not None:
+            fields['message'] = message
+        self.job_queue.store.update(self.job_id, fields)
+        self.check_cancelled()
+
+    def is_cancelled(self) -> bool:
+        return self.job_queue.store.get_field(self.job_id, 'cancel_requested') == '1'
+
+    def check_cancelled(self):
+        if self.is_cancelled():
+            raise JobCancelled(self.job_id)
+
+
+class _RedisJobStore:
+    """Jobs as Redis hashes plus a shared pending list, so any process's workers can run them"""
+
+    # Sets fields only if the job's state is one of the given states, atomically
+    # ARGV: number of states, the states, then field/value pairs
+    _TRANSITION_SCRIPT = """
+local state = redis.call('HGET', KEYS[1], 'state')
+if not state then return 0 end
+local n = tonumber(ARGV[1])
+for i = 2, n + 1 do
+    if ARGV[i] == state then
+        redis.call('HSET', KEYS[1], unpack(ARGV, n + 2))
+        return 1
+    end
+end
+return 0
+"""
+
+    def __init__(self, redis_client, prefix: str = 'ml_jobs'):
+        self.redis = redis_client
+        self.prefix = prefix
+        self.queue_key = f"{prefix}:queue"
+        self._transition = redis_client.register_script(self._TRANSITION_SCRIPT)
+
+    def _key(self, job_id: str) -> str:
+        return f"{self.prefix}:{job_id}"
+
+    def create(self, job: Dict[str, str]):
+        pipe = self.redis.pipeline()
+        pipe.hset(self._key(job['id']), mapping=job)
+        pipe.rpush(self.queue_key, job['id'])
+        pipe.execute()
+
+    def update(self, job_id: str, fields: Dict[str, Any]):
+        self.redis.hset(self._key(job_id), mapping={k: str(v) for k, v in fields.items()})
+
+    def transition(self, job_id: str, from_states: Tuple[str, ...], fields: Dict[str, Any]) -> bool:
+        """Update fields if the job is in one of from_states (compare-and-set); returns whether it was"""
+        args = [len(from_states), *from_states]
+        for k, v in fields.items():
+            args += [k, str(v)]
+        return bool(self._transition(keys=[self._key(job_id)], args=args))
+
+    def get(self, job_id: str) -> Optional[Dict[str, str]]:
+        return self.redis.hgetall(self._key(job_id)) or None
+
+    def get_field(self, job_id: str, field: str) -> Optional[str]:
+        return self.redis.hget(self._key(job_id), field)
+
+    def pop(self, timeout: float) -> Optional[str]:
+        item = self.redis.blpop(self.queue_key, timeout=max(1, int(timeout)))
+        return item[1] if item else None
+
+    def expire(self, job_id: str, ttl_seconds: int):
+        self.redis.expire(self._key(job_id), ttl_seconds)
+
+    def queue_length(self) -> int:
+        return self.redis.llen(self.queue_key)
+
+
+class _MemoryJobStore:
+    """In-process fallback when Redis is unavailable (jobs are not shared across processes)"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, str]] = {}
+        self._expires: Dict[str, float] = {}
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+
+    def create(self, job: Dict[str, str]):
+        with self._lock:
+            self._purge()
+            self._jobs[job['id']] = dict(job)
+        self._queue.put(job['id'])
+
+    def update(self, job_id: str, fields: Dict[str, Any]):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update({k: str(v) for k, v in fields.items()})
+
+    def transition(self, job_id: str, from_states: Tuple[str, ...], fields: Dict[str, Any]) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.get('state') not in from_states:
+                return False
+            job.update({k: str(v) for k, v in fields.items()})
+            return True
+
+    def get(self, job_id: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def get_field(self, job_id: str, field: str) -> Optional[str]:
+        with self._lock:
+            return self._jobs.get(job_id, {}).get(field)
+
+    def pop(self, timeout: float) -> Optional[str]:
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def expire(self, job_id: str, ttl_seconds: int):
+        with self._lock:
+            self._expires[job_id] = time.time() + ttl_seconds
+
+    def _purge(self):
+        now = time.time()
+        for job_id in [j for j, at in self._expires.items() if at <= now]:
+            self._jobs.pop(job_id, None)
+            self._expires.pop(job_id, None)
+
+    def queue_length(self) -> int:
+        return self._queue.qsize()
+
+
+class JobQueue:
+    """Submit, track, cancel and collect results of background jobs
+
+    Submitting only writes the job record and enqueues its ID, so the HTTP
+    request path stays constant-time. Worker threads pop job IDs and run the
+    handler registered for the job type. With Redis every process registers
+    the same handlers, so a job submitted to one gunicorn worker can run on
+    any process that started workers (normally worker.py processes).
+    Cancellation is cooperative: queued jobs never start, running jobs stop at
+    their next progress update. State changes are compare-and-set, so a
+    cancel racing a worker never lets a cancelled job start or be overwritten.
+    """
+
+    def __init__(self, redis_client=None, result_ttl_seconds: int = 24 * 3600):
+        """
+        Args:
+            redis_client: Redis client (decode_responses=True); falls back to an
+                in-memory store if None or unreachable
+            result_ttl_seconds: How long finished jobs and their results are kept
+        """
+        self.result_ttl_seconds = result_ttl_seconds
+        self.handlers: Dict[str, Callable[[Dict[str, Any], JobContext], Any]] = {}
+        self._workers: List[threading.Thread] = []
+        self._stop = threading.Event()
+
+        self.store = None
+        if redis_client is not None:
+            try:
+                redis_client.ping()
+                self.store = _RedisJobStore(redis_client)
+            except Exception as e:
+                logger.warning(f"Redis unavailable for jobs ({e}); using in-memory job store")
+        if self.store is None:
+            self.store = _MemoryJobStore()
+
+    @property
+    def backend(self) -> str:
+        return 'redis' if isinstance(self.store, _RedisJobStore) else 'memory'
+
+    def register(self, job_type: str, handler: Callable[[Dict[str, Any], JobContext], Any]):
+        """
+        Register a handler for a job type
+
+        Args:
+            job_type: Job type name, e.g. 'training'
+            handler: Called as handler(params, context); returns a JSON-serializable result
+        """
+        self.handlers[job_type] = handler
+
+    def submit(self, job_type: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Queue a job; returns its status"""
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+
+        job = {
+            'id': uuid.uuid4().hex,
+            'type': job_type,
+            'state': 'queued',
+            'progress': '0',
+            'message': '',
+            'submitted_at': str(time.time()),
+            'cancel_requested': '0',
+            'params': json.dumps(params or {}, default=str),
+        }
+        self.store.create(job)
+        logger.info(f"Queued {job_type} job {job['id']}")
+        return self._status(job)
+
+    def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job's state and progress (None if unknown or expired)"""
+        job = self.store.get(job_id)
+        return self._status(job) if job else None
+
+    def get_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job's status together with its result or error (None if unknown)"""
+        job = self.store.get(job_id)
+        if not job:
+            return None
+        status = self._status(job)
+        if job.get('result'):
+            status['result'] = json.loads(job['result'])
+        return status
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Request cancellation; returns the job status (None if unknown)"""
+        # State changes are compare-and-set, so a worker starting the job at the
+        # same moment either sees it cancelled or has it flagged while running
+        if self.store.transition(job_id, ('queued',), {
+                'state': 'cancelled', 'cancel_requested': '1', 'finished_at': time.time()}):
+            self.store.expire(job_id, self.result_ttl_seconds)
+        else:
+            self.store.transition(job_id, ('running',), {'cancel_requested': '1'})
+        return self.get_status(job_id)
+
+    @staticmethod
+    def _status(job: Dict[str, str]) -> Dict[str, Any]:
+        def number(field):
+            value = job.get(field)
+            return float(value) if value else None
+
+        return {
+            'job_id': job['id'],
+            'type': job.get('type'),
+            'state': job.get('state'),
+            'progress': number('progress') or 0.0,
+            'message': job.get('message') or None,
+            'error': job.get('error') or None,
+            'submitted_at': number('submitted_at'),
+            'started_at': number('started_at'),
+            'finished_at': number('finished_at'),
+            'cancel_requested': job.get('cancel_requested') == '1',
+        }
+
+    def start_workers(self, count: int = 2):
+        """Start worker threads that run queued jobs"""
+        for _ in range(count):
+            worker = threading.Thread(target=self._work, name=f"job-worker-{len(self._workers)}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        if count:
+            logger.info(f"Started {count} job workers ({self.backend} store)")
+
+    def stop_workers(self, timeout: float = 5.0):
+        self._stop.set()
+        for worker in self._workers:
+            worker.join(timeout=timeout)
+        self._workers = []
+        self._stop.clear()
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                job_id = self.store.pop(timeout=1.0)
+            except Exception as e:
+                logger.error(f"Job queue unavailable: {e}")
+                self._stop.wait(5.0)
+                continue
+            if job_id:
+                self.run_job(job_id)
+
+    def run_job(self, job_id: str):
+        """Run one job in the calling thread (normally a worker)"""
+        job = self.store.get(job_id)
+        if not job or not self.store.transition(job_id, ('queued',), {'state': 'running', 'started_at': time.time()}):
+            return  # expired or cancelled while queued
+
+        handler = self.handlers.get(job['type'])
+        fields: Dict[str, Any]
+        try:
+            if handler is None:
+                raise ValueError(f"No handler registered for job type {job['type']}")
+            result = handler(json.loads(job.get('params') or '{}'), JobContext(self, job_id))
+            fields = {'state': 'succeeded', 'progress': 1.0, 'result': json.dumps(result, default=str)}
+            logger.info(f"Job {job_id} ({job['type']}) succeeded")
+        except JobCancelled:
+            fields = {'state': 'cancelled'}
+            logger.info(f"Job {job_id} ({job['type']}) cancelled")
+        except Exception as e:
+            fields = {'state': 'failed', 'error': str(e)}
+            logger.error(f"Job {job_id} ({job['type']}) failed: {e}")
+
+        fields['finished_at'] = time.time()
+        self.store.transition(job_id, ('running',), fields)
+        self.store.expire(job_id, self.result_ttl_seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'backend': self.backend,
+            'workers': len(self._workers),
+            'queued': self.store.queue_length(),
+            'job_types': sorted(self.handlers),
+        }
@@ -0,0 +1,173 @@
+"""
+Keyword Matcher
+Finds many keywords and CVE identifiers in a single regex pass per sentence
+"""
+
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordMatcher:
+    """Multi-pattern matcher over categorized keyword dictionaries
+
+    All keywords are compiled into one trie-shaped regex, so the cost per
+    text position depends on the keyword length rather than the number of
+    keywords. Matching is case-insensitive substring matching, the same
+    semantics as `keyword in sentence.lower()`. The regex runs on the
+    lowercased sentence without re.IGNORECASE, which would disable the
+    first-character prefilter and be several times slower.
+
+    Up to SMALL_DICTIONARY_SIZE keywords, per-keyword `in` scans (memchr-based
+    C loops) beat any regex, so small dictionaries use those instead.
+    """
+
+    CVE_PATTERN = r'CVE-\d{4}-\d{4,7}'
+
+    SMALL_DICTIONARY_SIZE = 64
+
+    def __init__(self, dictionaries: Optional[Dict[str, Iterable[str]]] = None, match_cves: bool = True):
+        self.match_cves = match_cves
+        self.dictionaries: Dict[str, List[str]] = {}
+        for category, keywords in (dictionaries or {}).items():
+            self._add(category, keywords)
+        self.compile()
+
+    @staticmethod
+    def load_dictionary_file(path: str) -> Dict[str, List[str]]:
+        """
+        Load keyword dictionaries from a file
+
+        Args:
+            path: JSON file mapping category -> list of keywords
+                (e.g. MITRE ATT&CK technique names)
+
+        Returns:
+            Dictionary of category -> keywords
+        """
+        with open(Path(path), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError(f"Keyword dictionary {path} must map categories to keyword lists")
+        return {category: list(keywords) for category, keywords in data.items()}
+
+    def add_keywords(self, category: str, keywords: Iterable[str]):
+        """Add keywords to a category and recompile the matcher"""
+        self._add(category, keywords)
+        self.compile()
+
+    def _add(self, category: str, keywords: Iterable[str]):
+        existing = self.dictionaries.setdefault(category, [])
+        seen = set(existing)
+        for keyword in keywords:
+            keyword = (keyword or '').strip().lower()
+            if keyword and keyword not in seen:
+                existing.append(keyword)
+                seen.add(keyword)
+
+    def compile(self):
+        """Build the trie regex and per-keyword lookup tables"""
+        # Keyword ids follow dictionary order, so sorting ids restores that order
+        self._entries: List[Tuple[str, str]] = []
+        ids_by_keyword: Dict[str, List[int]] = {}
+        for category, keywords in self.dictionaries.items():
+            for keyword in keywords:
+                ids_by_keyword.setdefault(keyword, []).append(len(self._entries))
+                self._entries.append((category, keyword))
+
+        trie: Dict[str, Any] = {}
+        for keyword in ids_by_keyword:
+            node = trie
+            for ch in keyword:
+                node = node.setdefault(ch, {})
+            node[''] = True
+
+        # The regex reports the longest keyword starting at each position;
+        # shorter keywords that are prefixes of it are looked up here
+        self._ids_for_match: Dict[str, Tuple[int, ...]] = {}
+        for keyword in ids_by_keyword:
+            ids = []
+            for end in range(1, len(keyword) + 1):
+                ids.extend(ids_by_keyword.get(keyword[:end], ()))
+            self._ids_for_match[keyword] = tuple(sorted(ids))
+
+        # (keyword, ids) pairs for the scan strategy used by small dictionaries
+        self._small = None
+        if len(ids_by_keyword) <= self.SMALL_DICTIONARY_SIZE:
+            self._small = tuple((keyword, tuple(ids)) for keyword, ids in ids_by_keyword.items())
+
+        alternatives = []
+        if self.match_cves:
+            alternatives.append(f"(?P<cve>{self.CVE_PATTERN.lower()})")
+        if trie:
+            alternatives.append(f"(?P<kw>{self._trie_pattern(trie)})")
+        self._pattern = re.compile("|".join(alternatives)) if alternatives else None
+        self._cve_pattern = re.compile(self.CVE_PATTERN)
+
+    @classmethod
+    def _trie_pattern(cls, node: Dict[str, Any]) -> str:
+        """Convert a trie node into a regex; optional groups are greedy so matches are longest-first"""
+        branches = [re.escape(ch) + cls._trie_pattern(child)
+                    for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        if '' in node:
+            pattern = f"(?:{pattern})?"
+        return pattern
+
+    def match(self, sentence: str) -> Tuple[Dict[str, List[str]], List[str]]:
+        """
+        Find keywords and CVE identifiers in one sentence
+
+        Returns:
+            Tuple of (category -> matched keywords in dictionary order, each
+            reported once; CVE identifiers in order of appearance)
+        """
+        cves: List[str] = []
+        if self._pattern is None:
+            return {}, cves
+
+        lowered = sentence.lower()
+
+        if self._small is not None:
+            ids = [i for keyword, keyword_ids in self._small if keyword in lowered for i in keyword_ids]
+            if self.match_cves and 'cve-' in lowered:
+                cves = self._cve_pattern.findall(sentence)
+            return self._group(ids), cves
+
+        # CVE IDs are case-sensitive; offsets only carry over if lower() kept the length
+        same_offsets = len(lowered) == len(sentence)
+        if self.match_cves and not same_offsets:
+            cves = self._cve_pattern.findall(sentence)
+
+        ids = set()
+        search = self._pattern.search
+        m = search(lowered)
+        while m:
+            if self.match_cves and m.group('cve'):
+                if same_offsets and self._cve_pattern.fullmatch(sentence, m.start(), m.end()):
+                    cves.append(sentence[m.start():m.end()])
+                m = search(lowered, m.end())
+            else:
+                ids.update(self._ids_for_match[m.group('kw')])
+                # Resume right after the match start so overlapping keywords are found too;
+                # search() skips non-candidate positions using the first-character set
+                m = search(lowered, m.start() + 1)
+
+        return self._group(ids), cves
+
+    def _group(self, ids: Iterable[int]) -> Dict[str, List[str]]:
+        """Group matched keyword ids by category, in dictionary order"""
+        found: Dict[str, List[str]] = {}
+        for keyword_id in sorted(ids):
+            category, keyword = self._entries[keyword_id]
+            found.setdefault(category, []).append(keyword)
+        return found
+
+    def __len__(self) -> int:
+        return len(self._entries)
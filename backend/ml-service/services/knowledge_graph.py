@@ -5,156 +5,349 @@ Fully wired: uses Neo4j when available; falls back to in-memory store when Neo4j
 """
 
 import logging
-from typing import Dict, List, Any, Optional, TYPE_CHECKING
+import re
+import time
+from typing import Dict, List, Any, Iterable, Optional, Tuple, TYPE_CHECKING
+
+from services.knowledge_store import MemoryKnowledgeStore
 
 if TYPE_CHECKING:
     from neo4j import Driver
 
 logger = logging.getLogger(__name__)
 
+# Versioned schema migrations: (version, statements). Every statement is
+# idempotent, so a partially applied migration can simply be rerun.
+SCHEMA_MIGRATIONS: List[Tuple[int, List[str]]] = [
+    (1, [
+        # Uniqueness constraints (each backed by a range index) for the MERGE keys
+        "CREATE CONSTRAINT document_id IF NOT EXISTS FOR (d:Document) REQUIRE d.id IS UNIQUE",
+        "CREATE CONSTRAINT attack_technique_name IF NOT EXISTS FOR (t:AttackTechnique) REQUIRE t.name IS UNIQUE",
+        "CREATE CONSTRAINT exploit_pattern_identifier IF NOT EXISTS "
+        "FOR (p:ExploitPattern) REQUIRE p.identifier IS UNIQUE",
+        "CREATE CONSTRAINT defense_strategy_name IF NOT EXISTS FOR (s:DefenseStrategy) REQUIRE s.name IS UNIQUE",
+        "CREATE CONSTRAINT threat_pattern_id IF NOT EXISTS FOR (tp:ThreatPattern) REQUIRE tp.id IS UNIQUE",
+        # Range indexes for sorting and filtering
+        "CREATE INDEX attack_technique_confidence IF NOT EXISTS FOR (t:AttackTechnique) ON (t.confidence)",
+        "CREATE INDEX exploit_pattern_type IF NOT EXISTS FOR (p:ExploitPattern) ON (p.type)",
+        "CREATE INDEX threat_pattern_type IF NOT EXISTS FOR (tp:ThreatPattern) ON (tp.type)",
+        # Full-text search over the knowledge entities
+        "CREATE FULLTEXT INDEX knowledge_text IF NOT EXISTS "
+        "FOR (n:AttackTechnique|DefenseStrategy|ExploitPattern|ThreatPattern) "
+        "ON EACH [n.name, n.description, n.identifier]",
+    ]),
+]
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+FULLTEXT_INDEX = "knowledge_text"
+
+# Characters with a meaning in Lucene query syntax
+_LUCENE_SPECIAL = re.compile(r'([+\-!(){}\[\]^"~*?:\\/&|])')
+
+_FULLTEXT_QUERY = """
+CALL db.index.fulltext.queryNodes($index, $search) YIELD node, score
+WHERE $labels IS NULL OR any(label IN labels(node) WHERE label IN $labels)
+RETURN node AS n, labels(node) AS labels, score
+ORDER BY score DESC
+SKIP $skip
+LIMIT $limit
+"""
+_SUBSTRING_QUERY = """
+MATCH (n)
+WHERE ($labels IS NULL OR any(label IN labels(n) WHERE label IN $labels))
+  AND ((n.name IS NOT NULL AND toLower(toString(n.name)) CONTAINS $text)
+    OR (n.description IS NOT NULL AND toLower(toString(n.description)) CONTAINS $text)
+    OR (n.identifier IS NOT NULL AND toLower(toString(n.identifier)) CONTAINS $text))
+RETURN n, labels(n) AS labels
+SKIP $skip
+LIMIT $limit
+"""
+
+
+def lucene_query(text: str) -> str:
+    """Full-text search string matching any of the words of text, with Lucene syntax escaped."""
+    return " ".join(_LUCENE_SPECIAL.sub(r"\\\1", term) for term in text.split())
+
+
+# One statement per entity class; each receives all rows of a batch as a list
+_DOCUMENTS_QUERY = """
+UNWIND $rows AS row
+MERGE (d:Document {id: row.id})
+SET d.title = row.title,
+    d.processed_at = datetime(),
+    d.summary = row.summary
+"""
+_TECHNIQUES_QUERY = """
+UNWIND $rows AS row
+MATCH (d:Document {id: row.document_id})
+MERGE (t:AttackTechnique {name: row.name})
+SET t.description = row.description,
+    t.confidence = row.confidence
+MERGE (d)-[:DESCRIBES]->(t)
+"""
+_PATTERNS_QUERY = """
+UNWIND $rows AS row
+MATCH (d:Document {id: row.document_id})
+MERGE (p:ExploitPattern {identifier: row.identifier})
+SET p.type = row.type,
+    p.confidence = row.confidence
+MERGE (d)-[:CONTAINS]->(p)
+"""
+_STRATEGIES_QUERY = """
+UNWIND $rows AS row
+MATCH (d:Document {id: row.document_id})
+MERGE (s:DefenseStrategy {name: row.name})
+SET s.description = row.description,
+    s.confidence = row.confidence
+MERGE (d)-[:RECOMMENDS]->(s)
+"""
+# Link techniques and strategies within each document only
+_COUNTERS_QUERY = """
+UNWIND $document_ids AS document_id
+MATCH (d:Document {id: document_id})-[:DESCRIBES]->(t:AttackTechnique)
+MATCH (d)-[:RECOMMENDS]->(s:DefenseStrategy)
+MERGE (s)-[:COUNTERS]->(t)
+"""
+
 
 class KnowledgeGraphService:
     """Manage cybersecurity knowledge graph in Neo4j with in-memory fallback"""
 
-    def __init__(self, driver: Optional["Driver"] = None):
+    def __init__(self, driver: Optional["Driver"] = None, ensure_schema: bool = True,
+                 memory_context_bytes: Optional[int] = 64 * 1024 * 1024):
         self.driver = driver
-        self._memory_docs: List[Dict[str, Any]] = []
-        self._memory_techniques: List[Dict[str, Any]] = []
-        self._memory_strategies: List[Dict[str, Any]] = []
-        self._memory_patterns: List[Dict[str, Any]] = []
+        # Fallback store; memory_context_bytes caps the context text it keeps
+        self._memory = MemoryKnowledgeStore(max_context_bytes=memory_context_bytes)
+        self._memory_patterns: Dict[Any, Dict[str, Any]] = {}
+        self.schema_version: Optional[int] = None
+        if driver and ensure_schema:
+            self.ensure_schema()
+
+    def ensure_schema(self) -> Dict[str, Any]:
+        """
+        Create the graph constraints and indexes (idempotent).
+
+        Migrations newer than the version recorded in the graph's
+        SchemaMigration node are applied in order, and the version is recorded
+        after each one succeeds. Failures are logged, not raised, so the
+        service still starts (e.g. a uniqueness constraint cannot be created
+        while duplicate nodes exist); the migration is retried next start.
+
+        Returns:
+            Schema status: version, applied migrations and error (if any)
+        """
+        status = {"version": None, "applied": [], "error": None}
+        if not self.driver:
+            return status
+        try:
+            with self.driver.session() as session:
+                record = session.run(
+                    "MATCH (m:SchemaMigration {id: $id}) RETURN m.version AS version",
+                    id="knowledge_graph",
+                ).single()
+                version = record["version"] if record and record["version"] is not None else 0
+                status["version"] = version
+                for migration_version, statements in SCHEMA_MIGRATIONS:
+                    if migration_version <= version:
+                        continue
+                    # Schema changes cannot share a transaction with data writes
+                    for statement in statements:
+                        session.run(statement).consume()
+                    session.run(
+                        """
+                        MERGE (m:SchemaMigration {id: $id})
+                        SET m.version = $version,
+                            m.applied_at = datetime()
+                        """,
+                        id="knowledge_graph",
+                        version=migration_version,
+                    ).consume()
+                    version = status["version"] = migration_version
+                    status["applied"].append(migration_version)
+                    logger.info(f"Applied knowledge graph schema migration {migration_version}")
+        except Exception as e:
+            logger.warning(f"Knowledge graph schema bootstrap failed: {e}")
+            status["error"] = str(e)
+        self.schema_version = status["version"]
+        return status
 
     def _store_memory(self, document_id: str, extracted_data: Dict[str, Any]) -> None:
         """Store extracted knowledge in-memory (fallback when Neo4j unavailable)."""
-        title = (extracted_data.get("text") or "")[:100]
-        summary = extracted_data.get("summary") or ""
-        self._memory_docs.append({"id": document_id, "title": title, "summary": summary})
-        for t in extracted_data.get("attack_techniques", []):
-            self._memory_techniques.append({
-                "name": t.get("technique", ""),
-                "description": t.get("context", ""),
-                "confidence": t.get("confidence", 0.0),
-                "document_id": document_id,
-            })
-        for s in extracted_data.get("defense_strategies", []):
-            self._memory_strategies.append({
-                "name": s.get("strategy", ""),
-                "description": s.get("context", ""),
-                "confidence": s.get("confidence", 0.0),
-                "document_id": document_id,
-            })
+        self._memory.add_document(document_id, extracted_data)
+
+    def memory_stats(self) -> Dict[str, Any]:
+        """Size and approximate memory footprint of the in-memory fallback store."""
+        return {**self._memory.memory_stats(), "threat_patterns": len(self._memory_patterns)}
 
     def store_document_knowledge(self, document_id: str, extracted_data: Dict[str, Any]) -> bool:
         """
         Store extracted knowledge from document into Neo4j graph.
         Falls back to in-memory store if Neo4j is unavailable.
         """
-        if self.driver:
-            try:
-                with self.driver.session() as session:
-                    title = (extracted_data.get("text") or "")[:100]
-                    summary = extracted_data.get("summary") or ""
-                    session.run(
-                        """
-                        MERGE (d:Document {id: $document_id})
-                        SET d.title = $title,
-                            d.processed_at = datetime(),
-                            d.summary = $summary
-                        """,
-                        document_id=document_id,
-                        title=title,
-                        summary=summary,
-                    )
-                    for technique in extracted_data.get("attack_techniques", []):
-                        session.run(
-                            """
-                            MATCH (d:Document {id: $document_id})
-                            MERGE (t:AttackTechnique {name: $technique_name})
-                            SET t.description = $description,
-                                t.confidence = $confidence
-                            MERGE (d)-[:DESCRIBES]->(t)
-                            """,
-                            document_id=document_id,
-                            technique_name=technique.get("technique", ""),
-                            description=technique.get("context", ""),
-                            confidence=technique.get("confidence", 0.0),
-                        )
-                    for pattern in extracted_data.get("exploit_patterns", []):
-                        session.run(
-                            """
-                            MATCH (d:Document {id: $document_id})
-                            MERGE (p:ExploitPattern {identifier: $identifier})
-                            SET p.type = $type,
-                                p.confidence = $confidence
-                            MERGE (d)-[:CONTAINS]->(p)
-                            """,
-                            document_id=document_id,
-                            identifier=pattern.get("identifier", ""),
-                            type=pattern.get("type", ""),
-                            confidence=pattern.get("confidence", 0.0),
-                        )
-                    for strategy in extracted_data.get("defense_strategies", []):
-                        session.run(
-                            """
-                            MATCH (d:Document {id: $document_id})
-                            MERGE (s:DefenseStrategy {name: $strategy_name})
-                            SET s.description = $description,
-                                s.confidence = $confidence
-                            MERGE (d)-[:RECOMMENDS]->(s)
-                            """,
-                            document_id=document_id,
-                            strategy_name=strategy.get("strategy", ""),
-                            description=strategy.get("context", ""),
-                            confidence=strategy.get("confidence", 0.0),
-                        )
-                    # Link techniques and strategies for this document only
-                    session.run(
-                        """
-                        MATCH (d:Document {id: $document_id})-[:DESCRIBES]->(t:AttackTechnique)
-                        MATCH (d)-[:RECOMMENDS]->(s:DefenseStrategy)
-                        MERGE (s)-[:COUNTERS]->(t)
-                        """,
-                        document_id=document_id,
-                    )
-                logger.info(f"Stored knowledge for document {document_id} in Neo4j")
-                return True
-            except Exception as e:
-                logger.warning(f"Neo4j store failed, using in-memory fallback: {e}")
-        self._store_memory(document_id, extracted_data)
+        self.store_documents_knowledge([(document_id, extracted_data)])
         return True
 
-    def query_knowledge(self, query: str) -> List[Dict[str, Any]]:
-        """Query the knowledge graph. Uses Neo4j or in-memory fallback."""
+    def store_documents_knowledge(self, documents: Iterable[Tuple[str, Dict[str, Any]]],
+                                  batch_size: int = 200) -> Dict[str, Any]:
+        """
+        Store the extracted knowledge of many documents with batched writes.
+
+        Each batch is written in one managed write transaction (retried by the
+        driver on transient errors), with one UNWIND statement per entity
+        class instead of a round trip per entity. Batches that fail are stored
+        in-memory instead.
+
+        Args:
+            documents: (document_id, extracted_data) pairs
+            batch_size: Documents per transaction
+
+        Returns:
+            Write stats: documents, nodes and relationships merged (and created,
+            as reported by Neo4j), seconds and per-second rates
+        """
+        documents = list(documents)
+        start = time.perf_counter()
+        stats = {
+            "backend": "neo4j" if self.driver else "in-memory",
+            "documents": len(documents),
+            "batches": 0,
+            "fallback_documents": 0,
+            "nodes_merged": 0,
+            "relationships_merged": 0,
+            "nodes_created": 0,
+            "relationships_created": 0,
+        }
+        for i in range(0, len(documents), max(1, batch_size)):
+            batch = documents[i:i + max(1, batch_size)]
+            if self.driver:
+                rows = self._batch_rows(batch)
+                try:
+                    with self.driver.session() as session:
+                        counters = session.execute_write(self._write_batch, rows)
+                    stats["batches"] += 1
+                    stats["nodes_merged"] += sum(len(rows[k]) for k in ("documents", "techniques", "patterns", "strategies"))
+                    stats["relationships_merged"] += len(rows["techniques"]) + len(rows["patterns"]) + len(rows["strategies"])
+                    stats["nodes_created"] += counters["nodes_created"]
+                    stats["relationships_created"] += counters["relationships_created"]
+                    continue
+                except Exception as e:
+                    logger.warning(f"Neo4j store failed, using in-memory fallback: {e}")
+                    stats["fallback_documents"] += len(batch)
+            for document_id, extracted_data in batch:
+                self._store_memory(document_id, extracted_data)
+
+        seconds = time.perf_counter() - start
+        stats["seconds"] = seconds
+        stats["nodes_per_second"] = stats["nodes_merged"] / seconds if seconds else 0.0
+        stats["relationships_per_second"] = stats["relationships_merged"] / seconds if seconds else 0.0
+        if stats["batches"]:
+            logger.info(
+                f"Stored knowledge for {len(documents)} documents in Neo4j: {stats['nodes_merged']} nodes, "
+                f"{stats['relationships_merged']} relationships in {seconds:.2f}s "
+                f"({stats['nodes_per_second']:.0f} nodes/s)"
+            )
+        return stats
+
+    @staticmethod
+    def _batch_rows(batch: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Flatten a batch of documents into one parameter list per entity class."""
+        rows = {"documents": [], "techniques": [], "patterns": [], "strategies": []}
+        for document_id, extracted_data in batch:
+            rows["documents"].append({
+                "id": document_id,
+                "title": (extracted_data.get("text") or "")[:100],
+                "summary": extracted_data.get("summary") or "",
+            })
+            for t in extracted_data.get("attack_techniques", []):
+                rows["techniques"].append({
+                    "document_id": document_id,
+                    "name": t.get("technique", ""),
+                    "description": t.get("context", ""),
+                    "confidence": t.get("confidence", 0.0),
+                })
+            for p in extracted_data.get("exploit_patterns", []):
+                rows["patterns"].append({
+                    "document_id": document_id,
+                    "identifier": p.get("identifier", ""),
+                    "type": p.get("type", ""),
+                    "confidence": p.get("confidence", 0.0),
+                })
+            for s in extracted_data.get("defense_strategies", []):
+                rows["strategies"].append({
+                    "document_id": document_id,
+                    "name": s.get("strategy", ""),
+                    "description": s.get("context", ""),
+                    "confidence": s.get("confidence", 0.0),
+                })
+        return rows
+
+    @staticmethod
+    def _write_batch(tx: Any, rows: Dict[str, List[Dict[str, Any]]]) -> Dict[str, int]:
+        """Transaction function: apply one batch; returns the summed write counters."""
+        totals = {"nodes_created": 0, "relationships_created": 0}
+        statements = [
+            (_DOCUMENTS_QUERY, {"rows": rows["documents"]}),
+            (_TECHNIQUES_QUERY, {"rows": rows["techniques"]}),
+            (_PATTERNS_QUERY, {"rows": rows["patterns"]}),
+            (_STRATEGIES_QUERY, {"rows": rows["strategies"]}),
+            (_COUNTERS_QUERY, {"document_ids": [d["id"] for d in rows["documents"]]
+                               if rows["techniques"] and rows["strategies"] else []}),
+        ]
+        for query, params in statements:
+            if not next(iter(params.values())):
+                continue
+            counters = tx.run(query, **params).consume().counters
+            totals["nodes_created"] += counters.nodes_created
+            totals["relationships_created"] += counters.relationships_created
+        return totals
+
+    def query_knowledge(self, query: str, mode: str = "fulltext", labels: Optional[List[str]] = None,
+                        skip: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Query the knowledge graph. Uses Neo4j or in-memory fallback.
+
+        Args:
+            query: Search text
+            mode: "fulltext" (relevance-ranked, via the knowledge_text index) or
+                "substring" (case-insensitive CONTAINS on name, description and
+                identifier; scans every node)
+            labels: Only return nodes with one of these labels
+            skip: Results to skip (pagination)
+            limit: Maximum results returned
+
+        Returns:
+            Matching nodes with their labels (and a relevance score in fulltext mode)
+        """
+        if mode not in ("fulltext", "substring"):
+            raise ValueError(f"Unknown query mode: {mode}")
         q = (query or "").strip().lower()
+        labels = list(labels) if labels else None
         if self.driver:
             try:
                 with self.driver.session() as session:
-                    result = session.run(
-                        """
-                        MATCH (n)
-                        WHERE (n.name IS NOT NULL AND toLower(toString(n.name)) CONTAINS $query)
-                           OR (n.description IS NOT NULL AND toLower(toString(n.description)) CONTAINS $query)
-                           OR (n.identifier IS NOT NULL AND toLower(toString(n.identifier)) CONTAINS $query)
-                        RETURN n, labels(n) as labels
-                        LIMIT 50
-                        """,
-                        query=q,
-                    )
+                    # Without the index (schema bootstrap failed) only substring search works
+                    if mode == "fulltext" and self.schema_version:
+                        search = lucene_query(q)
+                        if not search:
+                            return []
+                        result = session.run(
+                            _FULLTEXT_QUERY, index=FULLTEXT_INDEX, search=search,
+                            labels=labels, skip=skip, limit=limit,
+                        )
+                    else:
+                        result = session.run(_SUBSTRING_QUERY, text=q, labels=labels, skip=skip, limit=limit)
                     out = []
                     for record in result:
                         node = dict(record["n"])
                         node["labels"] = list(record["labels"])
+                        if "score" in record.keys():
+                            node["score"] = record["score"]
                         out.append(node)
                     return out
             except Exception as e:
                 logger.warning(f"Neo4j query failed, using in-memory: {e}")
-        out = []
-        for t in self._memory_techniques:
-            if q in (t.get("name") or "").lower() or q in (t.get("description") or "").lower():
-                out.append({**t, "labels": ["AttackTechnique"]})
-        for s in self._memory_strategies:
-            if q in (s.get("name") or "").lower() or q in (s.get("description") or "").lower():
-                out.append({**s, "labels": ["DefenseStrategy"]})
-        return out[:50]
+        # In-memory: full-text queries match word prefixes of every query word
+        match = "substring" if mode == "substring" else "prefix"
+        return self._memory.search(q, mode=match, labels=labels, skip=skip, limit=limit)
 
     def get_attack_techniques(self, limit: int = 20) -> List[Dict[str, Any]]:
         """Get all attack techniques from knowledge graph."""
@@ -173,8 +366,7 @@ class KnowledgeGraphService:
                     return [dict(record["t"]) for record in result]
             except Exception as e:
                 logger.warning(f"Neo4j get_attack_techniques failed: {e}")
-        tech = sorted(self._memory_techniques, key=lambda x: -float(x.get("confidence", 0)))
-        return tech[:limit]
+        return self._memory.top_techniques(limit)
 
     def get_defense_strategies(self, technique_name: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get defense strategies, optionally filtered by attack technique."""
@@ -200,21 +392,16 @@ class KnowledgeGraphService:
                     return [dict(record["s"]) for record in result]
             except Exception as e:
                 logger.warning(f"Neo4j get_defense_strategies failed: {e}")
-        if technique_name:
-            return [s for s in self._memory_strategies if s.get("document_id") in {
-                t.get("document_id") for t in self._memory_techniques
-                if (t.get("name") or "").lower() == (technique_name or "").lower()
-            }]
-        return self._memory_strategies[:50]
+        return self._memory.strategies(technique_name)
 
     def create_threat_pattern(self, threat_data: Dict[str, Any]) -> bool:
         """Create a threat pattern node in the knowledge graph."""
-        self._memory_patterns.append({
+        self._memory_patterns[threat_data.get("id")] = {
             "id": threat_data.get("id"),
             "type": threat_data.get("type"),
             "severity": threat_data.get("severity"),
             "description": threat_data.get("description"),
-        })
+        }
         if self.driver:
             try:
                 with self.driver.session() as session:
@@ -0,0 +1,238 @@
+"""
+Knowledge Store
+Compact in-memory knowledge graph, used when Neo4j is unavailable
+"""
+
+import heapq
+import logging
+import sys
+import threading
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, List, Any, Optional, Tuple
+
+from services.text_index import TextIndex
+
+logger = logging.getLogger(__name__)
+
+TECHNIQUE = "AttackTechnique"
+STRATEGY = "DefenseStrategy"
+
+
+class _Document:
+    """A stored document and its edges to the entities it mentions"""
+
+    __slots__ = ("id", "title", "summary", "techniques", "strategies")
+
+    def __init__(self, document_id: str, title: str, summary: str):
+        self.id = document_id
+        self.title = title
+        self.summary = summary
+        self.techniques: List["_Entity"] = []
+        self.strategies: List["_Entity"] = []
+
+
+class _Entity:
+    """An attack technique or defense strategy, stored once per name"""
+
+    __slots__ = ("name", "description", "confidence", "documents", "index_id")
+
+    def __init__(self, name: str, index_id: int):
+        self.name = name
+        self.description = ""
+        self.confidence = 0.0
+        self.documents: List[_Document] = []
+        self.index_id = index_id
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "description": self.description,
+            "confidence": self.confidence,
+            "document_id": self.documents[-1].id if self.documents else None,
+            "documents": len(self.documents),
+        }
+
+
+class MemoryKnowledgeStore:
+    """In-memory graph of documents, attack techniques and defense strategies
+
+    Like the Neo4j graph, every technique and strategy is one node per name,
+    linked to the documents that mention it; nodes and documents are
+    __slots__ records and names and document ids are interned, so repeated
+    mentions cost one edge each instead of a copy of the entity. An entity
+    keeps the confidence last seen and the first context seen as its
+    description. Contexts are the bulk of the memory (each is kept as the
+    description and, lowercased, in the search index), so the size of both
+    copies together is capped: when max_context_bytes is exceeded, the
+    contexts of the entities mentioned least recently are dropped (the
+    entities and their edges stay, searchable by name). Name and
+    description are indexed for search with a TextIndex per entity label.
+    """
+
+    LABELS = (TECHNIQUE, STRATEGY)
+
+    def __init__(self, max_context_bytes: Optional[int] = 64 * 1024 * 1024):
+        """
+        Args:
+            max_context_bytes: Cap on the context text kept, description and indexed copy
+                together, in UTF-8 bytes (None = unbounded)
+        """
+        self.max_context_bytes = max_context_bytes
+        self.documents: Dict[str, _Document] = {}
+        self.entities: Dict[str, Dict[str, _Entity]] = {label: {} for label in self.LABELS}
+        self._by_index_id: Dict[str, List[_Entity]] = {label: [] for label in self.LABELS}
+        self._indexes = {label: TextIndex() for label in self.LABELS}
+        # Entities holding a context -> (label, characters held), least recently mentioned first
+        self._contexts: "OrderedDict[_Entity, Tuple[str, int]]" = OrderedDict()
+        self._context_bytes = 0
+        self.evicted_contexts = 0
+        self._lock = threading.RLock()
+
+    def add_document(self, document_id: str, extracted_data: Dict[str, Any]):
+        """Store a document with the techniques and strategies extracted from it"""
+        document_id = sys.intern(str(document_id))
+        title = (extracted_data.get("text") or "")[:100]
+        summary = extracted_data.get("summary") or ""
+        with self._lock:
+            document = self.documents.get(document_id)
+            if document is None:
+                document = self.documents[document_id] = _Document(document_id, title, summary)
+            else:
+                document.title, document.summary = title, summary
+
+            for label, key, items, edges in (
+                (TECHNIQUE, "technique", extracted_data.get("attack_techniques", []), document.techniques),
+                (STRATEGY, "strategy", extracted_data.get("defense_strategies", []), document.strategies),
+            ):
+                linked = set(edges)
+                for item in items:
+                    entity = self._mention(label, item.get(key) or "", item.get("context") or "")
+                    entity.confidence = item.get("confidence", 0.0)
+                    if entity not in linked:
+                        linked.add(entity)
+                        edges.append(entity)
+                        entity.documents.append(document)
+            self._evict()
+
+    def search(self, query: str, mode: str = "substring", labels: Optional[List[str]] = None,
+               skip: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Search entity names and descriptions
+
+        Args:
+            query: Search text
+            mode: TextIndex search mode ("substring" or "prefix")
+            labels: Only return entities with one of these labels
+            skip: Results to skip (pagination)
+            limit: Maximum results returned
+
+        Returns:
+            Entities with their labels, techniques first, in insertion order
+        """
+        out = []
+        with self._lock:
+            for label in self.LABELS:
+                if labels is not None and label not in labels:
+                    continue
+                by_index_id = self._by_index_id[label]
+                for index_id in self._indexes[label].search(query, mode=mode, limit=skip + limit - len(out)):
+                    out.append({**by_index_id[index_id].to_dict(), "labels": [label]})
+        return out[skip:skip + limit]
+
+    def top_techniques(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Attack techniques with the highest confidence"""
+        with self._lock:
+            entities = list(self.entities[TECHNIQUE].values())
+        top = heapq.nlargest(limit, entities, key=lambda e: float(e.confidence or 0))
+        return [e.to_dict() for e in top]
+
+    def strategies(self, technique_name: Optional[str] = None, limit: Optional[int] = 50) -> List[Dict[str, Any]]:
+        """
+        Defense strategies, optionally only those recommended by documents
+        describing a technique (name matched case-insensitively)
+        """
+        with self._lock:
+            if not technique_name:
+                return [e.to_dict() for e in islice(self.entities[STRATEGY].values(), limit)]
+            name = technique_name.lower()
+            seen = set()
+            out = []
+            for technique in self.entities[TECHNIQUE].values():
+                if technique.name.lower() != name:
+                    continue
+                for document in technique.documents:
+                    for strategy in document.strategies:
+                        if strategy not in seen:
+                            seen.add(strategy)
+                            out.append(strategy.to_dict())
+            return out
+
+    def memory_stats(self) -> Dict[str, Any]:
+        """Entity, document and edge counts, context usage and approximate memory footprint"""
+        with self._lock:
+            entities = [e for label in self.LABELS for e in self.entities[label].values()]
+            entity_bytes = sum(
+                sys.getsizeof(e) + sys.getsizeof(e.documents) + sys.getsizeof(e.name) for e in entities
+            )
+            document_bytes = sum(
+                sys.getsizeof(d) + sys.getsizeof(d.techniques) + sys.getsizeof(d.strategies)
+                + sys.getsizeof(d.id) + len(d.title) + len(d.summary)
+                for d in self.documents.values()
+            )
+            index_stats = [self._indexes[label].get_stats() for label in self.LABELS]
+            index_bytes = sum(s["postings_bytes"] + s["text_bytes"] for s in index_stats)
+            description_bytes = sum(len(e.description) for e in self._contexts)
+            return {
+                "documents": len(self.documents),
+                "attack_techniques": len(self.entities[TECHNIQUE]),
+                "defense_strategies": len(self.entities[STRATEGY]),
+                "edges": sum(len(e.documents) for e in entities),
+                "contexts": len(self._contexts),
+                "context_bytes": self._context_bytes,
+                "max_context_bytes": self.max_context_bytes,
+                "evicted_contexts": self.evicted_contexts,
+                "index_bytes": index_bytes,
+                "approx_bytes": entity_bytes + document_bytes + description_bytes + index_bytes,
+            }
+
+    def _mention(self, label: str, name: str, context: str) -> _Entity:
+        """Entity named name (created if new), with its context refreshed or set"""
+        entities = self.entities[label]
+        entity = entities.get(name)
+        if entity is None:
+            name = sys.intern(name)
+            entity = _Entity(name, self._indexes[label].add(name, context))
+            entities[name] = entity
+            self._by_index_id[label].append(entity)
+            if context:
+                self._hold_context(label, entity, context)
+        elif entity in self._contexts:
+            self._contexts.move_to_end(entity)
+        elif context:
+            # The previous context was evicted
+            self._hold_context(label, entity, context)
+            self._indexes[label].update(entity.index_id, entity.name, context)
+        return entity
+
+    def _hold_context(self, label: str, entity: _Entity, context: str):
+        entity.description = context
+        # The index holds a lowercased copy
+        size = len(context.encode()) + len(context.lower().encode())
+        self._contexts[entity] = (label, size)
+        self._context_bytes += size
+
+    def _evict(self):
+        """Drop the least recently mentioned contexts until under max_context_bytes"""
+        if self.max_context_bytes is None:
+            return
+        evicted = 0
+        while self._context_bytes > self.max_context_bytes and self._contexts:
+            entity, (label, size) = self._contexts.popitem(last=False)
+            self._context_bytes -= size
+            entity.description = ""
+            self._indexes[label].update(entity.index_id, entity.name, None)
+            evicted += 1
+        if evicted:
+            self.evicted_contexts += evicted
+            logger.debug(f"Evicted {evicted} knowledge contexts ({self._context_bytes} bytes kept)")
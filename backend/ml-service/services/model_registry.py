@@ -0,0 +1,195 @@
+"""
+Model Registry
+Process-wide, lazily loaded models shared by every service that needs them
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def get_process_rss_bytes() -> int:
+    """Resident memory of this process in bytes (peak RSS if current is unavailable)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except Exception:
+        pass
+    try:
+        import os
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except Exception:
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except Exception:
+        return 0
+
+
+class ModelRegistry:
+    """Load models on first use, share them across consumers and evict idle ones"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._models: Dict[str, Any] = {}
+        self._errors: Dict[str, str] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._reaper: Optional[threading.Thread] = None
+        self._reaper_stop = threading.Event()
+
+    def register(self, name: str, loader: Callable[[], Any], replace: bool = False) -> bool:
+        """
+        Register a loader for a model
+
+        Args:
+            name: Model name used by consumers
+            loader: Zero-argument callable returning the loaded model
+            replace: Replace an existing loader (and evict its loaded model)
+
+        Returns:
+            True if the loader was registered, False if one already existed
+        """
+        with self._lock:
+            if name in self._loaders and not replace:
+                return False
+            self._loaders[name] = loader
+            self._load_locks.setdefault(name, threading.Lock())
+            self._models.pop(name, None)
+            self._errors.pop(name, None)
+            self._stats[name] = {'loads': 0, 'uses': 0, 'load_seconds': None,
+                                 'loaded_at': None, 'last_used': None}
+            return True
+
+    def get(self, name: str) -> Optional[Any]:
+        """
+        Get a model, loading it on first use
+
+        Returns None if the model is not registered or failed to load; a failed
+        load is not retried until the model is evicted or re-registered.
+        """
+        model = self._models.get(name)
+        if model is None:
+            model = self._load(name)
+        if model is not None:
+            stats = self._stats[name]
+            stats['uses'] += 1
+            stats['last_used'] = time.time()
+        return model
+
+    def _load(self, name: str) -> Optional[Any]:
+        load_lock = self._load_locks.get(name)
+        if load_lock is None:
+            return None
+
+        # Only one thread loads a given model; the others wait and reuse it
+        with load_lock:
+            if name in self._models:
+                return self._models[name]
+            if name in self._errors:
+                return None
+
+            start = time.perf_counter()
+            try:
+                model = self._loaders[name]()
+            except Exception as e:
+                logger.warning(f"Could not load model '{name}': {e}")
+                self._errors[name] = str(e)
+                return None
+
+            stats = self._stats[name]
+            stats['loads'] += 1
+            stats['load_seconds'] = time.perf_counter() - start
+            stats['loaded_at'] = time.time()
+            self._models[name] = model
+            logger.info(f"Loaded model '{name}' in {stats['load_seconds']:.1f}s")
+            return model
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def warm_up(self, names: Optional[List[str]] = None, background: bool = True) -> Optional[threading.Thread]:
+        """Load models ahead of first use, optionally in a background thread"""
+        names = list(names) if names else list(self._loaders)
+
+        def load_all():
+            for name in names:
+                self.get(name)
+
+        if not background:
+            load_all()
+            return None
+        thread = threading.Thread(target=load_all, name='model-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def evict(self, name: str) -> bool:
+        """Drop a loaded model (and any load error) so the next use reloads it"""
+        load_lock = self._load_locks.get(name)
+        if load_lock is None:
+            return False
+        with load_lock:
+            self._errors.pop(name, None)
+            evicted = self._models.pop(name, None) is not None
+        if evicted:
+            logger.info(f"Evicted model '{name}'")
+        return evicted
+
+    def evict_idle(self, max_idle_seconds: float) -> List[str]:
+        """Evict every loaded model not used for max_idle_seconds"""
+        now = time.time()
+        evicted = []
+        for name in list(self._models):
+            stats = self._stats[name]
+            last_used = stats['last_used'] or stats['loaded_at'] or now
+            if now - last_used >= max_idle_seconds and self.evict(name):
+                evicted.append(name)
+        return evicted
+
+    def start_idle_reaper(self, max_idle_seconds: float, interval_seconds: float = 60.0):
+        """Periodically evict idle models in a background thread"""
+        if self._reaper is not None:
+            return
+
+        def reap():
+            while not self._reaper_stop.wait(interval_seconds):
+                self.evict_idle(max_idle_seconds)
+
+        self._reaper = threading.Thread(target=reap, name='model-reaper', daemon=True)
+        self._reaper.start()
+
+    def stop_idle_reaper(self):
+        if self._reaper is not None:
+            self._reaper_stop.set()
+            self._reaper.join(timeout=5)
+            self._reaper = None
+            self._reaper_stop.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Load state, load time and idle time of every registered model"""
+        now = time.time()
+        models = {}
+        for name in list(self._loaders):
+            stats = self._stats[name]
+            models[name] = {
+                'loaded': name in self._models,
+                'loads': stats['loads'],
+                'uses': stats['uses'],
+                'load_seconds': stats['load_seconds'],
+                'idle_seconds': now - stats['last_used'] if stats['last_used'] else None,
+                'error': self._errors.get(name),
+            }
+        return {
+            'models': models,
+            'rss_mb': round(get_process_rss_bytes() / (1024 * 1024), 1),
+        }
+
+
+# Shared by every consumer in this process
+model_registry = ModelRegistry()
@@ -0,0 +1,172 @@
+"""
+Model Server
+Serves the threat classifiers trained by SelfLearningEngine with low per-request latency
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Any, Optional, Tuple
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+logger = logging.getLogger(__name__)
+
+
+class CompiledClassifier:
+    """A fitted classifier frozen for batched predict_proba on the request path
+
+    The scaler is reduced to two arrays, and a random forest to a snapshot of
+    its trees scored directly (no per-call input validation or thread pool
+    dispatch, which dominate the cost of small batches). The snapshot also
+    keeps serving consistent while the online forest grows in place.
+    """
+
+    def __init__(self, model: Any, scaler: Any = None, classes: Optional[List[Any]] = None,
+                 name: str = '', version: str = ''):
+        self.name = name
+        self.version = version
+        self.model = model
+        self.mean = np.array(scaler.mean_, dtype=np.float64) if scaler is not None else None
+        self.scale = np.array(scaler.scale_, dtype=np.float64) if scaler is not None else None
+        single_output_forest = isinstance(model, RandomForestClassifier) and model.n_outputs_ == 1
+        self.trees = list(model.estimators_) if single_output_forest else None
+        self.classes = list(classes) if classes is not None else list(model.classes_)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Class probabilities (n_rows x n_classes, columns in self.classes order)"""
+        X = np.asarray(X, dtype=np.float64)
+        if self.mean is not None:
+            X = (X - self.mean) / self.scale
+        if self.trees is None:
+            return self.model.predict_proba(X)
+
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        proba = self.trees[0].predict_proba(X, check_input=False)
+        for tree in self.trees[1:]:
+            proba += tree.predict_proba(X, check_input=False)
+        proba /= len(self.trees)
+        return proba
+
+
+class ModelServer:
+    """Pick, compile and cache the best available threat classifier
+
+    Preference order: the batch model set in use (SelfLearningEngine.serving_models)
+    if it was trained on the threat feature schema, then the online threat
+    models. The compiled classifier is cached until the engine publishes a
+    new model set or updates the online models. When neither exists,
+    predict_proba returns None and callers fall back to their rules.
+    """
+
+    # Recent requests kept for the latency percentiles
+    LATENCY_WINDOW = 1000
+
+    def __init__(self, engine: Any):
+        """
+        Args:
+            engine: SelfLearningEngine whose models are served
+        """
+        self.engine = engine
+        self._compiled: Optional[CompiledClassifier] = None
+        self._compiled_key: Optional[Tuple] = None
+        self._lock = threading.Lock()
+        self._latencies_ms = deque(maxlen=self.LATENCY_WINDOW)
+        self._requests = 0
+        self._rows = 0
+        self._compiles = 0
+
+    def get_classifier(self) -> Optional[CompiledClassifier]:
+        """The compiled classifier for the current models (None if no model is trained)"""
+        engine = self.engine
+        serving = engine.serving_models
+        feature_names = list(engine.threat_schema.names)
+
+        if serving is not None and list(serving['feature_names']) == feature_names:
+            key = ('batch', serving['version'])
+        elif engine.online_models:
+            key = ('online', engine.online_version)
+        else:
+            return None
+
+        compiled = self._compiled
+        if compiled is not None and self._compiled_key == key:
+            return compiled
+
+        with self._lock:
+            if self._compiled is not None and self._compiled_key == key:
+                return self._compiled
+            start = time.perf_counter()
+            if key[0] == 'batch':
+                name = serving['best_model'] or next(iter(serving['models']))
+                model = serving['models'][name]
+                compiled = CompiledClassifier(model, serving['scaler'], self._class_names(model, serving['classes']),
+                                              name=name, version=serving['version'])
+            else:
+                # The online forest is trained on raw features, the SGD model on scaled ones
+                name = 'random_forest' if 'random_forest' in engine.online_models else 'sgd'
+                model = engine.online_models[name]
+                compiled = CompiledClassifier(model, engine.online_scaler if name == 'sgd' else None,
+                                              name=f"online_{name}", version=f"online-{engine.online_version}")
+            self._compiled, self._compiled_key = compiled, key
+            self._compiles += 1
+            logger.info(f"Serving threat classifier {compiled.name} {compiled.version} "
+                        f"(compiled in {(time.perf_counter() - start) * 1000:.1f}ms)")
+            return compiled
+
+    def predict_proba(self, X: np.ndarray) -> Optional[Dict[str, Any]]:
+        """
+        Score a batch of threat feature rows
+
+        Args:
+            X: Feature matrix in the threat feature schema layout
+
+        Returns:
+            Dictionary with classes, probabilities (n_rows x n_classes), model,
+            version and latency_ms of this request, or None if no model is trained
+        """
+        classifier = self.get_classifier()
+        if classifier is None:
+            return None
+
+        start = time.perf_counter()
+        probabilities = classifier.predict_proba(X)
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        self._latencies_ms.append(latency_ms)
+        self._requests += 1
+        self._rows += len(probabilities)
+        return {
+            'classes': classifier.classes,
+            'probabilities': probabilities,
+            'model': classifier.name,
+            'version': classifier.version,
+            'latency_ms': latency_ms
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Served model and inference latency percentiles over recent requests"""
+        latencies = np.array(self._latencies_ms, dtype=np.float64)
+        compiled = self._compiled
+        return {
+            'model': compiled.name if compiled else None,
+            'version': compiled.version if compiled else None,
+            'requests': self._requests,
+            'rows': self._rows,
+            'compiles': self._compiles,
+            'latency_ms': {
+                'p50': round(float(np.percentile(latencies, 50)), 3),
+                'p95': round(float(np.percentile(latencies, 95)), 3),
+                'max': round(float(latencies.max()), 3)
+            } if len(latencies) else None
+        }
+
+    @staticmethod
+    def _class_names(model: Any, class_names: List[Any]) -> List[Any]:
+        """Model classes, mapped back to label names when labels were integer-encoded"""
+        classes = list(model.classes_)
+        if class_names and len(class_names) == len(classes) and all(
+                isinstance(c, (int, np.integer)) and 0 <= c < len(class_names) for c in classes):
+            return [class_names[int(c)] for c in classes]
+        return classes
@@ -0,0 +1,156 @@
+"""
+Model Store
+Versioned on-disk model sets with a manifest and an atomically updated LATEST pointer
+"""
+
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+import joblib
+
+logger = logging.getLogger(__name__)
+
+
+class ModelStore:
+    """Save and load complete model sets, one directory per version
+
+    Layout::
+
+        <root>/<version>/manifest.json      version, metrics, feature names, ...
+        <root>/<version>/<artifact>.joblib  one file per model / scaler
+        <root>/LATEST                       name of the current version
+
+    A version directory is written under a temporary name and renamed into
+    place when complete, then LATEST is replaced atomically, so a reader
+    (another worker, or a restart) sees either the previous set or the new
+    one, never a partial one. Artifacts are stored uncompressed so they can
+    be loaded memory-mapped: the numpy arrays of large forests stay in the
+    page cache instead of being copied into every process.
+    """
+
+    LATEST_FILENAME = "LATEST"
+    MANIFEST_FILENAME = "manifest.json"
+
+    def __init__(self, root: str, keep_versions: int = 5):
+        """
+        Args:
+            root: Store directory
+            keep_versions: Number of most recent versions kept on disk (0 = all)
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.keep_versions = keep_versions
+
+    def save(self, artifacts: Dict[str, Any], manifest: Dict[str, Any]) -> str:
+        """
+        Save a model set as a new version and make it the latest
+
+        Args:
+            artifacts: Objects to persist by name (e.g. models and scaler)
+            manifest: JSON-serializable description (metrics, feature names, ...)
+
+        Returns:
+            The new version
+        """
+        version = self._new_version()
+        tmp_dir = self.root / f".{version}.tmp"
+        tmp_dir.mkdir()
+        try:
+            files = {}
+            for name, artifact in artifacts.items():
+                files[name] = f"{name}.joblib"
+                joblib.dump(artifact, tmp_dir / files[name])
+
+            manifest = {
+                **manifest,
+                'version': version,
+                'created_at': datetime.utcnow().isoformat(),
+                'artifacts': files
+            }
+            with open(tmp_dir / self.MANIFEST_FILENAME, 'w') as f:
+                json.dump(manifest, f, indent=2, default=str)
+            os.rename(tmp_dir, self.root / version)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        self._write_latest(version)
+        self.prune()
+        logger.info(f"Saved model set {version} to {self.root}")
+        return version
+
+    def load(self, version: Optional[str] = None, mmap_mode: Optional[str] = 'r') -> Optional[Dict[str, Any]]:
+        """
+        Load a model set
+
+        Args:
+            version: Version to load (default: latest)
+            mmap_mode: joblib mmap mode for the artifacts' numpy arrays (None = read into memory)
+
+        Returns:
+            Dictionary with version, manifest and artifacts, or None if there is no such version
+        """
+        version = version or self.latest_version()
+        if version is None:
+            return None
+        manifest = self.manifest(version)
+        if manifest is None:
+            return None
+
+        directory = self.root / version
+        artifacts = {
+            name: joblib.load(directory / filename, mmap_mode=mmap_mode)
+            for name, filename in manifest['artifacts'].items()
+        }
+        return {'version': version, 'manifest': manifest, 'artifacts': artifacts}
+
+    def latest_version(self) -> Optional[str]:
+        """Version named by the LATEST pointer"""
+        try:
+            version = (self.root / self.LATEST_FILENAME).read_text().strip()
+        except OSError:
+            return None
+        return version or None
+
+    def manifest(self, version: str) -> Optional[Dict[str, Any]]:
+        """Manifest of a version, or None if it does not exist"""
+        try:
+            with open(self.root / version / self.MANIFEST_FILENAME, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def list_versions(self) -> List[str]:
+        """Complete versions, oldest first"""
+        return sorted(
+            p.name for p in self.root.iterdir()
+            if p.is_dir() and not p.name.startswith('.') and (p / self.MANIFEST_FILENAME).exists()
+        )
+
+    def prune(self):
+        """Delete old versions beyond keep_versions (the latest is always kept)"""
+        if not self.keep_versions:
+            return
+        latest = self.latest_version()
+        for version in self.list_versions()[:-self.keep_versions]:
+            if version != latest:
+                shutil.rmtree(self.root / version, ignore_errors=True)
+
+    def _new_version(self) -> str:
+        """Unique version name that sorts after every stored version"""
+        base = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+        newest = max(self.list_versions(), default='')
+        version, n = base, 0
+        while version <= newest or (self.root / f".{version}.tmp").exists():
+            n += 1
+            version = f"{base}-{n:02d}"
+        return version
+
+    def _write_latest(self, version: str):
+        tmp_path = self.root / f"{self.LATEST_FILENAME}.tmp"
+        tmp_path.write_text(version)
+        os.replace(tmp_path, self.root / self.LATEST_FILENAME)
@@ -0,0 +1,108 @@
+"""
+Replay Buffer
+Bounded, class-aware reservoir of past training samples for incremental learning
+"""
+
+import logging
+from collections import Counter
+from typing import List, Any, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayBuffer:
+    """Keep a uniform sample of every (features, label) pair seen, in fixed memory
+
+    Reservoir sampling keeps each past sample with equal probability, so the
+    buffer reflects the whole history rather than the latest batches. Rare
+    classes are protected: a class with at most min_per_class samples in the
+    buffer is never evicted, and its new samples always get a slot. That way
+    every label ever seen can be replayed when models are updated.
+    """
+
+    def __init__(self, capacity: int = 10000, min_per_class: int = 5, seed: int = 42):
+        if capacity < 1:
+            raise ValueError("Replay buffer capacity must be positive")
+        self.capacity = capacity
+        self.min_per_class = min_per_class
+        self.X: Optional[np.ndarray] = None
+        self.y = np.empty(capacity, dtype=object)
+        self.size = 0
+        self.seen = 0
+        self.class_counts: Counter = Counter()
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, X: np.ndarray, y: Any):
+        """Offer a batch of samples to the buffer"""
+        X = np.asarray(X, dtype=np.float64)
+        if self.X is None:
+            self.X = np.zeros((self.capacity, X.shape[1]), dtype=np.float64)
+        elif X.shape[1] != self.X.shape[1]:
+            raise ValueError(f"Expected {self.X.shape[1]} features, got {X.shape[1]}")
+
+        for row, label in zip(X, y):
+            self.seen += 1
+            if self.size < self.capacity:
+                slot = self.size
+                self.size += 1
+            else:
+                if self.class_counts[label] < self.min_per_class:
+                    slot = self._evictable_slot()
+                else:
+                    slot = int(self._rng.integers(self.seen))
+                    if slot >= self.capacity or self.class_counts[self.y[slot]] <= self.min_per_class:
+                        continue
+                if slot is None:
+                    continue
+                self.class_counts[self.y[slot]] -= 1
+            self.X[slot] = row
+            self.y[slot] = label
+            self.class_counts[label] += 1
+
+    def _evictable_slot(self) -> Optional[int]:
+        """A random slot whose class keeps enough samples after eviction"""
+        for slot in self._rng.integers(self.size, size=32):
+            if self.class_counts[self.y[slot]] > self.min_per_class:
+                return int(slot)
+        for slot in range(self.size):
+            if self.class_counts[self.y[slot]] > self.min_per_class:
+                return slot
+        return None
+
+    def classes(self) -> List[Any]:
+        """Sorted labels currently in the buffer"""
+        return sorted(label for label, count in self.class_counts.items() if count > 0)
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """All buffered samples (copies)"""
+        if self.X is None:
+            return np.empty((0, 0)), np.empty(0, dtype=object)
+        return self.X[:self.size].copy(), self.y[:self.size].copy()
+
+    def sample(self, n: int, cover_classes: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Draw up to n random samples without replacement
+
+        Args:
+            n: Number of samples
+            cover_classes: Add one sample of every buffered class missing from the draw
+
+        Returns:
+            Tuple of (features, labels)
+        """
+        if self.X is None or self.size == 0:
+            return np.empty((0, 0)), np.empty(0, dtype=object)
+
+        index = self._rng.choice(self.size, size=min(n, self.size), replace=False)
+        if cover_classes:
+            drawn = set(self.y[index])
+            missing = [label for label in self.classes() if label not in drawn]
+            if missing:
+                labels = self.y[:self.size]
+                extra = [self._rng.choice(np.flatnonzero(labels == label)) for label in missing]
+                index = np.concatenate([index, np.asarray(extra, dtype=index.dtype)])
+        return self.X[index].copy(), self.y[index].copy()
@@ -0,0 +1,249 @@
+"""
+Threat Rule Engine
+Compiles threshold rules over the feature schema into a single vectorized evaluation pass
+"""
+
+import json
+import logging
+import operator
+import re
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+import numpy as np
+
+from services.feature_schema import FeatureSchema, THREAT_FEATURE_SCHEMA
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES_PATH = Path(__file__).resolve().parent.parent / "config" / "threat_rules.json"
+
+_OPERATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+_CONDITION_PATTERN = re.compile(r'^\s*([\w.]+)\s*(>=|<=|==|!=|>|<)\s*(-?\d+(?:\.\d+)?)\s*$')
+
+
+class ThreatRule:
+    """A compiled threat rule; all fields are shared, read-only constants"""
+
+    __slots__ = ('type', 'description', 'severity', 'condition', 'recommendations', 'result')
+
+    def __init__(self, rule_type: str, description: str, severity: int,
+                 condition: str, recommendations: Tuple[str, ...]):
+        self.type = rule_type
+        self.description = description
+        self.severity = severity
+        self.condition = condition
+        self.recommendations = recommendations
+        # Interned classification payload, only copied when the rule wins
+        self.result = {
+            'type': rule_type,
+            'description': description,
+            'detected': True,
+            'recommendations': recommendations,
+        }
+
+
+class RuleEngine:
+    """Evaluate threshold rules such as 'behavior.suspicious_file_access > 20 AND ...'
+
+    Conditions are ORs of AND clauses (AND binds tighter). Every distinct
+    comparison is compiled once into column/threshold arrays, so a batch of
+    feature rows is evaluated with a handful of NumPy operations regardless
+    of how many rules are configured. Single rows use a generated
+    straight-line function instead.
+    """
+
+    def __init__(self, rules_path: Optional[str] = None, schema: FeatureSchema = THREAT_FEATURE_SCHEMA):
+        self.schema = schema
+        self.rules_path = Path(rules_path) if rules_path else DEFAULT_RULES_PATH
+        self.reload()
+
+    def reload(self) -> int:
+        """(Re)load and compile rules from the config file; returns the rule count"""
+        with open(self.rules_path, 'r') as f:
+            config = json.load(f)
+        self.compile(config)
+        logger.info(f"Loaded {len(self.rules)} threat rules from {self.rules_path}")
+        return len(self.rules)
+
+    def compile(self, config: Dict[str, Any]):
+        """Compile a rule config dict into evaluation arrays"""
+        rules: List[ThreatRule] = []
+        atoms: Dict[Tuple[int, str, float], int] = {}
+        rule_clauses: List[List[List[int]]] = []
+        base, per_match, cap = [], [], []
+
+        for spec in config.get('rules', []):
+            condition = spec['condition']
+            clauses = []
+            for clause_text in re.split(r'\s+OR\s+', condition.strip()):
+                clause = []
+                for atom_text in re.split(r'\s+AND\s+', clause_text):
+                    match = _CONDITION_PATTERN.match(atom_text)
+                    if not match:
+                        raise ValueError(f"Invalid condition '{atom_text}' in rule {spec.get('type')}")
+                    name, op, threshold = match.groups()
+                    key = (self.schema.column(name), op, float(threshold))
+                    clause.append(atoms.setdefault(key, len(atoms)))
+                clauses.append(clause)
+            rule_clauses.append(clauses)
+
+            confidence = spec.get('confidence', 0.5)
+            if isinstance(confidence, dict):
+                base.append(confidence.get('base', 0.5))
+                per_match.append(confidence.get('per_match', 0.0))
+                cap.append(confidence.get('max', 1.0))
+            else:
+                base.append(confidence)
+                per_match.append(0.0)
+                cap.append(confidence)
+
+            rules.append(ThreatRule(
+                spec['type'],
+                spec.get('description', f"{spec['type']} detected"),
+                int(spec.get('severity', 5)),
+                condition,
+                tuple(spec.get('recommendations', [])),
+            ))
+
+        n_atoms = len(atoms)
+        n_clauses = sum(len(c) for c in rule_clauses)
+        atom_keys = sorted(atoms, key=atoms.get)
+
+        self.atom_columns = np.array([k[0] for k in atom_keys], dtype=np.intp)
+        self.atom_thresholds = np.array([k[2] for k in atom_keys], dtype=np.float64)
+        self.atom_ops = tuple(
+            (_OPERATORS[op], np.array([i for i, k in enumerate(atom_keys) if k[1] == op], dtype=np.intp))
+            for op in _OPERATORS
+            if any(k[1] == op for k in atom_keys)
+        )
+
+        # atom -> clause membership, clause -> rule membership, atom -> rule membership
+        self.clause_atoms = np.zeros((n_atoms, n_clauses), dtype=np.int32)
+        self.clause_sizes = np.zeros(n_clauses, dtype=np.int32)
+        self.rule_clauses = np.zeros((n_clauses, len(rules)), dtype=np.int32)
+        self.rule_atoms = np.zeros((n_atoms, len(rules)), dtype=np.int32)
+        clause_index = 0
+        for rule_index, clauses in enumerate(rule_clauses):
+            for clause in clauses:
+                for atom in set(clause):
+                    self.clause_atoms[atom, clause_index] = 1
+                    self.rule_atoms[atom, rule_index] = 1
+                self.clause_sizes[clause_index] = len(set(clause))
+                self.rule_clauses[clause_index, rule_index] = 1
+                clause_index += 1
+
+        self._evaluate_row = self._compile_scalar(atom_keys, rule_clauses, base, per_match, cap)
+
+        self.base_confidence = np.array(base, dtype=np.float64)
+        self.per_match_confidence = np.array(per_match, dtype=np.float64)
+        self.max_confidence = np.array(cap, dtype=np.float64)
+        self.rules = tuple(rules)
+        self.severity = {rule.type: rule.severity for rule in rules}
+
+        default = config.get('default', {})
+        self.default_rule = ThreatRule(
+            default.get('type', 'unknown'),
+            default.get('description', 'Unknown threat type detected'),
+            int(default.get('severity', 5)),
+            '',
+            tuple(default.get('recommendations', [])),
+        )
+        self.default_confidence = float(default.get('confidence', 0.5))
+        self.severity[self.default_rule.type] = self.default_rule.severity
+
+    @staticmethod
+    def _compile_scalar(atom_keys: List[Tuple[int, str, float]], rule_clauses: List[List[List[int]]],
+                        base: List[float], per_match: List[float], cap: List[float]):
+        """
+        Generate a plain Python function evaluating the rules on one row
+
+        For a single event NumPy call overhead dominates, so the same program
+        is emitted as straight-line comparisons. Every token comes from the
+        validated condition grammar (int column, operator, float threshold).
+        """
+        lines = ["def evaluate_row(v):"]
+        for i, (col, op, threshold) in enumerate(atom_keys):
+            lines.append(f"    a{i} = v[{int(col)}] {op} {float(threshold)!r}")
+        lines.append("    best, best_confidence = -1, 0.0")
+        for rule_index, clauses in enumerate(rule_clauses):
+            condition = " or ".join(
+                "(" + " and ".join(f"a{a}" for a in sorted(set(clause))) + ")" for clause in clauses
+            )
+            atoms = sorted({a for clause in clauses for a in clause})
+            lines.append(f"    if {condition}:")
+            if per_match[rule_index]:
+                matches = " + ".join(f"a{a}" for a in atoms)
+                lines.append(
+                    f"        c = min({float(cap[rule_index])!r}, "
+                    f"{float(base[rule_index])!r} + {float(per_match[rule_index])!r} * ({matches}))"
+                )
+            else:
+                lines.append(f"        c = {float(min(cap[rule_index], base[rule_index]))!r}")
+            lines.append("        if c > best_confidence:")
+            lines.append(f"            best, best_confidence = {rule_index}, c")
+        lines.append("    return best, best_confidence")
+
+        namespace: Dict[str, Any] = {}
+        exec(compile("\n".join(lines), "<threat_rules>", "exec"), namespace)
+        return namespace["evaluate_row"]
+
+    def evaluate(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Evaluate all rules for every row of a feature matrix
+
+        Args:
+            features: (n_rows x n_features) matrix laid out by the schema
+
+        Returns:
+            Tuple of (index of the highest-confidence matching rule per row,
+            -1 if none matched; confidence of that rule per row). Ties go to
+            the rule listed first in the config.
+        """
+        n_rows = features.shape[0]
+        if not self.rules:
+            return np.full(n_rows, -1, dtype=np.intp), np.zeros(n_rows)
+
+        values = features[:, self.atom_columns]
+        hits = np.empty(values.shape, dtype=np.int32)
+        for compare, index in self.atom_ops:
+            hits[:, index] = compare(values[:, index], self.atom_thresholds[index])
+
+        clause_hits = (hits @ self.clause_atoms) == self.clause_sizes
+        rule_hits = (clause_hits.astype(np.int32) @ self.rule_clauses) > 0
+        matches = hits @ self.rule_atoms
+
+        confidences = np.where(
+            rule_hits,
+            np.minimum(self.max_confidence, self.base_confidence + self.per_match_confidence * matches),
+            0.0
+        )
+        best_index = confidences.argmax(axis=1)
+        best_confidence = confidences[np.arange(n_rows), best_index]
+        return np.where(best_confidence > 0, best_index, -1), best_confidence
+
+    def evaluate_row(self, row: Any) -> Tuple[int, float]:
+        """
+        Evaluate all rules for a single feature row
+
+        Same semantics as evaluate() for one row, without per-call NumPy overhead.
+
+        Returns:
+            Tuple of (index of the best matching rule or -1, its confidence)
+        """
+        return self._evaluate_row(row.tolist() if isinstance(row, np.ndarray) else row)
+
+    def classification(self, rule_index: int, confidence: float) -> Dict[str, Any]:
+        """Build the classification dict for an evaluated rule (-1 for the default)"""
+        if rule_index < 0:
+            rule, confidence = self.default_rule, self.default_confidence
+        else:
+            rule = self.rules[rule_index]
+        return {**rule.result, 'confidence': float(confidence)}
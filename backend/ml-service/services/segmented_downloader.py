@@ -0,0 +1,276 @@
+"""
+Segmented Downloader
+Parallel, resumable HTTP downloads using Range requests
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Callable, Optional
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class ChecksumMismatch(ValueError):
+    """Downloaded file does not match the expected checksum"""
+
+
+class SegmentedDownloader:
+    """Download large files in parallel byte ranges, resuming after failures
+
+    The file is written to <dest>.part, with the progress of every segment in
+    a sidecar state file <dest>.part.json (saved at most every
+    progress_interval seconds and whenever a segment stops). A later call for
+    the same URL resumes each segment where it stopped, as long as the server
+    still reports the same size and validator (ETag / Last-Modified). Servers
+    without range support get a plain single-stream download. The finished
+    file is checked against an optional SHA-256 before it is renamed into place.
+    """
+
+    def __init__(self, segments: int = 4,
+                 min_segment_bytes: int = 8 * 1024 * 1024,
+                 chunk_size: int = 1024 * 1024,
+                 retries: int = 3,
+                 timeout: float = 60.0,
+                 progress_interval: float = 5.0,
+                 progress_callback: Optional[Callable[[int, int], None]] = None,
+                 session: Optional[requests.Session] = None):
+        """
+        Args:
+            segments: Maximum number of ranges fetched in parallel
+            min_segment_bytes: Files are not split into segments smaller than this
+            chunk_size: Bytes read per network read
+            retries: Retries per segment after a failed request (resuming each time)
+            timeout: Connect/read timeout in seconds
+            progress_interval: Minimum seconds between progress reports and state saves
+            progress_callback: Called with (downloaded_bytes, total_bytes) at most every progress_interval
+            session: requests session to use (default: a new one)
+        """
+        self.segments = max(1, segments)
+        self.min_segment_bytes = min_segment_bytes
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.timeout = timeout
+        self.progress_interval = progress_interval
+        self.progress_callback = progress_callback
+        self.session = session or requests.Session()
+
+    def download(self, url: str, dest_path: str, sha256: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Download url to dest_path, resuming a previous partial download
+
+        Args:
+            url: File URL
+            dest_path: Destination file path
+            sha256: Expected SHA-256 hex digest (verified if given)
+
+        Returns:
+            Dictionary with path, size, sha256, resumed_bytes, downloaded_bytes,
+            segments, ranged and seconds
+
+        Raises:
+            ChecksumMismatch: The file does not match sha256 (the partial
+                download is discarded)
+            requests.RequestException: A segment still failed after all retries
+                (the partial download is kept for the next call)
+        """
+        start = time.perf_counter()
+        dest = Path(dest_path)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        part_path = Path(f"{dest}.part")
+        state_path = Path(f"{dest}.part.json")
+
+        info = self._probe(url)
+        state = self._load_state(state_path, url, info) if part_path.exists() else None
+        if state is None:
+            state = self._new_state(url, info)
+            with open(part_path, 'wb') as f:
+                if info['size']:
+                    f.truncate(info['size'])
+        resumed = sum(segment['done'] for segment in state['segments'])
+        if resumed:
+            logger.info(f"Resuming {url} at {resumed}/{info['size']} bytes")
+
+        progress = _Progress(self, state, state_path, resumed)
+        pending = [segment for segment in state['segments'] if not self._segment_complete(segment)]
+        fd = os.open(part_path, os.O_WRONLY)
+        try:
+            if state['ranged'] and len(pending) > 1:
+                with ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix='download') as pool:
+                    for future in [pool.submit(self._fetch_segment, url, fd, segment, state, progress)
+                                   for segment in pending]:
+                        future.result()
+            else:
+                for segment in pending:
+                    self._fetch_segment(url, fd, segment, state, progress)
+        finally:
+            os.close(fd)
+            progress.save()
+
+        digest = self._sha256(part_path)
+        if sha256 and digest != sha256.lower():
+            part_path.unlink()
+            state_path.unlink()
+            raise ChecksumMismatch(f"SHA-256 mismatch for {url}: expected {sha256}, got {digest}")
+
+        os.replace(part_path, dest)
+        state_path.unlink()
+        size = dest.stat().st_size
+        seconds = time.perf_counter() - start
+        logger.info(f"Downloaded {url} ({size} bytes, {len(state['segments'])} segments) in {seconds:.1f}s")
+
+        return {
+            'path': str(dest),
+            'size': size,
+            'sha256': digest,
+            'resumed_bytes': resumed,
+            'downloaded_bytes': progress.downloaded - resumed,
+            'segments': len(state['segments']),
+            'ranged': state['ranged'],
+            'seconds': seconds
+        }
+
+    def _probe(self, url: str) -> Dict[str, Any]:
+        """Size, range support and validators of the remote file"""
+        response = self.session.head(url, allow_redirects=True, timeout=self.timeout)
+        if response.status_code >= 400:
+            # Some servers refuse HEAD; a one-byte range request answers the same questions
+            response = self.session.get(url, headers={'Range': 'bytes=0-0'}, stream=True, timeout=self.timeout)
+            response.close()
+            response.raise_for_status()
+            if response.status_code == 206:
+                total = response.headers.get('Content-Range', '').rpartition('/')[2]
+                return {
+                    'size': int(total) if total.isdigit() else None,
+                    'ranges': True,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified')
+                }
+        length = response.headers.get('Content-Length')
+        return {
+            'size': int(length) if length and length.isdigit() else None,
+            'ranges': response.headers.get('Accept-Ranges', '').lower() == 'bytes',
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')
+        }
+
+    def _new_state(self, url: str, info: Dict[str, Any]) -> Dict[str, Any]:
+        """Split the file into segments (a single open-ended one without range support)"""
+        size = info['size']
+        ranged = bool(info['ranges'] and size)
+        if ranged:
+            count = max(1, min(self.segments, size // self.min_segment_bytes))
+            bounds = [size * i // count for i in range(count + 1)]
+            segments = [{'start': bounds[i], 'end': bounds[i + 1] - 1, 'done': 0} for i in range(count)]
+        else:
+            segments = [{'start': 0, 'end': size - 1 if size else None, 'done': 0}]
+        return {
+            'url': url,
+            'size': size,
+            'etag': info['etag'],
+            'last_modified': info['last_modified'],
+            'ranged': ranged,
+            'segments': segments
+        }
+
+    @staticmethod
+    def _load_state(state_path: Path, url: str, info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Saved state if it belongs to the same, unchanged remote file"""
+        try:
+            with open(state_path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not state.get('ranged') or (state['url'], state['size'], state['etag'], state['last_modified']) != (
+                url, info['size'], info['etag'], info['last_modified']):
+            logger.info(f"Discarding partial download of {url}: remote file changed or not resumable")
+            return None
+        return state
+
+    @staticmethod
+    def _segment_complete(segment: Dict[str, Any]) -> bool:
+        return segment['end'] is not None and segment['start'] + segment['done'] > segment['end']
+
+    def _fetch_segment(self, url: str, fd: int, segment: Dict[str, Any], state: Dict[str, Any], progress: '_Progress'):
+        """Download the rest of one segment, resuming after failed requests"""
+        attempt = 0
+        while not self._segment_complete(segment):
+            offset = segment['start'] + segment['done']
+            headers = {}
+            if state['ranged']:
+                headers['Range'] = f"bytes={offset}-{segment['end']}"
+                if state['etag']:
+                    headers['If-Range'] = state['etag']
+            try:
+                with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    if state['ranged'] and response.status_code != 206:
+                        raise requests.HTTPError(f"Server ignored range request (status {response.status_code})")
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        if chunk:
+                            os.pwrite(fd, chunk, offset)
+                            offset += len(chunk)
+                            progress.advance(segment, len(chunk))
+                if segment['end'] is None:
+                    return  # unknown size: the stream ended
+                if not self._segment_complete(segment):
+                    raise requests.ConnectionError(f"Connection closed at byte {offset} of segment ending at {segment['end']}")
+            except requests.RequestException as e:
+                attempt += 1
+                progress.save()
+                if attempt > self.retries or not state['ranged']:
+                    raise
+                logger.warning(f"Segment {segment['start']}-{segment['end']} of {url} failed ({e}); "
+                               f"retrying from byte {segment['start'] + segment['done']}")
+                time.sleep(min(2 ** attempt, 30) * 0.1)
+
+    @staticmethod
+    def _sha256(path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+
+class _Progress:
+    """Byte counters shared by the segment threads, with rate-limited reporting and state saves"""
+
+    def __init__(self, downloader: SegmentedDownloader, state: Dict[str, Any], state_path: Path, downloaded: int):
+        self.downloader = downloader
+        self.state = state
+        self.state_path = state_path
+        self.downloaded = downloaded
+        self._lock = threading.Lock()
+        self._last_report = time.monotonic()
+
+    def advance(self, segment: Dict[str, Any], n_bytes: int):
+        with self._lock:
+            segment['done'] += n_bytes
+            self.downloaded += n_bytes
+            now = time.monotonic()
+            if now - self._last_report < self.downloader.progress_interval:
+                return
+            self._last_report = now
+            self._save_locked()
+        total = self.state['size']
+        if total:
+            logger.info(f"Download progress {self.state['url']}: {self.downloaded / total:.1%}")
+        if self.downloader.progress_callback:
+            self.downloader.progress_callback(self.downloaded, total or 0)
+
+    def save(self):
+        with self._lock:
+            self._save_locked()
+
+    def _save_locked(self):
+        tmp_path = self.state_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.state_path)
@@ -3,27 +3,103 @@ Self-Learning Engine
 Continuously learns from new threats, documents, and datasets
 """
 
+import hashlib
 import logging
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional
 from datetime import datetime
-import pickle
+import multiprocessing
 import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, HistGradientBoostingClassifier
+from sklearn.linear_model import SGDClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
 from sklearn.preprocessing import StandardScaler
 import joblib
 
+from services.dataset_loader import ChunkedDatasetLoader, sample_indices
+from services.dataset_manager import DatasetManager
+from services.feature_schema import THREAT_FEATURE_SCHEMA
+from services.model_store import ModelStore
+from services.replay_buffer import ReplayBuffer
+
 logger = logging.getLogger(__name__)
 
 
+# Called with (progress in [0, 1], message); may raise to abort the work
+ProgressCallback = Callable[[float, Optional[str]], None]
+
+
+def _sub_progress(progress_callback: Optional[ProgressCallback], start: float, end: float) -> Optional[ProgressCallback]:
+    """Callback mapping progress in [0, 1] onto [start, end] of progress_callback (None if no callback)"""
+    if progress_callback is None:
+        return None
+    return lambda progress, message=None: progress_callback(start + (end - start) * progress, message)
+
+
+def _fit_and_score(model_name: str, model: Any, X_train: np.ndarray, y_train: np.ndarray,
+                   X_test: np.ndarray, y_test: np.ndarray) -> tuple:
+    """Fit one candidate model and score it (module-level so worker processes can run it)"""
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    train_seconds = time.perf_counter() - start
+    
+    y_pred = model.predict(X_test)
+    metrics = {
+        'accuracy': accuracy_score(y_test, y_pred),
+        'precision': precision_score(y_test, y_pred, average='weighted', zero_division=0),
+        'recall': recall_score(y_test, y_pred, average='weighted', zero_division=0),
+        'f1_score': f1_score(y_test, y_pred, average='weighted', zero_division=0),
+        'train_seconds': train_seconds
+    }
+    return model_name, model, metrics
+
+
 class SelfLearningEngine:
     """Self-learning engine that continuously improves from new data"""
     
-    def __init__(self, model_dir: str = "models"):
+    ONLINE_MODEL_FILENAME = "threat_online.joblib"
+    
+    # Trees in a forest rebuilt from the replay buffer
+    ONLINE_INITIAL_TREES = 50
+    
+    # From this many training samples, histogram-based gradient boosting
+    # replaces GradientBoostingClassifier (which does not scale to large data)
+    HIST_GRADIENT_BOOSTING_MIN_SAMPLES = 50000
+    
+    # Below this many training samples, models are fitted in-process: starting
+    # worker processes would cost more than fitting sequentially
+    PARALLEL_TRAINING_MIN_SAMPLES = 5000
+    
+    def __init__(self, model_dir: str = "models",
+                 replay_capacity: int = 10000,
+                 trees_per_update: int = 10,
+                 max_trees: int = 200,
+                 replay_ratio: float = 1.0,
+                 n_jobs: Optional[int] = None,
+                 parallel_training: bool = True,
+                 dataset_chunksize: int = 100000,
+                 dataset_max_rows: Optional[int] = None,
+                 keep_model_versions: int = 5):
+        """
+        Args:
+            model_dir: Directory for saved models
+            replay_capacity: Past threat samples kept for replay
+            trees_per_update: Trees added to the online forest per threat batch
+            max_trees: Online forest size cap; the oldest trees are dropped beyond it
+            replay_ratio: Replayed past samples per new sample in each update
+            n_jobs: CPU cores for batch training (default: all)
+            parallel_training: Fit the candidate batch models concurrently in worker processes
+            dataset_chunksize: Rows read per chunk from CSV datasets
+            dataset_max_rows: Default cap on CSV rows trained on (sampled; None = all rows)
+            keep_model_versions: Trained model sets kept in the model store (0 = all)
+        """
         self.model_dir = Path(model_dir)
         self.model_dir.mkdir(exist_ok=True)
         
@@ -33,50 +109,118 @@ class SelfLearningEngine:
             'gradient_boosting': GradientBoostingClassifier(n_estimators=100, random_state=42)
         }
         
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.parallel_training = parallel_training
+        self.dataset_chunksize = dataset_chunksize
+        self.dataset_max_rows = dataset_max_rows
+        
         self.scaler = StandardScaler()
+        self.threat_schema = THREAT_FEATURE_SCHEMA
         self.feature_names = []
+        self.class_names: List[Any] = []
         self.model_version = "1.0.0"
         self.training_history = []
         
+        # Versioned model sets; serving_models is the fitted set in use, replaced
+        # as a whole (a single reference assignment) when a new set is trained
+        # or loaded, so readers always see matching models, scaler and features
+        self.model_store = ModelStore(str(self.model_dir / 'store'), keep_versions=keep_model_versions)
+        self.serving_models: Optional[Dict[str, Any]] = None
+        self._model_watcher: Optional[threading.Thread] = None
+        self._model_watcher_stop = threading.Event()
+        
+        # Incremental threat models (threat feature schema): an SGD classifier
+        # updated with partial_fit and a warm-started forest that grows by
+        # trees_per_update trees per batch, both fed the new batch plus replayed
+        # samples from a bounded buffer of past threats
+        self.trees_per_update = trees_per_update
+        self.max_trees = max_trees
+        self.replay_ratio = replay_ratio
+        self.replay_buffer = ReplayBuffer(replay_capacity)
+        self.online_models: Dict[str, Any] = {}
+        self.online_scaler = StandardScaler()
+        self.online_classes: List[Any] = []
+        # Bumped whenever the online models change, so served copies know to refresh
+        self.online_version = 0
+        
         # Load existing models if available
         self._load_models()
+        self._load_online_models()
     
-    def learn_from_dataset(self, dataset_path: str, dataset_type: str = "auto") -> Dict[str, Any]:
+    def learn_from_dataset(self, dataset_path: str, dataset_type: str = "auto",
+                           max_rows: Optional[int] = None,
+                           stratified: bool = True,
+                           progress_callback: Optional[ProgressCallback] = None) -> Dict[str, Any]:
         """
         Learn from a cybersecurity dataset
         
+        CSV files are read in chunks with compact dtypes and cleaned chunk by
+        chunk, so memory is bounded by the rows kept rather than the file size.
+        If DatasetManager.compile_dataset has compiled the file, its
+        memory-mapped arrays are used instead of parsing the CSV again.
+        
         Args:
             dataset_path: Path to dataset file (CSV, JSON, etc.)
             dataset_type: Type of dataset (cicids2017, unsw-nb15, etc.) or 'auto' for detection
+            max_rows: Train on a sample of at most this many CSV rows (default: dataset_max_rows)
+            stratified: Sample per class so rare attack classes are kept
+            progress_callback: Called with (progress, message) after loading and each trained model
         
         Returns:
             Training results and model performance metrics
         """
         try:
             logger.info(f"Loading dataset from {dataset_path}")
+            loading_stats = None
             
             # Load dataset
             if dataset_path.endswith('.csv'):
-                df = pd.read_csv(dataset_path)
+                if dataset_type == "auto":
+                    dataset_type = self._detect_dataset_type(pd.read_csv(dataset_path, nrows=100))
+                max_rows = max_rows if max_rows is not None else self.dataset_max_rows
+                dataset = DatasetManager.load_compiled(dataset_path)
+                if dataset is not None:
+                    # X is memory-mapped: only the sampled rows are read into memory
+                    X, y = dataset['X'], dataset['y']
+                    if max_rows is not None and len(y) > max_rows:
+                        index = sample_indices(y, max_rows, stratified=stratified)
+                        X, y = X[index], y[index]
+                    loading_stats = {'compiled': True, 'rows_read': len(dataset['y']), 'rows_loaded': len(y)}
+                else:
+                    loader = ChunkedDatasetLoader(
+                        chunksize=self.dataset_chunksize,
+                        max_rows=max_rows,
+                        stratified=stratified
+                    )
+                    dataset = loader.load(dataset_path)
+                    X, y = dataset['X'], dataset['y']
+                    loading_stats = {'compiled': False, **dataset['stats']}
+                self.feature_names = dataset['feature_names']
+                self.class_names = dataset['classes']
             elif dataset_path.endswith('.json'):
                 df = pd.read_json(dataset_path)
+                
+                # Preprocess dataset based on type
+                if dataset_type == "auto":
+                    dataset_type = self._detect_dataset_type(df)
+                
+                processed_data = self._preprocess_dataset(df, dataset_type)
+                
+                # Extract features and labels
+                X, y = self._extract_features_labels(processed_data, dataset_type)
             else:
                 raise ValueError(f"Unsupported file format: {dataset_path}")
             
-            # Preprocess dataset based on type
-            if dataset_type == "auto":
-                dataset_type = self._detect_dataset_type(df)
-            
-            processed_data = self._preprocess_dataset(df, dataset_type)
-            
-            # Extract features and labels
-            X, y = self._extract_features_labels(processed_data, dataset_type)
+            if progress_callback:
+                progress_callback(0.3, f"Loaded {len(X)} samples")
             
             # Train models
-            training_results = self._train_models(X, y)
+            training_results = self._train_models(X, y, progress_callback=_sub_progress(progress_callback, 0.3, 0.9))
             
             # Save models
-            self._save_models()
+            if progress_callback:
+                progress_callback(0.9, "Saving models")
+            self._save_models(source=dataset_path)
             
             logger.info(f"Successfully learned from dataset. Accuracy: {training_results['accuracy']:.2%}")
             
@@ -86,6 +230,7 @@ class SelfLearningEngine:
                 'samples_processed': len(X),
                 'features': len(X[0]) if len(X) > 0 else 0,
                 'training_results': training_results,
+                'loading': loading_stats,
                 'model_version': self.model_version
             }
             
@@ -93,12 +238,15 @@ class SelfLearningEngine:
             logger.error(f"Error learning from dataset: {str(e)}")
             raise
     
-    def learn_from_threats(self, threats: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def learn_from_threats(self, threats: List[Dict[str, Any]], incremental: bool = True) -> Dict[str, Any]:
         """
         Learn from real threat incidents (online learning)
         
         Args:
             threats: List of threat dictionaries with features and labels
+            incremental: Update the online models with this batch (cost
+                proportional to the batch); False refits the batch models on
+                this batch only
         
         Returns:
             Learning results
@@ -107,29 +255,24 @@ class SelfLearningEngine:
             if not threats:
                 return {'success': False, 'message': 'No threats provided'}
             
-            # Convert threats to feature vectors
-            X = []
-            y = []
+            # Convert threats to feature vectors (same fixed layout as ThreatDetector)
+            valid_threats = [t for t in threats if self.threat_schema.has_features(t)]
             
-            for threat in threats:
-                features = self._extract_threat_features(threat)
-                label = threat.get('classification', 'unknown')
-                
-                if features:
-                    X.append(features)
-                    y.append(label)
-            
-            if not X:
+            if not valid_threats:
                 return {'success': False, 'message': 'No valid features extracted'}
             
-            X = np.array(X)
-            
-            # Incremental learning (partial fit if supported)
-            # For now, retrain on accumulated data
-            training_results = self._train_models(X, y)
+            X = self.threat_schema.fill_matrix(valid_threats)
+            y = [t.get('classification', 'unknown') for t in valid_threats]
             
-            # Save updated models
-            self._save_models()
+            if incremental:
+                training_results = self._update_online_models(X, np.asarray(y, dtype=object))
+                self._save_online_models()
+            else:
+                self.feature_names = list(self.threat_schema.names)
+                self.class_names = sorted(set(y))
+                self.replay_buffer.add(X, y)
+                training_results = self._train_models(X, y)
+                self._save_models(source='threats')
             
             logger.info(f"Learned from {len(threats)} threats")
             
@@ -196,7 +339,8 @@ class SelfLearningEngine:
     def hybrid_learn(self, 
                      datasets: Optional[List[str]] = None,
                      threats: Optional[List[Dict[str, Any]]] = None,
-                     documents: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+                     documents: Optional[List[Dict[str, Any]]] = None,
+                     progress_callback: Optional[ProgressCallback] = None) -> Dict[str, Any]:
         """
         Hybrid learning: Combine datasets, threats, and documents
         
@@ -204,6 +348,7 @@ class SelfLearningEngine:
             datasets: List of dataset file paths
             threats: List of threat incidents
             documents: List of document knowledge
+            progress_callback: Called with (progress, message) as each dataset trains and between steps
         
         Returns:
             Combined learning results
@@ -217,15 +362,18 @@ class SelfLearningEngine:
         
         # Learn from datasets
         if datasets:
-            for dataset_path in datasets:
+            for i, dataset_path in enumerate(datasets):
                 try:
-                    result = self.learn_from_dataset(dataset_path)
+                    result = self.learn_from_dataset(dataset_path, progress_callback=_sub_progress(
+                        progress_callback, 0.9 * i / len(datasets), 0.9 * (i + 1) / len(datasets)))
                     results['dataset_learning'] = result
                 except Exception as e:
                     logger.error(f"Error learning from dataset {dataset_path}: {e}")
         
         # Learn from threats
         if threats:
+            if progress_callback:
+                progress_callback(0.9, "Learning from threats")
             try:
                 results['threat_learning'] = self.learn_from_threats(threats)
             except Exception as e:
@@ -233,6 +381,8 @@ class SelfLearningEngine:
         
         # Learn from documents
         if documents:
+            if progress_callback:
+                progress_callback(0.95, "Learning from documents")
             try:
                 results['document_learning'] = self.learn_from_documents(documents)
             except Exception as e:
@@ -300,71 +450,204 @@ class SelfLearningEngine:
             from sklearn.preprocessing import LabelEncoder
             le = LabelEncoder()
             y = le.fit_transform(y)
+            self.class_names = list(le.classes_)
+        else:
+            self.class_names = sorted(np.unique(y).tolist())
         
         return X, y
     
-    def _train_models(self, X: np.ndarray, y: np.ndarray) -> Dict[str, Any]:
-        """Train ML models"""
+    def _candidate_models(self, n_samples: int) -> Dict[str, Any]:
+        """Unfitted candidate models for a training set of n_samples, with cores split between them"""
+        candidates = {name: clone(model) for name, model in self.models.items()}
+        if n_samples >= self.HIST_GRADIENT_BOOSTING_MIN_SAMPLES:
+            candidates.pop('gradient_boosting', None)
+            candidates['hist_gradient_boosting'] = HistGradientBoostingClassifier(random_state=42)
+        elif 'hist_gradient_boosting' in candidates:
+            candidates.pop('hist_gradient_boosting')
+            candidates['gradient_boosting'] = GradientBoostingClassifier(n_estimators=100, random_state=42)
+        
+        # The forest parallelizes across trees; the boosting models take one
+        # core each (the histogram variant uses OpenMP threads on its own)
+        if 'random_forest' in candidates:
+            other_models = len(candidates) - 1 if self.parallel_training and self.n_jobs > 1 else 0
+            candidates['random_forest'].set_params(n_jobs=max(1, self.n_jobs - other_models))
+        return candidates
+    
+    def _train_models(self, X: np.ndarray, y: np.ndarray,
+                      progress_callback: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """Train the candidate ML models, concurrently for large training sets
+        
+        progress_callback, if given, is called as each model finishes.
+        """
+        start = time.perf_counter()
+        
         # Split data
         X_train, X_test, y_train, y_test = train_test_split(
             X, y, test_size=0.2, random_state=42, stratify=y
         )
         
         # Scale features
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        scaler = StandardScaler()
+        X_train_scaled = scaler.fit_transform(X_train)
+        X_test_scaled = scaler.transform(X_test)
+        
+        candidates = self._candidate_models(len(X_train))
+        jobs = [(name, model, X_train_scaled, y_train, X_test_scaled, y_test) for name, model in candidates.items()]
+        
+        fitted = None
+        parallel = (self.parallel_training and len(jobs) > 1 and self.n_jobs > 1
+                    and len(X_train) >= self.PARALLEL_TRAINING_MIN_SAMPLES)
+        if parallel:
+            try:
+                # spawn: the service process runs threads, which fork() does not copy
+                # safely. Spawned workers re-run the main module, which must not start
+                # the service (see server.py)
+                with ProcessPoolExecutor(max_workers=len(jobs),
+                                         mp_context=multiprocessing.get_context('spawn')) as pool:
+                    fitted = []
+                    for result in pool.map(_fit_and_score, *zip(*jobs)):
+                        fitted.append(result)
+                        if progress_callback:
+                            progress_callback(len(fitted) / len(jobs), f"Trained {result[0]}")
+            except Exception as e:
+                logger.warning(f"Parallel training failed ({e}); training sequentially")
+                parallel = False
+                fitted = None
+        if fitted is None:
+            fitted = []
+            for job in jobs:
+                fitted.append(_fit_and_score(*job))
+                if progress_callback:
+                    progress_callback(len(fitted) / len(jobs), f"Trained {job[0]}")
         
         results = {}
+        models = {}
+        for model_name, model, metrics in fitted:
+            models[model_name] = model
+            results[model_name] = metrics
+        self.models = models
+        self.scaler = scaler
         
-        # Train each model
-        for model_name, model in self.models.items():
-            model.fit(X_train_scaled, y_train)
-            
-            # Evaluate
-            y_pred = model.predict(X_test_scaled)
+        # Use best model
+        best_model_name = max(results.keys(), key=lambda k: results[k]['accuracy'])
+        results['best_model'] = best_model_name
+        results['accuracy'] = results[best_model_name]['accuracy']
+        results['parallel'] = parallel
+        results['wall_seconds'] = time.perf_counter() - start
+        results['data_hash'] = self._data_hash(X, y)
+        
+        self.training_history.append({
+            'timestamp': datetime.now().isoformat(),
+            'data_hash': results['data_hash'],
+            'samples': len(X),
+            'features': X.shape[1] if len(X) else 0,
+            'parallel': parallel,
+            'wall_seconds': results['wall_seconds'],
+            'models': {
+                model_name: {'accuracy': metrics['accuracy'], 'train_seconds': metrics['train_seconds']}
+                for model_name, model, metrics in fitted
+            },
+            'best_model': best_model_name,
+            'accuracy': results['accuracy']
+        })
+        logger.info(
+            f"Trained {len(fitted)} models in {results['wall_seconds']:.1f}s "
+            f"({'parallel' if parallel else 'sequential'}): "
+            + ", ".join(f"{name} {metrics['train_seconds']:.1f}s" for name, _, metrics in fitted)
+        )
+        
+        return results
+    
+    def _update_online_models(self, X: np.ndarray, y: np.ndarray) -> Dict[str, Any]:
+        """
+        Update the online threat models with one batch
+        
+        Models are scored on the batch before learning from it (test-then-train),
+        so the reported metrics are out-of-sample. While the label set stays the
+        same the update touches only the batch and an equally sized replay sample;
+        a new label rebuilds the models from the bounded replay buffer.
+        """
+        start = time.perf_counter()
+        results: Dict[str, Any] = {'mode': 'incremental', 'samples': len(y)}
+        
+        if self.online_models:
+            results.update(self._score_online_models(X, y))
+        
+        self.replay_buffer.add(X, y)
+        classes = self.replay_buffer.classes()
+        
+        if len(classes) < 2:
+            results['message'] = 'Need at least two threat classes to train'
+        elif not self.online_models or classes != self.online_classes:
+            self._refit_online_models(classes)
+            results['refit'] = True
+        else:
+            X_replay, y_replay = self.replay_buffer.sample(int(len(y) * self.replay_ratio))
+            if len(y_replay):
+                X_update = np.vstack([X, X_replay])
+                y_update = np.concatenate([y, y_replay])
+            else:
+                X_update, y_update = X, y
             
-            accuracy = accuracy_score(y_test, y_pred)
-            precision = precision_score(y_test, y_pred, average='weighted', zero_division=0)
-            recall = recall_score(y_test, y_pred, average='weighted', zero_division=0)
-            f1 = f1_score(y_test, y_pred, average='weighted', zero_division=0)
+            self.online_scaler.partial_fit(X)
+            self.online_models['sgd'].partial_fit(self.online_scaler.transform(X_update), y_update)
             
+            forest = self.online_models['random_forest']
+            excess = len(forest.estimators_) + self.trees_per_update - self.max_trees
+            if excess > 0:
+                forest.estimators_ = forest.estimators_[excess:]
+            forest.n_estimators = len(forest.estimators_) + self.trees_per_update
+            forest.fit(X_update, y_update)
+            results['refit'] = False
+        
+        if self.online_models:
+            self.online_version += 1
+        results['classes'] = list(self.online_classes)
+        results['buffer_size'] = len(self.replay_buffer)
+        results['trees'] = len(self.online_models['random_forest'].estimators_) if self.online_models else 0
+        results['seconds'] = time.perf_counter() - start
+        return results
+    
+    def _refit_online_models(self, classes: List[Any]):
+        """Rebuild the online models from the replay buffer (bounded by its capacity)"""
+        X, y = self.replay_buffer.arrays()
+        self.online_scaler = StandardScaler().fit(X)
+        
+        sgd = SGDClassifier(loss='log_loss', random_state=42)
+        sgd.partial_fit(self.online_scaler.transform(X), y, classes=np.asarray(classes, dtype=object))
+        
+        forest = RandomForestClassifier(
+            n_estimators=min(self.ONLINE_INITIAL_TREES, self.max_trees), warm_start=True, random_state=42
+        )
+        forest.fit(X, y)
+        
+        self.online_models = {'sgd': sgd, 'random_forest': forest}
+        self.online_classes = list(classes)
+        logger.info(f"Rebuilt online threat models from {len(y)} buffered samples ({len(classes)} classes)")
+    
+    def _score_online_models(self, X: np.ndarray, y: np.ndarray) -> Dict[str, Any]:
+        """Score the online models on a batch they have not seen yet"""
+        results: Dict[str, Any] = {}
+        for model_name, model in self.online_models.items():
+            features = self.online_scaler.transform(X) if model_name == 'sgd' else X
+            y_pred = model.predict(features)
             results[model_name] = {
-                'accuracy': accuracy,
-                'precision': precision,
-                'recall': recall,
-                'f1_score': f1
+                'accuracy': accuracy_score(y, y_pred),
+                'precision': precision_score(y, y_pred, average='weighted', zero_division=0),
+                'recall': recall_score(y, y_pred, average='weighted', zero_division=0),
+                'f1_score': f1_score(y, y_pred, average='weighted', zero_division=0)
             }
-        
-        # Use best model
         best_model_name = max(results.keys(), key=lambda k: results[k]['accuracy'])
         results['best_model'] = best_model_name
         results['accuracy'] = results[best_model_name]['accuracy']
-        
         return results
     
-    def _extract_threat_features(self, threat: Dict[str, Any]) -> Optional[List[float]]:
-        """Extract features from a threat incident"""
-        features = []
-        
-        # Network features
-        if 'network' in threat:
-            network = threat['network']
-            features.extend([
-                network.get('packet_count', 0),
-                network.get('bytes_transferred', 0),
-                network.get('connection_count', 0),
-            ])
-        
-        # Behavioral features
-        if 'behavior' in threat:
-            behavior = threat['behavior']
-            features.extend([
-                behavior.get('suspicious_file_access', 0),
-                behavior.get('unusual_network_activity', 0),
-                behavior.get('privilege_escalation', 0),
-            ])
-        
-        return features if features else None
+    def _extract_threat_features(self, threat: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Extract features from a threat incident (None if it has no known sections)"""
+        if not self.threat_schema.has_features(threat):
+            return None
+        
+        return self.threat_schema.fill_row(threat)
     
     def _evaluate_combined_models(self) -> float:
         """Evaluate combined model performance"""
@@ -375,27 +658,152 @@ class SelfLearningEngine:
             return sum(accuracies) / len(accuracies) if accuracies else 0.0
         return 0.0
     
-    def _save_models(self):
-        """Save trained models"""
-        for model_name, model in self.models.items():
-            model_path = self.model_dir / f"{model_name}_v{self.model_version}.pkl"
-            joblib.dump(model, model_path)
+    def _save_models(self, source: Optional[str] = None):
+        """Save the trained models as a new model store version and serve them"""
+        history = self.training_history[-1] if self.training_history else {}
+        manifest = {
+            'source': source,
+            'data_hash': history.get('data_hash'),
+            'samples': history.get('samples'),
+            'feature_names': list(self.feature_names),
+            'classes': [c.item() if isinstance(c, np.generic) else c for c in self.class_names],
+            'best_model': history.get('best_model'),
+            'accuracy': history.get('accuracy'),
+            'metrics': history.get('models', {}),
+            'trained_at': history.get('timestamp')
+        }
+        version = self.model_store.save({**self.models, 'scaler': self.scaler}, manifest)
+        self.model_version = version
+        self._serve(version, dict(self.models), self.scaler, self.model_store.manifest(version))
+        
+        logger.info(f"Models saved to {self.model_store.root / version}")
+    
+    def _serve(self, version: str, models: Dict[str, Any], scaler: StandardScaler, manifest: Dict[str, Any]):
+        """Make a fitted model set the one in use"""
+        self.serving_models = {
+            'version': version,
+            'models': models,
+            'scaler': scaler,
+            'feature_names': manifest.get('feature_names', []),
+            'classes': manifest.get('classes', []),
+            'best_model': manifest.get('best_model'),
+            'manifest': manifest
+        }
+    
+    def reload_models(self) -> bool:
+        """
+        Switch to the latest stored model set if it is not the one in use
+        
+        Lets a serving process pick up models trained elsewhere (e.g. by a
+        background job in another worker) without restarting.
+        
+        Returns:
+            True if a different model set was loaded
+        """
+        latest = self.model_store.latest_version()
+        if latest is None or latest == self.model_version:
+            return False
+        return self._load_models(latest)
+    
+    def start_model_watcher(self, interval_seconds: float = 30.0):
+        """Periodically pick up model sets saved by other processes in a background thread"""
+        if self._model_watcher is not None:
+            return
         
-        # Save scaler
-        scaler_path = self.model_dir / f"scaler_v{self.model_version}.pkl"
-        joblib.dump(self.scaler, scaler_path)
+        def watch():
+            while not self._model_watcher_stop.wait(interval_seconds):
+                self.reload_models()
         
-        logger.info(f"Models saved to {self.model_dir}")
+        self._model_watcher = threading.Thread(target=watch, name='model-watcher', daemon=True)
+        self._model_watcher.start()
+    
+    def stop_model_watcher(self):
+        if self._model_watcher is not None:
+            self._model_watcher_stop.set()
+            self._model_watcher.join(timeout=5)
+            self._model_watcher = None
+            self._model_watcher_stop.clear()
     
-    def _load_models(self):
-        """Load existing models if available"""
+    def get_model_info(self) -> Dict[str, Any]:
+        """Summary of the model set in use and of the stored versions"""
+        serving = self.serving_models
+        manifest = serving['manifest'] if serving else {}
+        return {
+            'fitted': serving is not None,
+            'version': serving['version'] if serving else None,
+            'best_model': manifest.get('best_model'),
+            'accuracy': manifest.get('accuracy'),
+            'trained_at': manifest.get('trained_at'),
+            'samples': manifest.get('samples'),
+            'features': len(manifest.get('feature_names', [])),
+            'data_hash': manifest.get('data_hash'),
+            'stored_versions': self.model_store.list_versions()
+        }
+    
+    @staticmethod
+    def _data_hash(X: np.ndarray, y: np.ndarray) -> str:
+        """Fingerprint of a training set"""
+        digest = hashlib.sha256()
+        X = np.ascontiguousarray(X)
+        digest.update(str((X.shape, X.dtype.str)).encode())
+        digest.update(X.data)
+        y = np.asarray(y)
+        digest.update(y.tobytes() if y.dtype != object else '\x1f'.join(map(str, y)).encode())
+        return digest.hexdigest()
+    
+    def _save_online_models(self):
+        """Save the online threat models and replay buffer (atomic replace)"""
+        path = self.model_dir / self.ONLINE_MODEL_FILENAME
+        tmp_path = path.with_suffix('.tmp')
+        joblib.dump({
+            'feature_names': list(self.threat_schema.names),
+            'models': self.online_models,
+            'scaler': self.online_scaler,
+            'classes': self.online_classes,
+            'replay_buffer': self.replay_buffer,
+        }, tmp_path)
+        os.replace(tmp_path, path)
+    
+    def _load_online_models(self):
+        """Load the online threat models and replay buffer if saved with the same feature schema"""
+        path = self.model_dir / self.ONLINE_MODEL_FILENAME
+        if not path.exists():
+            return
+        try:
+            state = joblib.load(path)
+            if state.get('feature_names') != list(self.threat_schema.names):
+                logger.warning(f"Ignoring {path}: feature schema changed")
+                return
+            self.online_models = state['models']
+            self.online_scaler = state['scaler']
+            self.online_classes = state['classes']
+            self.replay_buffer = state['replay_buffer']
+            self.online_version += 1
+            logger.info(f"Loaded online threat models ({len(self.replay_buffer)} buffered samples)")
+        except Exception as e:
+            logger.warning(f"Could not load online threat models: {e}")
+    
+    def _load_models(self, version: Optional[str] = None) -> bool:
+        """Load a stored model set (default: latest), memory-mapped, and serve it"""
         try:
-            # Find latest model files
-            model_files = list(self.model_dir.glob("*.pkl"))
-            if model_files:
-                # Load most recent model
-                latest_model = max(model_files, key=lambda p: p.stat().st_mtime)
-                # This is simplified - in production, load all models
-                logger.info(f"Found existing models in {self.model_dir}")
+            loaded = self.model_store.load(version)
+            if loaded is None:
+                logger.info(f"No trained model set in {self.model_store.root}")
+                return False
+            
+            artifacts = dict(loaded['artifacts'])
+            scaler = artifacts.pop('scaler')
+            manifest = loaded['manifest']
+            
+            self.models = artifacts
+            self.scaler = scaler
+            self.feature_names = manifest.get('feature_names', [])
+            self.class_names = manifest.get('classes', [])
+            self.model_version = loaded['version']
+            self._serve(loaded['version'], dict(artifacts), scaler, manifest)
+            
+            logger.info(f"Loaded model set {loaded['version']} ({', '.join(artifacts)}) from {self.model_store.root}")
+            return True
         except Exception as e:
             logger.warning(f"Could not load existing models: {e}")
+            return False
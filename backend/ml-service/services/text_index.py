@@ -0,0 +1,178 @@
+"""
+Text Index
+In-memory n-gram inverted index for substring and word-prefix search
+"""
+
+import bisect
+import re
+import threading
+from array import array
+from typing import Dict, List, Any, Optional
+import numpy as np
+
+_WORD = re.compile(r'\w+')
+# Joins the fields of a document; never part of a query match
+_FIELD_SEPARATOR = '\x00'
+
+
+class TextIndex:
+    """Inverted index from character n-grams to the documents containing them
+
+    Each document is one or more text fields, lowercased. Every distinct n-gram
+    of a document gets the document id appended to its posting list, a packed
+    array of unsigned ints that stays sorted because ids only grow. A query is
+    answered by intersecting the posting lists of its own n-grams and
+    verifying the (few) candidates against the text, so the cost depends on
+    the number of candidates rather than the number of documents. Verification
+    stops once `limit` matches are found. Queries shorter than the n-gram size
+    cannot be filtered and verify documents in order until the limit.
+    """
+
+    def __init__(self, gram_size: int = 3):
+        """
+        Args:
+            gram_size: Characters per n-gram
+        """
+        self.gram_size = gram_size
+        self._postings: Dict[str, array] = {}
+        self._texts: List[str] = []
+        # Posting arrays cannot grow while numpy views of them exist
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def add(self, *fields: Optional[str]) -> int:
+        """
+        Index a document
+
+        Args:
+            fields: Text fields of the document (matched separately; None is skipped)
+
+        Returns:
+            Document id (0, 1, 2, ... in insertion order)
+        """
+        text = _FIELD_SEPARATOR.join((f or '').lower() for f in fields)
+        with self._lock:
+            doc_id = len(self._texts)
+            self._texts.append(text)
+            for gram in self._grams(text):
+                posting = self._postings.get(gram)
+                if posting is None:
+                    posting = self._postings[gram] = array('I')
+                posting.append(doc_id)
+        return doc_id
+
+    def update(self, doc_id: int, *fields: Optional[str]):
+        """
+        Replace the text of a document
+
+        The id is removed from the posting lists of n-grams the new text
+        lacks and added to those it gains, so each list keeps every id at
+        most once however often a document changes.
+
+        Args:
+            doc_id: Id returned by add
+            fields: New text fields
+        """
+        text = _FIELD_SEPARATOR.join((f or '').lower() for f in fields)
+        with self._lock:
+            old_grams = self._grams(self._texts[doc_id])
+            new_grams = self._grams(text)
+            self._texts[doc_id] = text
+            for gram in old_grams - new_grams:
+                posting = self._postings[gram]
+                i = bisect.bisect_left(posting, doc_id)
+                if i < len(posting) and posting[i] == doc_id:
+                    del posting[i]
+                if not posting:
+                    del self._postings[gram]
+            for gram in new_grams - old_grams:
+                posting = self._postings.get(gram)
+                if posting is None:
+                    posting = self._postings[gram] = array('I')
+                i = bisect.bisect_left(posting, doc_id)
+                if i == len(posting) or posting[i] != doc_id:
+                    posting.insert(i, doc_id)
+
+    def search(self, query: str, mode: str = 'substring', limit: Optional[int] = None) -> List[int]:
+        """
+        Find documents matching a query
+
+        Args:
+            query: Search text (case-insensitive)
+            mode: "substring" - the query occurs in a field (like `query in field.lower()`);
+                "prefix" - every word of the query starts a word of the document
+            limit: Maximum number of ids returned (None = all)
+
+        Returns:
+            Matching document ids, in insertion order
+        """
+        q = (query or '').lower()
+        if mode == 'substring':
+            needles = [q]
+            verify = lambda text: q in text and _FIELD_SEPARATOR not in q
+        elif mode == 'prefix':
+            needles = _WORD.findall(q)
+            patterns = [re.compile(r'(?<!\w)' + re.escape(word)) for word in needles]
+            verify = lambda text: all(p.search(text) for p in patterns)
+        else:
+            raise ValueError(f"Unknown search mode: {mode}")
+        if limit is not None and limit <= 0:
+            return []
+
+        with self._lock:
+            candidates = self._candidates(needles)
+            texts = self._texts
+            ids = candidates if candidates is not None else range(len(texts))
+            out = []
+            for doc_id in ids:
+                if verify(texts[doc_id]):
+                    out.append(doc_id)
+                    if limit is not None and len(out) >= limit:
+                        break
+            return out
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Document, n-gram and posting counts, and approximate memory use"""
+        postings = sum(len(p) for p in self._postings.values())
+        return {
+            'documents': len(self._texts),
+            'grams': len(self._postings),
+            'postings': postings,
+            'postings_bytes': postings * array('I').itemsize,
+            'text_bytes': sum(len(t) for t in self._texts)
+        }
+
+    def _grams(self, text: str) -> set:
+        n = self.gram_size
+        if len(text) < n:
+            return {text} if text else set()
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def _candidates(self, needles: List[str]) -> Optional[List[int]]:
+        """Ids containing every n-gram of the needles (None = no n-gram to filter on)"""
+        grams = set()
+        for needle in needles:
+            if len(needle) >= self.gram_size:
+                grams |= self._grams(needle)
+        if not grams:
+            return None
+
+        postings = []
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+
+        # Sorted and duplicate-free, whatever the posting lists hold
+        result = np.unique(np.frombuffer(postings[0], dtype=np.uintc))
+        for posting in postings[1:]:
+            if not len(result):
+                break
+            other = np.frombuffer(posting, dtype=np.uintc)
+            positions = np.minimum(np.searchsorted(other, result), len(other) - 1)
+            result = result[other[positions] == result]
+        return result.tolist()
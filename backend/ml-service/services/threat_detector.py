@@ -4,33 +4,174 @@ Detects and classifies cyber threats using ML models
 """
 
 import logging
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+from datetime import datetime
+from pathlib import Path
 import numpy as np
+import pandas as pd
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
-import pickle
+import joblib
+import json
 import os
 
+from services.feature_schema import THREAT_FEATURE_SCHEMA
+from services.rule_engine import RuleEngine
+
 logger = logging.getLogger(__name__)
 
 
 class ThreatDetector:
     """Detect and classify cyber threats"""
     
-    def __init__(self):
+    # Column names of the anomaly model feature matrix (shared with training)
+    FEATURE_NAMES = THREAT_FEATURE_SCHEMA.names
+    
+    MODEL_FILENAME = "threat_detector_anomaly.joblib"
+    
+    # Learned classes that mean "no threat type"
+    BENIGN_LABELS = frozenset({'benign', 'normal', 'none', 'clean'})
+    
+    def __init__(self, model_dir: str = "models", rules_path: Optional[str] = None,
+                 model_server: Optional[Any] = None):
+        """
+        Args:
+            model_dir: Directory of the persisted anomaly model
+            rules_path: Threat rules config file (default rules if None)
+            model_server: ModelServer for learned threat classifiers; the rule
+                classifiers are used while it has no trained model
+        """
         self.models = {}
+        self.schema = THREAT_FEATURE_SCHEMA
+        self.model_dir = Path(model_dir)
+        self.model_path = self.model_dir / self.MODEL_FILENAME
         self.scaler = StandardScaler()
         
-        # Initialize anomaly detection model
+        # Initialize anomaly detection model (fitted once from a baseline dataset)
         self.anomaly_detector = IsolationForest(contamination=0.1, random_state=42)
+        self.is_fitted = False
+        self.model_version = None
+        self.model_trained_at = None
+        self.baseline_samples = 0
+        
+        # Threat type classifiers, compiled from the rules config file
+        self.rule_engine = RuleEngine(rules_path, schema=self.schema)
+        self.model_server = model_server
+        
+        # Load the persisted baseline model if one has been trained
+        self.load_model()
+    
+    def fit_baseline(self, events: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Fit the scaler and anomaly model on a baseline of normal events
+        
+        Args:
+            events: List of input data dicts representing normal activity
+        
+        Returns:
+            Model info of the newly fitted and persisted model
+        """
+        return self._fit_matrix(self._extract_feature_matrix(events))
+    
+    def fit_baseline_from_file(self, baseline_path: str) -> Dict[str, Any]:
+        """
+        Fit the anomaly model from a baseline dataset file
+        
+        Args:
+            baseline_path: JSON file with a list of events, or CSV file whose
+                columns are named after FEATURE_NAMES (missing columns are zero)
+        
+        Returns:
+            Model info of the newly fitted and persisted model
+        """
+        if baseline_path.endswith('.json'):
+            with open(baseline_path, 'r') as f:
+                return self.fit_baseline(json.load(f))
+        
+        if baseline_path.endswith('.csv'):
+            df = pd.read_csv(baseline_path)
+            matrix = self.schema.empty(len(df))
+            for col, name in enumerate(self.FEATURE_NAMES):
+                if name in df.columns:
+                    matrix[:, col] = df[name].fillna(0).to_numpy(dtype=np.float64)
+            return self._fit_matrix(matrix)
+        
+        raise ValueError(f"Unsupported baseline format: {baseline_path}")
+    
+    def _fit_matrix(self, matrix: np.ndarray) -> Dict[str, Any]:
+        """Fit scaler and IsolationForest on a feature matrix and persist them"""
+        if len(matrix) < 2:
+            raise ValueError("Baseline dataset needs at least 2 samples")
+        
+        scaler = StandardScaler().fit(matrix)
+        anomaly_detector = IsolationForest(contamination=0.1, random_state=42)
+        anomaly_detector.fit(scaler.transform(matrix))
+        
+        self.scaler = scaler
+        self.anomaly_detector = anomaly_detector
+        self.model_trained_at = datetime.utcnow().isoformat()
+        self.model_version = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+        self.baseline_samples = len(matrix)
+        self.is_fitted = True
+        
+        self.save_model()
         
-        # Threat type classifiers (can be loaded from trained models)
-        self.threat_classifiers = {
-            'malware': self._classify_malware,
-            'trojan': self._classify_trojan,
-            'ransomware': self._classify_ransomware,
-            'phishing': self._classify_phishing,
-            'zero_day': self._classify_zero_day,
+        logger.info(f"Fitted anomaly model {self.model_version} on {len(matrix)} baseline samples")
+        return self.get_model_info()
+    
+    def save_model(self):
+        """Persist the fitted scaler and anomaly model"""
+        self.model_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Write to a temp file first so readers never see a partial model
+        tmp_path = self.model_path.with_suffix('.tmp')
+        joblib.dump({
+            'scaler': self.scaler,
+            'anomaly_detector': self.anomaly_detector,
+            'feature_names': list(self.FEATURE_NAMES),
+            'version': self.model_version,
+            'trained_at': self.model_trained_at,
+            'baseline_samples': self.baseline_samples,
+        }, tmp_path)
+        os.replace(tmp_path, self.model_path)
+        
+        logger.info(f"Anomaly model saved to {self.model_path}")
+    
+    def load_model(self) -> bool:
+        """Load the persisted anomaly model (memory-mapped) if available"""
+        if not self.model_path.exists():
+            logger.info("No baseline anomaly model found; rule classifiers only until one is trained")
+            return False
+        
+        try:
+            state = joblib.load(self.model_path, mmap_mode='r')
+            
+            if list(state.get('feature_names', [])) != list(self.FEATURE_NAMES):
+                logger.warning(f"Ignoring anomaly model {self.model_path}: feature layout changed")
+                return False
+            
+            self.scaler = state['scaler']
+            self.anomaly_detector = state['anomaly_detector']
+            self.model_version = state.get('version')
+            self.model_trained_at = state.get('trained_at')
+            self.baseline_samples = state.get('baseline_samples', 0)
+            self.is_fitted = True
+            
+            logger.info(f"Loaded anomaly model {self.model_version} from {self.model_path}")
+            return True
+            
+        except Exception as e:
+            logger.warning(f"Could not load anomaly model: {e}")
+            return False
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        """Get information about the loaded anomaly model"""
+        return {
+            'fitted': self.is_fitted,
+            'version': self.model_version,
+            'trained_at': self.model_trained_at,
+            'baseline_samples': self.baseline_samples,
+            'features': len(self.FEATURE_NAMES)
         }
     
     def detect_threat(self, data: Dict[str, Any]) -> Dict[str, Any]:
@@ -46,234 +187,235 @@ class ThreatDetector:
         try:
             features = self._extract_features(data)
             
-            # Anomaly detection
+            # Anomaly detection (None when no baseline model is loaded)
             is_anomaly = self._detect_anomaly(features)
             
-            if not is_anomaly:
+            if is_anomaly is False:
                 return {
                     'threat_detected': False,
                     'confidence': 0.0,
                     'classification': None
                 }
             
-            # Classify threat type
-            classification_result = self._classify_threat(data, features)
+            # Classify threat type (learned classifier if trained, else rules)
+            learned = self._classify_learned(features)
+            if learned is not None:
+                classification_result = learned['classifications'][0]
+            else:
+                classification_result = self._classify_threat(data, features)
+            
+            # Without a baseline model only the classifiers can flag a threat
+            if is_anomaly is None and classification_result['type'] == 'unknown':
+                return {
+                    'threat_detected': False,
+                    'confidence': 0.0,
+                    'classification': None
+                }
             
             # Calculate severity
             severity = self._calculate_severity(data, classification_result)
             
-            return {
+            result = {
                 'threat_detected': True,
                 'classification': classification_result['type'],
                 'confidence': classification_result['confidence'],
                 'severity': severity,
                 'description': classification_result['description'],
-                'recommendations': classification_result.get('recommendations', [])
+                'recommendations': list(classification_result.get('recommendations', [])),
+                'classifier': learned['model'] if learned else 'rules'
             }
+            if learned:
+                result['inference_ms'] = learned['latency_ms']
+            return result
             
         except Exception as e:
             logger.error(f"Error detecting threat: {str(e)}")
             raise
     
-    def _extract_features(self, data: Dict[str, Any]) -> np.ndarray:
-        """Extract features from input data for ML models"""
-        features = []
+    def detect_threats(self, events: List[Dict[str, Any]],
+                       inference: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Detect and classify cyber threats for a batch of events
         
-        # Network traffic features
-        if 'network' in data:
-            network = data['network']
-            features.extend([
-                network.get('packet_count', 0),
-                network.get('bytes_transferred', 0),
-                network.get('connection_count', 0),
-                network.get('port_count', 0),
-            ])
+        Builds one feature matrix for the whole batch, scores it with a single
+        anomaly model call and classifies it with one learned model call (or,
+        without a trained model, the rule classifiers as column masks).
         
-        # System log features
-        if 'system_logs' in data:
-            logs = data['system_logs']
-            features.extend([
-                len(logs.get('error_logs', [])),
-                len(logs.get('warning_logs', [])),
-                logs.get('process_count', 0),
-                logs.get('file_access_count', 0),
-            ])
+        Args:
+            events: List of input data dicts (same shape as detect_threat input)
+            inference: Optional dict filled with the classifier used and its
+                latency for this batch
         
-        # Behavioral features
-        if 'behavior' in data:
-            behavior = data['behavior']
-            features.extend([
-                behavior.get('suspicious_file_access', 0),
-                behavior.get('unusual_network_activity', 0),
-                behavior.get('privilege_escalation', 0),
-            ])
+        Returns:
+            List of detection results, in the same order as events
+        """
+        try:
+            if not events:
+                return []
+            
+            features = self._extract_feature_matrix(events)
+            
+            # Classify threat types: one learned model call, or vectorized rule evaluation
+            learned = self._classify_learned(features)
+            if learned is not None:
+                classifications = learned['classifications']
+                unknown = self.rule_engine.default_rule.type
+                has_type = np.array([c['type'] != unknown for c in classifications], dtype=bool)
+            else:
+                best_index, best_confidence = self._classify_threats(features)
+                has_type = best_index >= 0
+            if inference is not None:
+                inference.update({
+                    'classifier': learned['model'] if learned else 'rules',
+                    'version': learned['version'] if learned else None,
+                    'inference_ms': learned['latency_ms'] if learned else None
+                })
+            
+            # Anomaly detection (one call for the whole batch)
+            is_anomaly = self._detect_anomalies(features)
+            if is_anomaly is None:
+                # Without a baseline model only the classifiers can flag a threat
+                is_anomaly = has_type
+            
+            results = []
+            for i in range(len(events)):
+                if not is_anomaly[i]:
+                    results.append({
+                        'threat_detected': False,
+                        'confidence': 0.0,
+                        'classification': None
+                    })
+                    continue
+                
+                if learned is not None:
+                    classification_result = classifications[i]
+                else:
+                    classification_result = self.rule_engine.classification(best_index[i], best_confidence[i])
+                
+                severity = self._calculate_severity(events[i], classification_result)
+                
+                results.append({
+                    'threat_detected': True,
+                    'classification': classification_result['type'],
+                    'confidence': classification_result['confidence'],
+                    'severity': severity,
+                    'description': classification_result['description'],
+                    'recommendations': list(classification_result.get('recommendations', [])),
+                    'classifier': learned['model'] if learned else 'rules'
+                })
+            
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error detecting threats in batch: {str(e)}")
+            raise
+    
+    def _extract_features(self, data: Dict[str, Any]) -> np.ndarray:
+        """Extract features from input data for ML models"""
+        # Fixed-schema row so it always matches the fitted model's layout
+        features = self.schema.empty(1)
+        self.schema.fill_row(data, features[0])
+        return features
+    
+    def _extract_feature_matrix(self, events: List[Dict[str, Any]]) -> np.ndarray:
+        """Extract a fixed-schema (n_events x n_features) feature matrix for a batch"""
+        return self.schema.fill_matrix(events)
+    
+    def _detect_anomalies(self, features: np.ndarray) -> Optional[np.ndarray]:
+        """Detect anomalies for every row of a feature matrix (None if no model is fitted)"""
+        if not self.is_fitted:
+            return None
         
-        # If no features extracted, return zeros
-        if not features:
-            features = [0] * 11
+        try:
+            # Normalize features with the baseline scaler (inference only)
+            features_scaled = self.scaler.transform(features)
+            
+            # Score the whole batch at once; negative scores are anomalies
+            scores = self.anomaly_detector.decision_function(features_scaled)
+            
+            return scores < 0
+            
+        except Exception as e:
+            logger.warning(f"Error in batch anomaly detection: {e}")
+            return np.ones(len(features), dtype=bool)  # Assume anomaly if detection fails
+    
+    def _classify_threats(self, features: np.ndarray) -> tuple:
+        """
+        Classify threat types for a batch in one rule engine pass
         
-        return np.array(features).reshape(1, -1)
+        Returns:
+            Tuple of (best rule index per event, -1 if none detected,
+            confidence of that rule per event)
+        """
+        return self.rule_engine.evaluate(features)
     
-    def _detect_anomaly(self, features: np.ndarray) -> bool:
-        """Detect if the features represent an anomaly"""
+    def _detect_anomaly(self, features: np.ndarray) -> Optional[bool]:
+        """Detect if the features represent an anomaly (None if no model is fitted)"""
+        if not self.is_fitted:
+            return None
+        
         try:
-            # Normalize features
-            features_scaled = self.scaler.fit_transform(features)
+            # Normalize features with the baseline scaler (inference only)
+            features_scaled = self.scaler.transform(features)
             
             # Predict anomaly
             prediction = self.anomaly_detector.predict(features_scaled)
             
             # -1 means anomaly, 1 means normal
-            return prediction[0] == -1
+            return bool(prediction[0] == -1)
             
         except Exception as e:
             logger.warning(f"Error in anomaly detection: {e}")
             return True  # Assume anomaly if detection fails
     
-    def _classify_threat(self, data: Dict[str, Any], features: np.ndarray) -> Dict[str, Any]:
-        """Classify the type of threat"""
-        results = []
-        
-        for threat_type, classifier_func in self.threat_classifiers.items():
-            result = classifier_func(data, features)
-            if result['detected']:
-                results.append(result)
-        
-        if not results:
-            return {
-                'type': 'unknown',
-                'confidence': 0.5,
-                'description': 'Unknown threat type detected',
-                'detected': True
-            }
-        
-        # Return the highest confidence result
-        best_result = max(results, key=lambda x: x['confidence'])
-        return best_result
-    
-    def _classify_malware(self, data: Dict[str, Any], features: np.ndarray) -> Dict[str, Any]:
-        """Classify malware threats"""
-        # Simple rule-based classification (can be replaced with trained ML model)
-        suspicious_indicators = 0
-        
-        if data.get('behavior', {}).get('suspicious_file_access', 0) > 10:
-            suspicious_indicators += 1
-        
-        if data.get('network', {}).get('connection_count', 0) > 50:
-            suspicious_indicators += 1
-        
-        confidence = min(0.9, 0.5 + (suspicious_indicators * 0.2))
-        
-        return {
-            'type': 'malware',
-            'confidence': confidence,
-            'description': 'Malicious software detected',
-            'detected': suspicious_indicators > 0,
-            'recommendations': [
-                'Isolate affected system',
-                'Run antivirus scan',
-                'Review system logs'
-            ]
-        }
-    
-    def _classify_trojan(self, data: Dict[str, Any], features: np.ndarray) -> Dict[str, Any]:
-        """Classify trojan threats"""
-        # Check for trojan-like behavior
-        has_remote_access = data.get('behavior', {}).get('unusual_network_activity', 0) > 5
-        has_backdoor = data.get('behavior', {}).get('privilege_escalation', 0) > 0
-        
-        detected = has_remote_access or has_backdoor
-        confidence = 0.75 if detected else 0.0
-        
-        return {
-            'type': 'trojan',
-            'confidence': confidence,
-            'description': 'Trojan horse detected',
-            'detected': detected,
-            'recommendations': [
-                'Block network connections',
-                'Remove suspicious files',
-                'Change credentials'
-            ]
-        }
-    
-    def _classify_ransomware(self, data: Dict[str, Any], features: np.ndarray) -> Dict[str, Any]:
-        """Classify ransomware threats"""
-        # Check for ransomware indicators
-        file_encryption = data.get('behavior', {}).get('suspicious_file_access', 0) > 20
-        unusual_activity = data.get('behavior', {}).get('unusual_network_activity', 0) > 3
-        
-        detected = file_encryption and unusual_activity
-        confidence = 0.85 if detected else 0.0
+    def _classify_learned(self, features: np.ndarray) -> Optional[Dict[str, Any]]:
+        """
+        Classify a feature matrix with the learned threat classifier
         
-        return {
-            'type': 'ransomware',
-            'confidence': confidence,
-            'description': 'Ransomware activity detected',
-            'detected': detected,
-            'recommendations': [
-                'Disconnect from network immediately',
-                'Check for encrypted files',
-                'Review backup integrity',
-                'Contact incident response team'
-            ]
-        }
-    
-    def _classify_phishing(self, data: Dict[str, Any], features: np.ndarray) -> Dict[str, Any]:
-        """Classify phishing threats"""
-        # Check for phishing indicators
-        suspicious_emails = data.get('email', {}).get('suspicious_count', 0) > 0
-        suspicious_links = data.get('email', {}).get('suspicious_links', 0) > 0
+        Returns:
+            None if no learned model is available (use the rules), else the
+            model prediction with one classification dict per row, shaped like
+            RuleEngine.classification (benign predictions have type 'unknown')
+        """
+        if self.model_server is None:
+            return None
+        try:
+            prediction = self.model_server.predict_proba(features)
+        except Exception as e:
+            logger.warning(f"Learned threat classifier failed ({e}); using rules")
+            return None
+        if prediction is None:
+            return None
         
-        detected = suspicious_emails or suspicious_links
-        confidence = 0.7 if detected else 0.0
+        # Description, recommendations and severity come from the rule of the same type
+        rule_results = {rule.type: rule.result for rule in self.rule_engine.rules}
+        probabilities = prediction['probabilities']
+        best = probabilities.argmax(axis=1)
+        classifications = []
+        for row, column in enumerate(best):
+            label = prediction['classes'][column]
+            confidence = float(probabilities[row, column])
+            if str(label).lower() in self.BENIGN_LABELS:
+                classifications.append({**self.rule_engine.default_rule.result, 'confidence': confidence})
+            else:
+                threat_type = str(label)
+                base = rule_results.get(threat_type, {
+                    'type': threat_type,
+                    'description': f"{threat_type} (learned classifier)",
+                    'recommendations': []
+                })
+                classifications.append({**base, 'confidence': confidence})
         
-        return {
-            'type': 'phishing',
-            'confidence': confidence,
-            'description': 'Phishing attempt detected',
-            'detected': detected,
-            'recommendations': [
-                'Block suspicious senders',
-                'Educate users',
-                'Review email logs'
-            ]
-        }
+        return {**prediction, 'classifications': classifications}
     
-    def _classify_zero_day(self, data: Dict[str, Any], features: np.ndarray) -> Dict[str, Any]:
-        """Classify zero-day exploits"""
-        # Zero-day detection is more complex, requires advanced behavioral analysis
-        unknown_signatures = data.get('behavior', {}).get('unknown_processes', 0) > 5
-        unusual_patterns = data.get('behavior', {}).get('unusual_network_activity', 0) > 10
-        
-        detected = unknown_signatures and unusual_patterns
-        confidence = 0.6 if detected else 0.0  # Lower confidence for zero-day
-        
-        return {
-            'type': 'zero_day',
-            'confidence': confidence,
-            'description': 'Possible zero-day exploit detected',
-            'detected': detected,
-            'recommendations': [
-                'Isolate affected systems',
-                'Capture forensic evidence',
-                'Report to security team',
-                'Monitor for new signatures'
-            ]
-        }
+    def _classify_threat(self, data: Dict[str, Any], features: np.ndarray) -> Dict[str, Any]:
+        """Classify the type of threat"""
+        best_index, best_confidence = self.rule_engine.evaluate_row(features[0])
+        return self.rule_engine.classification(best_index, best_confidence)
     
     def _calculate_severity(self, data: Dict[str, Any], classification: Dict[str, Any]) -> int:
         """Calculate threat severity (1-10 scale)"""
-        base_severity = {
-            'malware': 5,
-            'trojan': 6,
-            'ransomware': 9,
-            'phishing': 4,
-            'zero_day': 8,
-            'unknown': 5,
-        }
-        
-        severity = base_severity.get(classification['type'], 5)
+        severity = self.rule_engine.severity.get(classification['type'], 5)
         
         # Adjust based on confidence
         if classification['confidence'] > 0.8:
@@ -0,0 +1,80 @@
+"""Unit tests for ArchiveExtractor."""
+import hashlib
+import io
+import tarfile
+import zipfile
+
+from services.archive_extractor import ArchiveExtractor, HashingReader, archive_type
+
+
+class _NonSeekable(io.RawIOBase):
+    """Read-only stream like an HTTP response body"""
+
+    def __init__(self, data):
+        self._buffer = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        return self._buffer.readinto(b)
+
+
+def _tar_bytes(members, mode="w:gz"):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def test_archive_type():
+    assert archive_type("CICIDS2017.tar.gz") == "tar"
+    assert archive_type("data.TGZ") == "tar"
+    assert archive_type("unsw.zip") == "zip"
+    assert archive_type("flows.csv") is None
+
+
+def test_extract_tar_stream_filters_and_hashes(tmp_path):
+    data = _tar_bytes({
+        "MachineLearningCVE/monday.csv": b"a,label\n1,BENIGN\n",
+        "meta/info.json": b"{}",
+        "MachineLearningCVE/readme.pdf": b"%PDF",
+    })
+    reader = HashingReader(_NonSeekable(data))
+
+    stats = ArchiveExtractor(block_size=4).extract_tar_stream(reader, tmp_path)
+    reader.drain()
+
+    assert stats["extracted"] == 2 and stats["skipped"] == 1
+    assert (tmp_path / "MachineLearningCVE" / "monday.csv").read_bytes() == b"a,label\n1,BENIGN\n"
+    assert not (tmp_path / "MachineLearningCVE" / "readme.pdf").exists()
+    assert reader.bytes_read == len(data)
+    assert reader.hexdigest() == hashlib.sha256(data).hexdigest()
+
+
+def test_members_outside_destination_are_skipped(tmp_path):
+    dest = tmp_path / "out"
+    data = _tar_bytes({"../evil.csv": b"x", "/abs.csv": b"x", "ok.csv": b"x"}, mode="w")
+
+    stats = ArchiveExtractor().extract_tar_stream(io.BytesIO(data), dest)
+
+    assert stats["extracted"] == 1
+    assert not (tmp_path / "evil.csv").exists()
+    assert (dest / "ok.csv").exists()
+
+
+def test_extract_zip_member_by_member(tmp_path):
+    path = tmp_path / "unsw.zip"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("UNSW_NB15_training-set.csv", "id,label\n1,0\n")
+        archive.writestr("docs/features.txt", "...")
+        archive.writestr("../escape.csv", "x")
+
+    stats = ArchiveExtractor().extract(path, tmp_path / "out")
+
+    assert stats["extracted"] == 1 and stats["skipped"] == 2
+    assert (tmp_path / "out" / "UNSW_NB15_training-set.csv").read_text() == "id,label\n1,0\n"
+    assert stats["bytes"] == len("id,label\n1,0\n")
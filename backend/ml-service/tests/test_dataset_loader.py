@@ -0,0 +1,119 @@
+"""Unit tests for ChunkedDatasetLoader."""
+import numpy as np
+import pandas as pd
+
+from services import dataset_loader
+from services.dataset_loader import ChunkedDatasetLoader
+from services.dataset_manager import DatasetManager
+from services.self_learning_engine import SelfLearningEngine
+
+
+def _write_flows(path, n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    labels = np.where(rng.random(n) < 0.05, 'DDoS', 'BENIGN').astype(object)
+    labels[:3] = 'Infiltration'  # very rare class
+    df = pd.DataFrame({
+        ' Flow Duration': rng.integers(0, 10000, n),
+        ' Total Fwd Packets': rng.normal(size=n) + (labels == 'DDoS') * 5,
+        'Protocol': rng.choice(['tcp', 'udp'], n),
+        ' Label': labels,
+        'attack_cat': labels,
+    })
+    df.loc[5, ' Total Fwd Packets'] = np.inf
+    df.loc[6, ' Flow Duration'] = np.nan
+    df.to_csv(path, index=False)
+    return df
+
+
+def test_loads_all_rows_in_chunks_with_compact_dtypes(tmp_path):
+    path = tmp_path / 'flows.csv'
+    _write_flows(path)
+
+    loaded = ChunkedDatasetLoader(chunksize=300).load(str(path))
+
+    assert loaded['label_column'] == 'Label'
+    assert loaded['feature_names'] == ['Flow Duration', 'Total Fwd Packets', 'Protocol']
+    assert loaded['X'].dtype == np.float32
+    assert loaded['classes'] == ['BENIGN', 'DDoS', 'Infiltration']
+    assert loaded['stats']['chunks'] == 7
+    assert loaded['stats']['rows_dropped'] == 2
+    assert len(loaded['y']) == 1998
+    assert set(np.unique(loaded['X'][:, 2])) == {0.0, 1.0}
+
+
+def test_stratified_sample_is_bounded_and_keeps_rare_classes(tmp_path):
+    path = tmp_path / 'flows.csv'
+    _write_flows(path)
+
+    loaded = ChunkedDatasetLoader(chunksize=250, max_rows=200, min_per_class=10).load(str(path))
+
+    y = loaded['y']
+    counts = dict(zip(*np.unique(y, return_counts=True)))
+    assert abs(len(y) - 200) <= 15
+    assert counts[2] == 3  # every Infiltration row survives
+    assert 5 <= counts[1] <= 20
+    assert loaded['stats']['stratified']
+
+
+def test_stratified_memory_does_not_grow_with_class_count(tmp_path, monkeypatch):
+    path = tmp_path / 'classes.csv'
+    rng = np.random.default_rng(0)
+    labels = rng.choice(20, size=5000, p=np.r_[0.81, np.full(19, 0.01)])
+    pd.DataFrame({'x': rng.normal(size=5000), 'label': labels}).to_csv(path, index=False)
+
+    capacities = []
+
+    class Reservoir(dataset_loader._Reservoir):
+        def __init__(self, capacity, n_features, rng):
+            capacities.append(capacity)
+            super().__init__(capacity, n_features, rng)
+
+    monkeypatch.setattr(dataset_loader, '_Reservoir', Reservoir)
+    loaded = ChunkedDatasetLoader(chunksize=500, max_rows=300, min_per_class=5).load(str(path))
+
+    assert sum(capacities) == 300 + 20 * 5
+    counts = np.bincount(loaded['y'], minlength=20)
+    assert len(loaded['y']) == 300
+    assert counts.min() >= 5
+    assert 180 <= counts[0] <= 260  # still roughly proportional
+
+
+def test_uniform_sample_and_numeric_labels(tmp_path):
+    path = tmp_path / 'numeric.csv'
+    pd.DataFrame({'x': np.arange(1000), 'label': np.arange(1000) % 2}).to_csv(path, index=False)
+
+    loaded = ChunkedDatasetLoader(chunksize=100, max_rows=100, stratified=False, seed=1).load(str(path))
+
+    assert loaded['classes'] == [0, 1]
+    assert len(loaded['y']) == 100
+    # Each sampled row keeps its own label, and rows come from the whole file
+    assert np.array_equal(loaded['X'][:, 0].astype(int) % 2, loaded['y'])
+    assert loaded['X'][:, 0].max() > 500
+
+
+def test_learn_from_dataset_uses_chunked_loader(tmp_path):
+    path = tmp_path / 'flows.csv'
+    _write_flows(path)
+    engine = SelfLearningEngine(model_dir=str(tmp_path / 'models'), dataset_chunksize=500)
+
+    result = engine.learn_from_dataset(str(path), max_rows=500)
+
+    assert result['success']
+    assert result['dataset_type'] == 'cicids2017'
+    assert result['features'] == 3
+    assert result['loading']['chunks'] == 4
+    assert engine.feature_names == ['Flow Duration', 'Total Fwd Packets', 'Protocol']
+
+
+def test_learn_from_dataset_prefers_compiled_version(tmp_path):
+    source = tmp_path / 'flows.csv'
+    _write_flows(source)
+    DatasetManager(datasets_dir=str(tmp_path / 'datasets')).compile_dataset(str(source))
+    engine = SelfLearningEngine(model_dir=str(tmp_path / 'models'))
+
+    result = engine.learn_from_dataset(str(source), max_rows=400)
+
+    assert result['loading']['compiled'] is True
+    assert result['loading']['rows_read'] == 1998
+    assert 400 <= result['samples_processed'] <= 460  # plus the per-class minimum for rare classes
+    assert engine.feature_names == ['Flow Duration', 'Total Fwd Packets', 'Protocol']
@@ -1,10 +1,19 @@
 """Unit tests for DatasetManager."""
+import functools
+import hashlib
+import io
 import json
+import tarfile
 import tempfile
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
 import pytest
 
+from services.dataset_loader import ChunkedDatasetLoader
 from services.dataset_manager import DatasetManager
 
 
@@ -54,3 +63,115 @@ def test_list_downloaded_datasets_includes_custom(manager, tmp_path):
     down = manager.list_downloaded_datasets()
     ids = [d["id"] for d in down]
     assert "custom_x" in ids or any("custom_x" in i for i in ids)
+
+
+def _write_flows(path, n=500):
+    rng = np.random.default_rng(0)
+    labels = np.where(np.arange(n) % 10 == 0, "DDoS", "BENIGN")
+    pd.DataFrame({
+        " Flow Duration": rng.integers(0, 10000, n),
+        "Protocol": rng.choice(["tcp", "udp"], n),
+        " Label": labels,
+    }).to_csv(path, index=False)
+
+
+def test_compile_dataset_memory_maps_and_tracks_staleness(manager, tmp_path):
+    f = tmp_path / "flows.csv"
+    _write_flows(f)
+    manager.add_custom_dataset(str(f), "flows", {"name": "Flows", "format": "csv"})
+    source = manager.datasets_dir / "flows" / "flows.csv"
+    assert manager.list_downloaded_datasets()[0]["compiled"] is False
+    assert DatasetManager.load_compiled(str(source)) is None
+
+    out = manager.compile_dataset("flows", chunksize=100)
+    assert out["success"] is True
+    assert out["files"][0]["rows"] == 500
+    assert out["files"][0]["categories"] == {"Protocol": ["tcp", "udp"]}
+    assert manager.list_downloaded_datasets()[0]["compiled"] is True
+
+    compiled = DatasetManager.load_compiled(str(source))
+    parsed = ChunkedDatasetLoader().load(str(source))
+    assert isinstance(compiled["X"], np.memmap)
+    assert np.array_equal(compiled["X"], parsed["X"])
+    assert np.array_equal(compiled["y"], parsed["y"])
+    assert compiled["classes"] == ["BENIGN", "DDoS"]
+
+    # Up to date: not recompiled. Source changed: compiled copy is stale
+    assert manager.compile_dataset("flows")["files"][0]["compiled_at"] == out["files"][0]["compiled_at"]
+    with open(source, "a") as fh:
+        fh.write("1,tcp,BENIGN\n")
+    assert DatasetManager.load_compiled(str(source)) is None
+    assert manager.list_downloaded_datasets()[0]["compiled"] is False
+
+
+def test_compile_dataset_without_csv(manager):
+    (manager.datasets_dir / "empty").mkdir()
+    assert manager.compile_dataset("empty")["success"] is False
+    with pytest.raises(ValueError):
+        manager.compile_dataset("missing")
+
+
+def test_download_from_url_to_project_verifies_checksum(manager, tmp_path):
+    served = tmp_path / "www"
+    served.mkdir()
+    (served / "flows.csv").write_text("x,label\n1,a\n2,b\n")
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=str(served))
+    handler.log_message = lambda *args: None
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{httpd.server_address[1]}/flows.csv"
+        digest = hashlib.sha256((served / "flows.csv").read_bytes()).hexdigest()
+        out = manager.download_from_url_to_project(url, "flows", sha256=digest)
+        assert out["success"] is True
+        assert out["sha256"] == digest
+        assert Path(out["file"]).read_text() == "x,label\n1,a\n2,b\n"
+
+        bad = manager.download_from_url_to_project(url, "flows_bad", sha256="0" * 64)
+        assert bad["success"] is False
+        assert "SHA-256 mismatch" in bad["error"]
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def _tar_gz(path, members):
+    with tarfile.open(path, "w:gz") as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+
+def test_download_archive_streamed_or_deleted(manager, tmp_path):
+    served = tmp_path / "www"
+    served.mkdir()
+    _tar_gz(served / "flows.tar.gz", {"data/flows.csv": b"x,label\n1,a\n", "README.txt": b"docs"})
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=str(served))
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{httpd.server_address[1]}/flows.tar.gz"
+        digest = hashlib.sha256((served / "flows.tar.gz").read_bytes()).hexdigest()
+
+        out = manager.download_from_url_to_project(url, "streamed", sha256=digest, stream_extract=True)
+        assert out["success"] is True
+        assert out["file"] is None and out["sha256"] == digest
+        assert out["disk"]["archive_bytes"] == 0
+        assert out["extraction"]["extracted"] == 1
+        dest = Path(out["path"])
+        assert (dest / "data" / "flows.csv").read_bytes() == b"x,label\n1,a\n"
+        assert not list(dest.rglob("README.txt"))
+
+        bad = manager.download_from_url_to_project(url, "streamed_bad", sha256="0" * 64, stream_extract=True)
+        assert bad["success"] is False
+        assert not list((manager.datasets_dir / "streamed_bad").rglob("*.csv"))
+
+        kept = manager.download_from_url_to_project(url, "deleted", sha256=digest, delete_archive=True)
+        assert kept["disk"]["archive_deleted"] is True
+        assert kept["file"] is None
+        assert (Path(kept["path"]) / "data" / "flows.csv").exists()
+        assert not (Path(kept["path"]) / "flows.tar.gz").exists()
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
@@ -0,0 +1,160 @@
+"""Unit tests for DocumentCache and cached document processing."""
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services import document_processor as document_processor_module
+from services.document_cache import DocumentCache, file_sha256
+from services.document_processor import DocumentProcessor
+from services.model_registry import ModelRegistry
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+def test_file_sha256_matches_hashlib(tmp_path):
+    path = tmp_path / 'doc.txt'
+    content = b'ransomware ' * 300000
+    path.write_bytes(content)
+    assert file_sha256(str(path), chunk_size=4096) == hashlib.sha256(content).hexdigest()
+
+
+@pytest.mark.parametrize('use_redis', [False, True])
+def test_round_trip_and_namespace_isolation(tmp_path, use_redis):
+    redis_client = FakeRedis() if use_redis else None
+    cache = DocumentCache('v1-abc', cache_dir=str(tmp_path), redis_client=redis_client)
+    assert cache.get('deadbeef') is None
+
+    assert cache.put('deadbeef', {'summary': 'x', 'keywords': [{'keyword': 'ddos', 'frequency': 2}]})
+    assert cache.get('deadbeef') == {'summary': 'x', 'keywords': [{'keyword': 'ddos', 'frequency': 2}]}
+    assert cache.get_stats()['hits'] == 1
+    assert cache.get_stats()['misses'] == 1
+
+    other_version = DocumentCache('v2-abc', cache_dir=str(tmp_path), redis_client=redis_client)
+    assert other_version.get('deadbeef') is None
+
+
+def test_disk_cache_evicts_oldest_entries_beyond_max_bytes(tmp_path):
+    cache = DocumentCache('v1', cache_dir=str(tmp_path), max_bytes=5000)
+    for i in range(20):
+        assert cache.put(f'{i:064x}', {'text': 'x' * 1000})
+        path = cache._path(f'{i:064x}')
+        os.utime(path, (i, i))  # distinct ages
+
+    sizes = [p.stat().st_size for p in tmp_path.glob('*/*/*.json')]
+    assert sum(sizes) <= 5000
+    assert cache.get_stats()['evictions'] == 20 - len(sizes)
+    assert cache.get(f'{19:064x}') is not None
+    assert cache.get(f'{0:064x}') is None
+
+
+def test_disk_entries_expire(tmp_path):
+    cache = DocumentCache('v1', cache_dir=str(tmp_path), ttl_seconds=60)
+    cache.put('deadbeef', {'a': 1})
+    assert cache.get('deadbeef') == {'a': 1}
+    os.utime(cache._path('deadbeef'), (time.time() - 120, time.time() - 120))
+    assert cache.get('deadbeef') is None
+    assert not cache._path('deadbeef').exists()
+
+
+def test_concurrent_writes_of_one_key(tmp_path):
+    cache = DocumentCache('v1', cache_dir=str(tmp_path))
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda i: cache.put('deadbeef', {'writer': i, 'pad': 'x' * 10000}), range(64)))
+    assert all(results)
+    assert cache.get('deadbeef')['pad'] == 'x' * 10000
+    assert list(tmp_path.glob('**/*.tmp')) == []
+
+
+def test_unwritable_cache_is_a_miss(tmp_path):
+    blocker = tmp_path / 'blocker'
+    blocker.write_text('not a directory')
+    cache = DocumentCache('v1', cache_dir=str(blocker))
+    assert not cache.put('deadbeef', {'a': 1})
+    assert cache.get('deadbeef') is None
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    # No NER model or NLTK data needed for the cache path
+    monkeypatch.setattr(DocumentProcessor, 'ner_model', None)
+    monkeypatch.setattr(document_processor_module.nltk, 'sent_tokenize', lambda text: text.split('. '))
+    return DocumentProcessor()
+
+
+def test_identical_content_is_processed_once(tmp_path, processor, monkeypatch):
+    processor.enable_cache(cache_dir=str(tmp_path / 'cache'))
+    first = tmp_path / 'a.txt'
+    second = tmp_path / 'b.txt'
+    first.write_text('Phishing delivered ransomware. Patch CVE-2021-44228 and enable monitoring.')
+    second.write_text(first.read_text())
+
+    result = processor.process_document('doc-a', str(first), 'txt')
+    assert result['cached'] is False
+    assert result['content_hash'] == file_sha256(str(first))
+
+    calls = []
+    monkeypatch.setattr(processor, '_extract_text', lambda *args: calls.append(args))
+    cached = processor.process_document('doc-b', str(second), 'txt')
+    assert calls == []
+    assert cached['cached'] is True
+    assert cached['document_id'] == 'doc-b'
+    assert cached['attack_techniques'] == result['attack_techniques']
+    assert cached['exploit_patterns'][0]['identifier'] == 'CVE-2021-44228'
+
+
+def test_namespace_changes_with_extractor_config(processor, monkeypatch):
+    namespace = processor.cache_namespace()
+    assert namespace.startswith(f"v{DocumentProcessor.EXTRACTOR_VERSION}-")
+
+    processor.keyword_matcher.add_keywords('attack_techniques', ['credential stuffing'])
+    assert processor.cache_namespace() != namespace
+
+    monkeypatch.setattr(DocumentProcessor, 'EXTRACTOR_VERSION', DocumentProcessor.EXTRACTOR_VERSION + 1)
+    assert processor.cache_namespace().startswith(f"v{DocumentProcessor.EXTRACTOR_VERSION}-")
+
+
+def test_keywords_added_after_enabling_cache_invalidate_results(tmp_path, processor):
+    processor.enable_cache(cache_dir=str(tmp_path / 'cache'))
+    path = tmp_path / 'a.txt'
+    path.write_text('Attackers used credential stuffing. Then they moved on.')
+
+    first = processor.process_document('doc', str(path), 'txt')
+    assert all(t['technique'] != 'credential stuffing' for t in first['attack_techniques'])
+
+    processor.keyword_matcher.add_keywords('attack_techniques', ['credential stuffing'])
+    second = processor.process_document('doc', str(path), 'txt')
+    assert second['cached'] is False
+    assert any(t['technique'] == 'credential stuffing' for t in second['attack_techniques'])
+    assert processor.cache.namespace == processor.cache_namespace()
+
+
+def test_namespace_follows_the_registered_backend(monkeypatch):
+    monkeypatch.setattr(document_processor_module, 'model_registry', ModelRegistry())
+    monkeypatch.setattr(DocumentProcessor, 'registered_backend', None)
+    monkeypatch.setattr(DocumentProcessor, 'ner_model', None)
+
+    first = DocumentProcessor(inference_backend='pytorch')
+    second = DocumentProcessor(inference_backend='onnx')
+
+    # The second processor runs the pytorch pipelines registered first
+    assert DocumentProcessor.registered_backend == 'pytorch'
+    pytorch_namespace = first.cache_namespace()
+    assert second.cache_namespace() == pytorch_namespace
+
+    monkeypatch.setattr(document_processor_module, 'model_registry', ModelRegistry())
+    monkeypatch.setattr(DocumentProcessor, 'registered_backend', None)
+    onnx = DocumentProcessor(inference_backend='onnx')
+    assert DocumentProcessor.registered_backend == 'onnx'
+    assert onnx.cache_namespace() != pytorch_namespace
@@ -0,0 +1,44 @@
+"""Unit tests for DocumentProcessor streaming entity extraction."""
+import re
+
+import pytest
+
+from services import document_processor as document_processor_module
+from services.document_processor import DocumentProcessor
+
+
+class FakeNER:
+    """Tags every "Acme" and records the size of each pipeline call"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, batch_size=None):
+        self.calls.append(len(texts))
+        return [[{'word': 'Acme', 'entity_group': 'ORG', 'score': 0.9, 'start': m.start(), 'end': m.end()}
+                 for m in re.finditer('Acme', text)] for text in texts]
+
+
+@pytest.fixture
+def ner(monkeypatch):
+    fake = FakeNER()
+    monkeypatch.setattr(DocumentProcessor, 'ner_model', fake)
+    monkeypatch.setattr(document_processor_module.nltk, 'sent_tokenize', lambda text: text.split('. '))
+    return fake
+
+
+def test_streaming_entities_have_document_offsets(ner):
+    processor = DocumentProcessor(ner_batch_size=4)
+    chunks = [f'Paragraph {i} mentions Acme. Then more text' for i in range(50)]
+
+    result = processor._process_chunks('doc', iter(chunks))
+
+    document = '\n'.join(chunks)
+    assert len(result['entities']) == 50
+    for entity in result['entities']:
+        assert document[entity['start']:entity['end']] == 'Acme'
+    assert [e['start'] for e in result['entities']] == sorted(e['start'] for e in result['entities'])
+    # Windows are batched across chunks instead of one pipeline call per chunk
+    assert max(ner.calls) == 4
+    assert len(ner.calls) == 13
+    assert result['ner_stats']['windows'] == 50
@@ -0,0 +1,45 @@
+"""Unit tests for DriveDownloader (concurrent downloads)."""
+import threading
+
+from services import drive_downloader
+from services.drive_downloader import DriveDownloader
+
+
+class FakeResponse:
+    def __init__(self, file_id):
+        self.text = ""
+        self.headers = {"Content-Disposition": 'attachment; filename="report.pdf"'}
+        self.body = f"contents of {file_id}".encode()
+
+    def iter_content(self, chunk_size=8192):
+        yield self.body
+
+
+class FakeSession:
+    instances = []
+
+    def __init__(self):
+        self.thread = threading.get_ident()
+        FakeSession.instances.append(self)
+
+    def get(self, url, stream=False):
+        assert threading.get_ident() == self.thread
+        return FakeResponse(url.rsplit("id=", 1)[1])
+
+
+def test_files_with_the_same_name_do_not_overwrite_each_other(tmp_path, monkeypatch):
+    monkeypatch.setattr(drive_downloader.requests, "Session", FakeSession)
+    FakeSession.instances = []
+    downloader = DriveDownloader(str(tmp_path))
+    links = [f"https://drive.google.com/file/d/file{i}/view" for i in range(8)]
+
+    results = downloader.download_multiple(links, max_workers=4)
+
+    assert results["failed"] == []
+    paths = [r["file_path"] for r in results["successful"]]
+    assert len(set(paths)) == 8
+    for i, result in enumerate(results["successful"]):
+        assert result["filename"] == "report.pdf"
+        with open(result["file_path"], "rb") as f:
+            assert f.read() == f"contents of file{i}".encode()
+    assert 1 <= len(FakeSession.instances) <= 4
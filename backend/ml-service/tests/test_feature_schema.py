@@ -0,0 +1,49 @@
+"""Unit tests for the shared threat feature schema."""
+import numpy as np
+import pytest
+
+from services.feature_schema import FeatureSchema, THREAT_FEATURE_SCHEMA
+from services.self_learning_engine import SelfLearningEngine
+from services.threat_detector import ThreatDetector
+
+
+EVENT = {
+    "network": {"packet_count": 12, "connection_count": 3},
+    "system_logs": {"error_logs": ["e1", "e2"], "process_count": 40},
+    "behavior": {"privilege_escalation": 1},
+    "email": {"suspicious_links": 2},
+}
+
+
+def test_fill_row_uses_fixed_columns():
+    row = THREAT_FEATURE_SCHEMA.fill_row(EVENT)
+    assert row.shape == (THREAT_FEATURE_SCHEMA.n_features,)
+    col = THREAT_FEATURE_SCHEMA.column
+    assert row[col("network.packet_count")] == 12
+    assert row[col("system_logs.error_logs")] == 2
+    assert row[col("behavior.privilege_escalation")] == 1
+    assert row[col("email.suspicious_links")] == 2
+    assert row[col("network.bytes_transferred")] == 0
+
+
+def test_fill_matrix_reuses_preallocated_buffer():
+    buf = THREAT_FEATURE_SCHEMA.empty(4)
+    buf[:] = 99
+    out = THREAT_FEATURE_SCHEMA.fill_matrix([EVENT, {}], out=buf)
+    assert out.shape == (2, THREAT_FEATURE_SCHEMA.n_features)
+    assert np.shares_memory(out, buf)
+    assert not out[1].any()
+    with pytest.raises(ValueError):
+        THREAT_FEATURE_SCHEMA.fill_matrix([EVENT] * 5, out=buf)
+
+
+def test_unknown_kind_rejected():
+    with pytest.raises(ValueError):
+        FeatureSchema(features=(("network", "packet_count", "bogus"),))
+
+
+def test_inference_and_training_share_layout(tmp_path):
+    detector = ThreatDetector(model_dir=str(tmp_path / "detector"))
+    engine = SelfLearningEngine(model_dir=str(tmp_path / "engine"))
+    assert np.array_equal(detector._extract_features(EVENT)[0], engine._extract_threat_features(EVENT))
+    assert engine._extract_threat_features({"unrelated": {}}) is None
@@ -0,0 +1,92 @@
+"""Unit tests for incremental threat learning (ReplayBuffer, online models)."""
+import numpy as np
+import pytest
+
+from services.replay_buffer import ReplayBuffer
+from services.self_learning_engine import SelfLearningEngine
+
+
+def _threats(rng, n, classification):
+    threats = []
+    for _ in range(n):
+        if classification == 'ransomware':
+            behavior = {'suspicious_file_access': int(rng.integers(30, 60)), 'privilege_escalation': 0}
+        elif classification == 'phishing':
+            behavior = {'suspicious_file_access': int(rng.integers(0, 5)), 'privilege_escalation': 0}
+            threats.append({'behavior': behavior, 'email': {'suspicious_links': int(rng.integers(3, 9))},
+                            'classification': classification})
+            continue
+        else:
+            behavior = {'suspicious_file_access': int(rng.integers(0, 5)), 'privilege_escalation': int(rng.integers(1, 4))}
+        threats.append({'behavior': behavior, 'network': {'packet_count': int(rng.integers(10, 1000))},
+                        'classification': classification})
+    return threats
+
+
+def test_replay_buffer_is_bounded_and_keeps_rare_classes():
+    buffer = ReplayBuffer(capacity=100, min_per_class=3, seed=0)
+    buffer.add(np.zeros((1000, 2)), ['common'] * 1000)
+    buffer.add(np.ones((2, 2)), ['rare'] * 2)
+    buffer.add(np.zeros((1000, 2)), ['common'] * 1000)
+
+    assert len(buffer) == 100
+    assert buffer.seen == 2002
+    assert buffer.classes() == ['common', 'rare']
+    assert buffer.class_counts['rare'] == 2
+
+    X, y = buffer.sample(5)
+    assert 'rare' in set(y)
+    assert X.shape[1] == 2
+
+
+def test_replay_buffer_rejects_feature_mismatch():
+    buffer = ReplayBuffer(capacity=10)
+    buffer.add(np.zeros((2, 3)), ['a', 'b'])
+    with pytest.raises(ValueError):
+        buffer.add(np.zeros((2, 4)), ['a', 'b'])
+
+
+def test_incremental_updates_grow_forest_and_score_before_training(tmp_path):
+    rng = np.random.default_rng(1)
+    engine = SelfLearningEngine(model_dir=str(tmp_path), trees_per_update=5, max_trees=60)
+
+    first = engine.learn_from_threats(
+        _threats(rng, 30, 'ransomware') + _threats(rng, 30, 'phishing') + _threats(rng, 30, 'trojan')
+    )['training_results']
+    assert first['refit'] is True
+    assert first['trees'] == 50
+    assert 'accuracy' not in first
+
+    second = engine.learn_from_threats(_threats(rng, 20, 'ransomware') + _threats(rng, 20, 'trojan'))['training_results']
+    assert second['refit'] is False
+    assert second['trees'] == 55
+    assert second['accuracy'] > 0.9
+
+    # Capped: the oldest trees are dropped
+    for _ in range(3):
+        result = engine.learn_from_threats(_threats(rng, 10, 'phishing'))['training_results']
+    assert result['trees'] == 60
+
+
+def test_new_class_rebuilds_from_buffer_and_state_persists(tmp_path):
+    rng = np.random.default_rng(2)
+    engine = SelfLearningEngine(model_dir=str(tmp_path))
+    engine.learn_from_threats(_threats(rng, 20, 'ransomware') + _threats(rng, 20, 'trojan'))
+
+    result = engine.learn_from_threats(_threats(rng, 20, 'phishing'))['training_results']
+    assert result['refit'] is True
+    assert result['classes'] == ['phishing', 'ransomware', 'trojan']
+    assert result['buffer_size'] == 60
+
+    reloaded = SelfLearningEngine(model_dir=str(tmp_path))
+    assert reloaded.online_classes == ['phishing', 'ransomware', 'trojan']
+    assert len(reloaded.replay_buffer) == 60
+    X = reloaded.threat_schema.fill_matrix(_threats(rng, 5, 'phishing'))
+    assert list(reloaded.online_models['random_forest'].predict(X)) == ['phishing'] * 5
+
+
+def test_single_class_waits_for_more_labels(tmp_path):
+    engine = SelfLearningEngine(model_dir=str(tmp_path))
+    result = engine.learn_from_threats(_threats(np.random.default_rng(3), 10, 'trojan'))['training_results']
+    assert result['message'] == 'Need at least two threat classes to train'
+    assert engine.online_models == {}
@@ -0,0 +1,51 @@
+"""Unit tests for the NLP inference backends (PyTorch and ONNX)."""
+import pytest
+
+from services import inference_backend
+from services.inference_backend import check_parity, load_pipeline
+
+
+def _ner(entities_by_text):
+    return lambda text: entities_by_text.get(text, [])
+
+
+def _entity(label, start, end, score):
+    return {'entity_group': label, 'start': start, 'end': end, 'score': score, 'word': ''}
+
+
+def test_ner_parity_counts_exact_span_matches():
+    reference = _ner({
+        'a': [_entity('ORG', 0, 5, 0.99), _entity('LOC', 10, 16, 0.95)],
+        'b': [_entity('PER', 0, 4, 0.90)],
+    })
+    candidate = _ner({
+        'a': [_entity('ORG', 0, 5, 0.97), _entity('LOC', 10, 15, 0.90)],
+        'b': [_entity('PER', 0, 4, 0.90)],
+    })
+    parity = check_parity('ner', reference, candidate, ['a', 'b'])
+    assert parity['reference_entities'] == 3
+    assert parity['precision'] == pytest.approx(2 / 3)
+    assert parity['recall'] == pytest.approx(2 / 3)
+    assert parity['f1'] == pytest.approx(2 / 3)
+    assert parity['max_score_diff'] == pytest.approx(0.02)
+
+
+def test_classification_parity_reports_label_agreement():
+    reference = lambda text: [{'label': 'POSITIVE', 'score': 0.9}]
+    candidate = lambda text: [{'label': 'POSITIVE' if text == 'a' else 'NEGATIVE', 'score': 0.8}]
+    parity = check_parity('text-classification', reference, candidate, ['a', 'b'])
+    assert parity['label_agreement'] == 0.5
+    assert parity['max_score_diff'] == pytest.approx(0.1)
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        load_pipeline('ner', 'some-model', backend='tensorrt')
+
+
+def test_onnx_falls_back_to_pytorch_when_unavailable(monkeypatch):
+    calls = []
+    monkeypatch.setattr(inference_backend, 'onnx_available', lambda: False)
+    monkeypatch.setattr(inference_backend, 'pipeline', lambda task, **kwargs: calls.append((task, kwargs)) or 'pt')
+    assert load_pipeline('ner', 'some-model', backend='onnx', aggregation_strategy='simple') == 'pt'
+    assert calls == [('ner', {'model': 'some-model', 'aggregation_strategy': 'simple'})]
@@ -0,0 +1,85 @@
+"""Unit tests for IngestionPipeline."""
+import threading
+import time
+
+from services.ingestion_pipeline import IngestionPipeline
+
+
+class FakeProcessor:
+    def __init__(self, cached=None):
+        self.cached = cached or {}
+        self.processed = []
+        self.stored = []
+
+    def get_cached_result(self, document_id, file_path, file_type, streaming=None, content_hash=None):
+        return self.cached.get(content_hash)
+
+    def cache_result(self, file_path, file_type, extracted_data, streaming=None, content_hash=None):
+        self.stored.append(content_hash)
+        return True
+
+    def process_document(self, document_id, file_path, file_type, use_cache=True, content_hash=None):
+        if file_path == 'broken':
+            raise ValueError('unreadable')
+        self.processed.append(document_id)
+        return {'document_id': document_id, 'content_hash': content_hash}
+
+
+def _download(delays):
+    def download(link):
+        time.sleep(delays.get(link, 0))
+        if link.startswith('bad'):
+            return {'success': False, 'error': 'Failed to download document'}
+        return {'success': True, 'document_id': f'doc_{link}', 'content_hash': link,
+                'file_path': 'broken' if link == 'corrupt' else f'/tmp/{link}', 'file_type': 'txt'}
+    return download
+
+
+def _finish(link, job, extracted_data):
+    return {'success': True, 'link': link, 'document_id': extracted_data['document_id']}
+
+
+def test_results_stream_in_completion_order():
+    processor = FakeProcessor()
+    pipeline = IngestionPipeline(processor, download_workers=3, process_workers=0)
+    results = list(pipeline.run(['slow', 'fast', 'medium'], _download({'slow': 0.3, 'medium': 0.1}), _finish))
+    assert [r['link'] for r in results] == ['fast', 'medium', 'slow']
+    assert sorted(processor.stored) == ['fast', 'medium', 'slow']
+
+
+def test_failures_are_reported_per_link():
+    processor = FakeProcessor()
+    pipeline = IngestionPipeline(processor, process_workers=0)
+    results = {r['link']: r for r in pipeline.run(['ok', 'bad-link', 'corrupt'], _download({}), _finish)}
+    assert results['ok']['success']
+    assert results['bad-link'] == {'success': False, 'error': 'Failed to download document', 'link': 'bad-link'}
+    assert results['corrupt']['success'] is False
+    assert results['corrupt']['error'] == 'unreadable'
+
+
+def test_cached_documents_skip_processing():
+    processor = FakeProcessor(cached={'seen': {'document_id': 'doc_seen', 'cached': True}})
+    pipeline = IngestionPipeline(processor, process_workers=0)
+    results = list(pipeline.run(['seen', 'new'], _download({}), _finish))
+    assert len(results) == 2
+    assert processor.processed == ['doc_new']
+    assert processor.stored == ['new']
+
+
+def test_bounded_queue_throttles_downloads():
+    processor = FakeProcessor()
+    pipeline = IngestionPipeline(processor, download_workers=8, process_workers=0, queue_size=1)
+    started = []
+    lock = threading.Lock()
+
+    def download(link):
+        with lock:
+            started.append(link)
+        return _download({})(link)
+
+    results = pipeline.run([str(i) for i in range(20)], download, _finish)
+    next(results)
+    time.sleep(0.2)
+    # One yielded, at most one queued and one blocked per download thread
+    assert len(started) < 20
+    assert len(list(results)) == 19
@@ -0,0 +1,148 @@
+"""Unit tests for JobQueue."""
+import threading
+import time
+
+import pytest
+
+from services.job_queue import JobContext, JobQueue
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    monkeypatch.setattr(JobContext, 'PROGRESS_INTERVAL_SECONDS', 0.0)
+    return JobQueue()
+
+
+def _wait_for(jobs, job_id, states=('succeeded', 'failed', 'cancelled'), timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = jobs.get_status(job_id)
+        if status['state'] in states:
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} stuck in {status['state']}")
+
+
+def test_submit_run_and_collect_result(jobs):
+    def handler(params, context):
+        context.update_progress(0.5, 'halfway')
+        return {'doubled': params['value'] * 2}
+
+    jobs.register('double', handler)
+    job = jobs.submit('double', {'value': 21})
+    assert job['state'] == 'queued'
+    assert jobs.get_result(job['job_id']).get('result') is None
+
+    jobs.run_job(job['job_id'])
+    result = jobs.get_result(job['job_id'])
+    assert result['state'] == 'succeeded'
+    assert result['progress'] == 1.0
+    assert result['message'] == 'halfway'
+    assert result['result'] == {'doubled': 42}
+
+
+def test_failed_job_records_error(jobs):
+    def handler(params, context):
+        raise ValueError('bad dataset')
+
+    jobs.register('train', handler)
+    job = jobs.submit('train')
+    jobs.run_job(job['job_id'])
+    status = jobs.get_status(job['job_id'])
+    assert status['state'] == 'failed'
+    assert status['error'] == 'bad dataset'
+
+
+def test_unknown_job_type_is_rejected(jobs):
+    with pytest.raises(ValueError):
+        jobs.submit('missing')
+    assert jobs.get_status('nope') is None
+
+
+def test_cancel_queued_job_never_runs(jobs):
+    calls = []
+    jobs.register('noop', lambda params, context: calls.append(1))
+    job = jobs.submit('noop')
+    assert jobs.cancel(job['job_id'])['state'] == 'cancelled'
+    jobs.run_job(job['job_id'])
+    assert calls == []
+    assert jobs.get_status(job['job_id'])['state'] == 'cancelled'
+
+
+def test_cancel_racing_job_start_wins(jobs):
+    calls = []
+    jobs.register('noop', lambda params, context: calls.append(1))
+    job = jobs.submit('noop')
+
+    # Cancel lands between the worker reading the job and marking it running
+    read = jobs.store.get
+
+    def get_then_cancel(job_id):
+        record = read(job_id)
+        jobs.store.get = read
+        jobs.cancel(job_id)
+        return record
+
+    jobs.store.get = get_then_cancel
+    jobs.run_job(job['job_id'])
+    assert calls == []
+    assert jobs.get_status(job['job_id'])['state'] == 'cancelled'
+
+
+def test_cancelled_job_is_not_marked_succeeded(jobs):
+    def handler(params, context):
+        jobs.cancel(context.job_id)
+        try:
+            context.update_progress(0.5)
+        except Exception:
+            return 'swallowed'  # handlers' generic error handling must not hide cancellation
+        return 'finished'
+
+    jobs.register('swallow', handler)
+    job = jobs.submit('swallow')
+    jobs.run_job(job['job_id'])
+    result = jobs.get_result(job['job_id'])
+    assert result['state'] == 'cancelled'
+    assert 'result' not in result
+
+
+def test_cancel_running_job_at_next_progress_update(jobs):
+    started = threading.Event()
+
+    def handler(params, context):
+        started.set()
+        for i in range(1000):
+            context.update_progress(i / 1000)
+            time.sleep(0.005)
+        return 'finished'
+
+    jobs.register('long', handler)
+    jobs.start_workers(1)
+    try:
+        job = jobs.submit('long')
+        assert started.wait(5)
+        jobs.cancel(job['job_id'])
+        status = _wait_for(jobs, job['job_id'])
+        assert status['state'] == 'cancelled'
+        assert status['cancel_requested']
+    finally:
+        jobs.stop_workers()
+
+
+def test_workers_run_jobs_concurrently(jobs):
+    barrier = threading.Barrier(2, timeout=5)
+    jobs.register('meet', lambda params, context: barrier.wait() >= 0)
+    jobs.start_workers(2)
+    try:
+        ids = [jobs.submit('meet')['job_id'] for _ in range(2)]
+        assert [_wait_for(jobs, job_id)['state'] for job_id in ids] == ['succeeded', 'succeeded']
+    finally:
+        jobs.stop_workers()
+
+
+def test_unreachable_redis_falls_back_to_memory():
+    class DownRedis:
+        def ping(self):
+            raise ConnectionError('refused')
+
+    assert JobQueue(DownRedis()).backend == 'memory'
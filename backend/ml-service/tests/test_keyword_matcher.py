@@ -0,0 +1,58 @@
+"""Unit tests for KeywordMatcher."""
+import json
+
+import pytest
+
+from services.keyword_matcher import KeywordMatcher
+
+
+@pytest.fixture(params=["scan", "trie"])
+def strategy(request, monkeypatch):
+    """Run a test against both the small-dictionary scan and the trie regex."""
+    if request.param == "trie":
+        monkeypatch.setattr(KeywordMatcher, "SMALL_DICTIONARY_SIZE", 0)
+    return request.param
+
+
+def _naive(dictionaries, sentence):
+    lowered = sentence.lower()
+    return {
+        category: [k for k in keywords if k in lowered]
+        for category, keywords in dictionaries.items()
+        if any(k in lowered for k in keywords)
+    }
+
+
+def test_matches_substring_semantics_in_dictionary_order(strategy):
+    dictionaries = {
+        "attack": ["sql injection", "sql", "phishing", "spearphishing attachment", "ids"],
+        "defense": ["patch", "update", "ids"],
+    }
+    matcher = KeywordMatcher(dictionaries)
+    sentence = "Spearphishing Attachment and SQL Injection; they dispatch an update considering IDS."
+    found, cves = matcher.match(sentence)
+    assert found == _naive(dictionaries, sentence)
+    assert cves == []
+
+
+def test_cves_are_case_sensitive_and_ordered(strategy):
+    matcher = KeywordMatcher({"attack": ["trojan"]})
+    found, cves = matcher.match("CVE-2021-44228 then cve-2020-0001 and CVE-2019-1234567 trojan")
+    assert cves == ["CVE-2021-44228", "CVE-2019-1234567"]
+    assert found == {"attack": ["trojan"]}
+    # lower() changes the length of 'İ', so offsets can't be reused
+    assert matcher.match("İ CVE-2021-44228 trojan") == ({"attack": ["trojan"]}, ["CVE-2021-44228"])
+
+
+def test_large_dictionary_from_file(tmp_path):
+    keywords = [f"technique {i:04d}" for i in range(3000)]
+    path = tmp_path / "mitre.json"
+    path.write_text(json.dumps({"attack": keywords}))
+    matcher = KeywordMatcher(KeywordMatcher.load_dictionary_file(str(path)))
+    assert len(matcher) == 3000
+    found, _ = matcher.match("seen TECHNIQUE 0042 and technique 2999 but not technique 99")
+    assert found == {"attack": ["technique 0042", "technique 2999"]}
+
+
+def test_empty_matcher():
+    assert KeywordMatcher({}, match_cves=False).match("anything") == ({}, [])
@@ -1,7 +1,7 @@
 """Unit tests for KnowledgeGraphService (in-memory fallback)."""
 import pytest
 
-from services.knowledge_graph import KnowledgeGraphService
+from services.knowledge_graph import SCHEMA_VERSION, KnowledgeGraphService, lucene_query
 
 
 @pytest.fixture
@@ -55,3 +55,192 @@ def test_get_attack_techniques_in_memory(kg):
 def test_create_threat_pattern_in_memory(kg):
     td = {"id": "tp1", "type": "malware", "severity": 8, "description": "Test", "related_techniques": []}
     assert kg.create_threat_pattern(td) is True
+
+
+class _Counters:
+    def __init__(self, rows):
+        self.nodes_created = len(rows)
+        self.relationships_created = len(rows)
+
+
+class _Result:
+    def __init__(self, rows=(), record=None):
+        self._rows = rows
+        self._record = record
+
+    def consume(self):
+        return type("Summary", (), {"counters": _Counters(self._rows)})()
+
+    def single(self):
+        return self._record
+
+    def __iter__(self):
+        return iter(self._rows)
+
+
+class _FakeTx:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def run(self, query, **params):
+        self.driver.statements.append((query, params))
+        return _Result(next(iter(params.values())))
+
+
+class _FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_write(self, fn, *args):
+        self.driver.transactions += 1
+        if self.driver.fail:
+            raise RuntimeError("Neo4j unavailable")
+        return fn(_FakeTx(self.driver), *args)
+
+    def run(self, query, **params):
+        """Auto-commit statements: schema changes and the migration record"""
+        if self.driver.fail:
+            raise RuntimeError("Neo4j unavailable")
+        self.driver.schema_statements.append(query)
+        if "RETURN m.version" in query:
+            return _Result(record={"version": self.driver.schema_version})
+        if "SET m.version" in query:
+            self.driver.schema_version = params["version"]
+        self.driver.queries.append((query, params))
+        return self.driver.records
+
+
+class _FakeDriver:
+    """Records the statements run in managed write transactions and auto-commit ones."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.transactions = 0
+        self.statements = []
+        self.schema_statements = []
+        self.schema_version = None
+        self.queries = []
+        self.records = _Result()
+
+    def session(self):
+        return _FakeSession(self)
+
+
+def _doc(n_techniques):
+    return {
+        "text": "Report",
+        "summary": "S",
+        "attack_techniques": [
+            {"technique": f"T{i}", "context": "ctx", "confidence": 0.5} for i in range(n_techniques)
+        ],
+        "defense_strategies": [{"strategy": "Patch", "context": "ctx", "confidence": 0.9}],
+        "exploit_patterns": [{"identifier": "CVE-2024-0001", "type": "cve", "confidence": 1.0}],
+    }
+
+
+def test_store_documents_knowledge_batches_with_unwind():
+    driver = _FakeDriver()
+    kg = KnowledgeGraphService(driver=driver)
+
+    stats = kg.store_documents_knowledge([(f"doc{i}", _doc(100)) for i in range(5)], batch_size=2)
+
+    assert driver.transactions == 3
+    # Five statements per transaction, whatever the number of entities
+    assert len(driver.statements) == 15
+    assert all("UNWIND" in query for query, _ in driver.statements)
+    techniques = [params["rows"] for query, params in driver.statements if ":AttackTechnique {name" in query]
+    assert [len(rows) for rows in techniques] == [200, 200, 100]
+    assert stats["documents"] == 5
+    assert stats["nodes_merged"] == 5 + 500 + 5 + 5
+    assert stats["relationships_merged"] == 510
+    assert stats["nodes_per_second"] > 0
+    assert kg.memory_stats()["documents"] == 0
+
+
+def test_store_document_knowledge_falls_back_to_memory():
+    kg = KnowledgeGraphService(driver=_FakeDriver(fail=True))
+
+    assert kg.store_document_knowledge("doc1", _doc(2)) is True
+    stats = kg.store_documents_knowledge([("doc2", _doc(1))])
+
+    assert stats["fallback_documents"] == 1
+    memory = kg.memory_stats()
+    assert memory["documents"] == 2
+    assert memory["attack_techniques"] == 2  # T0 is stored once, linked to both documents
+
+
+def test_ensure_schema_runs_migrations_once():
+    driver = _FakeDriver()
+    kg = KnowledgeGraphService(driver=driver)
+
+    created = [q for q in driver.schema_statements if q.startswith("CREATE")]
+    assert kg.schema_version == SCHEMA_VERSION == driver.schema_version
+    assert all("IF NOT EXISTS" in q for q in created)
+    assert any("REQUIRE t.name IS UNIQUE" in q for q in created)
+    assert any(q.startswith("CREATE FULLTEXT INDEX knowledge_text") for q in created)
+
+    # Already at the latest version: only the version is read
+    driver.schema_statements.clear()
+    status = KnowledgeGraphService(driver=driver, ensure_schema=False).ensure_schema()
+    assert status == {"version": SCHEMA_VERSION, "applied": [], "error": None}
+    assert len(driver.schema_statements) == 1
+
+
+def test_ensure_schema_failure_does_not_block_startup():
+    kg = KnowledgeGraphService(driver=_FakeDriver(fail=True))
+
+    assert kg.schema_version is None
+    assert kg.ensure_schema()["error"] == "Neo4j unavailable"
+
+
+def test_lucene_query_escapes_syntax():
+    assert lucene_query("  sql-injection (cve-2021:44228) ") == r"sql\-injection \(cve\-2021\:44228\)"
+    assert lucene_query("a&&b || c/d") == r"a\&\&b \|\| c\/d"
+
+
+def test_query_knowledge_fulltext_and_substring_modes():
+    driver = _FakeDriver()
+    driver.records = _Result([{"n": {"name": "SQL Injection"}, "labels": ["AttackTechnique"], "score": 2.5}])
+    kg = KnowledgeGraphService(driver=driver)
+
+    results = kg.query_knowledge("SQL Injection", labels=["AttackTechnique"], skip=10, limit=5)
+
+    query, params = driver.queries[-1]
+    assert "db.index.fulltext.queryNodes" in query
+    assert params == {"index": "knowledge_text", "search": "sql injection",
+                      "labels": ["AttackTechnique"], "skip": 10, "limit": 5}
+    assert results == [{"name": "SQL Injection", "labels": ["AttackTechnique"], "score": 2.5}]
+
+    kg.query_knowledge("SQL Injection", mode="substring")
+    query, params = driver.queries[-1]
+    assert "CONTAINS $text" in query and params["text"] == "sql injection"
+    with pytest.raises(ValueError):
+        kg.query_knowledge("x", mode="regex")
+
+
+def test_query_knowledge_in_memory_labels_and_pagination(kg):
+    kg.store_document_knowledge("d1", {
+        "attack_techniques": [{"technique": f"Phishing {i}", "context": "Email"} for i in range(5)],
+        "defense_strategies": [{"strategy": "Phishing training", "context": "Awareness"}],
+    })
+
+    assert len(kg.query_knowledge("phishing")) == 6
+    assert [r["name"] for r in kg.query_knowledge("phishing", skip=3, limit=2)] == ["Phishing 3", "Phishing 4"]
+    assert [r["labels"] for r in kg.query_knowledge("phishing", labels=["DefenseStrategy"])] == [["DefenseStrategy"]]
+
+
+def test_query_knowledge_in_memory_prefix_and_substring(kg):
+    kg.store_document_knowledge("d1", {
+        "attack_techniques": [{"technique": "SQL Injection", "context": "Web forms"}],
+        "defense_strategies": [],
+    })
+
+    assert len(kg.query_knowledge("inject")) == 1
+    assert kg.query_knowledge("njection") == []
+    assert len(kg.query_knowledge("njection", mode="substring")) == 1
@@ -0,0 +1,98 @@
+"""Unit tests for MemoryKnowledgeStore."""
+from services.knowledge_store import MemoryKnowledgeStore
+
+
+def _extracted(techniques=(), strategies=()):
+    return {
+        "text": "Report",
+        "summary": "S",
+        "attack_techniques": [{"technique": n, "context": c, "confidence": 0.5} for n, c in techniques],
+        "defense_strategies": [{"strategy": n, "context": c, "confidence": 0.9} for n, c in strategies],
+    }
+
+
+def test_entities_are_stored_once_per_name():
+    store = MemoryKnowledgeStore()
+    for i in range(100):
+        store.add_document(f"doc{i}", _extracted(
+            techniques=[("Phishing", f"context {i}"), ("Phishing", "again")],
+            strategies=[("Awareness training", "train staff")],
+        ))
+
+    stats = store.memory_stats()
+    assert stats["documents"] == 100
+    assert stats["attack_techniques"] == 1 and stats["defense_strategies"] == 1
+    assert stats["edges"] == 200
+    phishing = store.search("phishing")
+    assert phishing == [{"name": "Phishing", "description": "context 0", "confidence": 0.5,
+                         "document_id": "doc99", "documents": 100, "labels": ["AttackTechnique"]}]
+    # Description and indexed copy
+    assert stats["context_bytes"] == 2 * (len("context 0") + len("train staff"))
+
+
+def test_context_budget_counts_utf8_bytes():
+    store = MemoryKnowledgeStore()
+    store.add_document("doc1", _extracted(techniques=[("Phishing", "Müller-Lüdenscheid")]))
+    assert store.memory_stats()["context_bytes"] == 2 * len("Müller-Lüdenscheid".encode())
+
+
+def test_reprocessed_document_does_not_duplicate_edges():
+    store = MemoryKnowledgeStore()
+    store.add_document("doc1", _extracted(techniques=[("XSS", "web")]))
+    store.add_document("doc1", _extracted(techniques=[("XSS", "web"), ("CSRF", "web")]))
+
+    assert store.memory_stats()["edges"] == 2
+    assert [t["documents"] for t in store.top_techniques()] == [1, 1]
+
+
+def test_least_recently_mentioned_contexts_are_evicted():
+    store = MemoryKnowledgeStore(max_context_bytes=500)
+    store.add_document("doc1", _extracted(techniques=[("Old", "o" * 100), ("Hot", "h" * 100)]))
+    store.add_document("doc2", _extracted(techniques=[("Hot", "ignored"), ("New", "n" * 100)]))
+
+    stats = store.memory_stats()
+    assert stats["evicted_contexts"] == 1
+    assert stats["context_bytes"] == 400
+    by_name = {t["name"]: t for t in store.top_techniques()}
+    assert by_name["Old"]["description"] == ""
+    assert by_name["Hot"]["description"] == "h" * 100
+    # Evicted contexts are no longer searchable; the entity still is, by name
+    assert store.search("ooo") == []
+    assert [r["name"] for r in store.search("old")] == ["Old"]
+
+    # A later mention brings a context back
+    store.add_document("doc3", _extracted(techniques=[("Old", "fresh context")]))
+    assert [r["name"] for r in store.search("fresh")] == ["Old"]
+
+
+def test_eviction_churn_keeps_postings_and_memory_bounded():
+    store = MemoryKnowledgeStore(max_context_bytes=2000)
+    techniques = [(f"Technique {i}", f"injection variant {i} " * 10) for i in range(40)]
+
+    for cycle in range(5):
+        for i, technique in enumerate(techniques):
+            store.add_document(f"doc{cycle}-{i}", _extracted(techniques=[technique]))
+        stats = store.memory_stats()
+        index_stats = store._indexes["AttackTechnique"].get_stats()
+        if cycle == 0:
+            postings = index_stats["postings"]
+        assert index_stats["postings"] <= postings
+        assert stats["context_bytes"] <= 2000
+        # Everything the store holds for the contexts, including the index copy
+        names = sum(len(name) + 1 for name, _ in techniques)
+        assert index_stats["text_bytes"] - names + sum(len(e.description) for e in store._contexts) \
+            == stats["context_bytes"]
+
+    assert stats["evicted_contexts"] > 100
+    results = store.search("injection variant")
+    assert len(results) == len({r["name"] for r in results})
+
+
+def test_strategies_for_technique_follow_document_edges():
+    store = MemoryKnowledgeStore()
+    store.add_document("doc1", _extracted(techniques=[("SQL Injection", "")], strategies=[("Input validation", "")]))
+    store.add_document("doc2", _extracted(techniques=[("Phishing", "")], strategies=[("MFA", "")]))
+    store.add_document("doc3", _extracted(techniques=[("sql injection", "")], strategies=[("WAF", "")]))
+
+    assert [s["name"] for s in store.strategies("SQL injection")] == ["Input validation", "WAF"]
+    assert [s["name"] for s in store.strategies()] == ["Input validation", "MFA", "WAF"]
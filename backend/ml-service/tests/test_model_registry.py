@@ -0,0 +1,101 @@
+"""Unit tests for ModelRegistry."""
+import threading
+import time
+
+from services.model_registry import ModelRegistry
+
+
+def _counting_loader(calls, value='model', delay=0.0):
+    def load():
+        calls.append(1)
+        if delay:
+            time.sleep(delay)
+        return value
+    return load
+
+
+def test_models_load_lazily_and_once():
+    registry = ModelRegistry()
+    calls = []
+    registry.register('ner', _counting_loader(calls))
+    assert not registry.is_loaded('ner')
+    assert calls == []
+
+    assert registry.get('ner') == 'model'
+    assert registry.get('ner') == 'model'
+    assert len(calls) == 1
+    assert registry.get_stats()['models']['ner']['uses'] == 2
+
+
+def test_register_is_idempotent_unless_replaced():
+    registry = ModelRegistry()
+    assert registry.register('ner', lambda: 'first')
+    assert not registry.register('ner', lambda: 'second')
+    assert registry.get('ner') == 'first'
+
+    assert registry.register('ner', lambda: 'second', replace=True)
+    assert registry.get('ner') == 'second'
+
+
+def test_concurrent_first_use_loads_once():
+    registry = ModelRegistry()
+    calls = []
+    registry.register('ner', _counting_loader(calls, delay=0.05))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get('ner'))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ['model'] * 8
+    assert len(calls) == 1
+
+
+def test_failed_load_returns_none_until_evicted():
+    registry = ModelRegistry()
+    calls = []
+
+    def failing():
+        calls.append(1)
+        raise RuntimeError('no weights')
+
+    registry.register('ner', failing)
+    assert registry.get('ner') is None
+    assert registry.get('ner') is None
+    assert len(calls) == 1
+    assert registry.get_stats()['models']['ner']['error'] == 'no weights'
+
+    registry.evict('ner')
+    assert registry.get('ner') is None
+    assert len(calls) == 2
+
+
+def test_unknown_model_is_none():
+    assert ModelRegistry().get('missing') is None
+
+
+def test_evict_idle_and_reload():
+    registry = ModelRegistry()
+    calls = []
+    registry.register('ner', _counting_loader(calls))
+    registry.register('classifier', _counting_loader([]))
+    registry.get('ner')
+    registry.get('classifier')
+
+    assert registry.evict_idle(3600) == []
+    assert sorted(registry.evict_idle(0)) == ['classifier', 'ner']
+    assert not registry.is_loaded('ner')
+
+    registry.get('ner')
+    assert len(calls) == 2
+
+
+def test_background_warm_up():
+    registry = ModelRegistry()
+    registry.register('ner', _counting_loader([]))
+    thread = registry.warm_up(background=True)
+    thread.join(timeout=5)
+    assert registry.is_loaded('ner')
+    stats = registry.get_stats()
+    assert stats['models']['ner']['load_seconds'] is not None
+    assert stats['rss_mb'] > 0
@@ -0,0 +1,72 @@
+"""Unit tests for ModelServer and CompiledClassifier."""
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from services.model_server import CompiledClassifier, ModelServer
+from services.self_learning_engine import SelfLearningEngine
+
+
+def _threats(n, classification, field, value):
+    return [{'behavior': {field: value + i % 3}, 'classification': classification} for i in range(n)]
+
+
+def test_compiled_forest_matches_sklearn():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 5))
+    y = np.where(X[:, 0] > 0, 'a', 'b')
+    forest = RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y)
+    compiled = CompiledClassifier(forest)
+    assert compiled.trees is not None
+    assert compiled.classes == ['a', 'b']
+    assert np.allclose(compiled.predict_proba(X[:50]), forest.predict_proba(X[:50]))
+
+
+def test_compiled_classifier_applies_scaler():
+    rng = np.random.default_rng(1)
+    X = rng.normal(loc=100, scale=10, size=(200, 3))
+    y = (X[:, 1] > 100).astype(int)
+    scaler = StandardScaler().fit(X)
+    model = LogisticRegression().fit(scaler.transform(X), y)
+    compiled = CompiledClassifier(model, scaler, classes=['low', 'high'])
+    assert compiled.trees is None
+    assert compiled.classes == ['low', 'high']
+    assert np.allclose(compiled.predict_proba(X), model.predict_proba(scaler.transform(X)))
+
+
+def test_server_follows_online_model_updates_and_records_latency(tmp_path):
+    engine = SelfLearningEngine(model_dir=str(tmp_path))
+    server = ModelServer(engine)
+    X = engine.threat_schema.fill_matrix(_threats(4, None, 'suspicious_file_access', 40))
+    assert server.predict_proba(X) is None
+
+    engine.learn_from_threats(_threats(30, 'ransomware', 'suspicious_file_access', 40)
+                              + _threats(30, 'trojan', 'privilege_escalation', 2))
+    prediction = server.predict_proba(X)
+    assert prediction['model'] == 'online_random_forest'
+    assert prediction['classes'] == ['ransomware', 'trojan']
+    assert list(prediction['probabilities'].argmax(axis=1)) == [0, 0, 0, 0]
+    assert server.get_classifier() is server.get_classifier()
+
+    engine.learn_from_threats(_threats(10, 'trojan', 'privilege_escalation', 2))
+    assert server.predict_proba(X)['version'] != prediction['version']
+
+    stats = server.get_stats()
+    assert stats['requests'] == 2
+    assert stats['rows'] == 8
+    assert stats['compiles'] == 2
+    assert stats['latency_ms']['p95'] >= stats['latency_ms']['p50'] > 0
+
+
+def test_server_prefers_batch_models_on_threat_features(tmp_path):
+    engine = SelfLearningEngine(model_dir=str(tmp_path), parallel_training=False)
+    threats = _threats(40, 'ransomware', 'suspicious_file_access', 40) + _threats(40, 'phishing', 'privilege_escalation', 2)
+    engine.learn_from_threats(threats, incremental=False)
+
+    prediction = ModelServer(engine).predict_proba(engine.threat_schema.fill_matrix(threats[:2]))
+    assert prediction['version'] == engine.model_version
+    assert prediction['model'] in ('random_forest', 'gradient_boosting')
+    assert prediction['classes'] == ['phishing', 'ransomware']
+    assert prediction['probabilities'][0, 1] == pytest.approx(1.0, abs=0.1)
@@ -0,0 +1,45 @@
+"""Unit tests for ModelStore."""
+import numpy as np
+import pytest
+
+from services.model_store import ModelStore
+
+
+def test_save_load_and_latest_pointer(tmp_path):
+    store = ModelStore(str(tmp_path))
+    assert store.latest_version() is None
+    assert store.load() is None
+
+    first = store.save({'weights': np.arange(10.0)}, {'accuracy': 0.9})
+    second = store.save({'weights': np.arange(5.0)}, {'accuracy': 0.95})
+    assert store.list_versions() == [first, second]
+    assert store.latest_version() == second
+
+    loaded = store.load()
+    assert loaded['version'] == second
+    assert loaded['manifest']['accuracy'] == 0.95
+    assert loaded['manifest']['artifacts'] == {'weights': 'weights.joblib'}
+    assert isinstance(loaded['artifacts']['weights'], np.memmap)
+    assert list(store.load(first)['artifacts']['weights']) == list(np.arange(10.0))
+
+
+def test_failed_save_leaves_latest_untouched(tmp_path):
+    store = ModelStore(str(tmp_path))
+    version = store.save({'a': 1}, {})
+
+    class Unpicklable:
+        def __reduce__(self):
+            raise TypeError('cannot pickle')
+
+    with pytest.raises(TypeError):
+        store.save({'b': Unpicklable()}, {})
+    assert store.latest_version() == version
+    assert store.list_versions() == [version]
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith('.')] == []
+
+
+def test_prune_keeps_recent_versions(tmp_path):
+    store = ModelStore(str(tmp_path), keep_versions=2)
+    versions = [store.save({'n': n}, {}) for n in range(4)]
+    assert store.list_versions() == versions[-2:]
+    assert store.load()['artifacts']['n'] == 3
@@ -0,0 +1,81 @@
+"""Unit tests for the compiled threat RuleEngine."""
+import json
+
+import numpy as np
+import pytest
+
+from services.feature_schema import THREAT_FEATURE_SCHEMA
+from services.rule_engine import RuleEngine
+from services.threat_detector import ThreatDetector
+
+
+CONFIG = {
+    "rules": [
+        {
+            "type": "exfiltration",
+            "severity": 7,
+            "condition": "network.bytes_transferred > 1000 AND network.port_count >= 3 OR email.suspicious_links > 5",
+            "confidence": 0.8,
+            "recommendations": ["Block egress"],
+        },
+        {
+            "type": "scan",
+            "condition": "network.port_count > 10 OR network.connection_count > 100",
+            "confidence": {"base": 0.4, "per_match": 0.3, "max": 0.95},
+        },
+    ],
+    "default": {"type": "unknown", "confidence": 0.5},
+}
+
+
+@pytest.fixture
+def rules_file(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(CONFIG))
+    return path
+
+
+def _row(**sections):
+    return THREAT_FEATURE_SCHEMA.fill_row(sections)
+
+
+def test_and_binds_tighter_than_or(rules_file):
+    engine = RuleEngine(str(rules_file))
+    rows = np.vstack([
+        _row(network={"bytes_transferred": 5000, "port_count": 3}),
+        _row(network={"bytes_transferred": 5000, "port_count": 2}),
+        _row(email={"suspicious_links": 6}),
+        _row(network={"port_count": 20, "connection_count": 500}),
+        _row(network={"packet_count": 1}),
+    ])
+    best, confidence = engine.evaluate(rows)
+    assert [engine.rules[i].type if i >= 0 else None for i in best] == [
+        "exfiltration", None, "exfiltration", "scan", None]
+    assert confidence[3] == pytest.approx(0.95)
+    for row, index, conf in zip(rows, best, confidence):
+        assert engine.evaluate_row(row) == (index, pytest.approx(conf))
+
+
+def test_classification_payload_is_interned(rules_file):
+    engine = RuleEngine(str(rules_file))
+    first = engine.classification(0, 0.8)
+    assert first["recommendations"] is engine.rules[0].recommendations
+    assert engine.classification(-1, 0.0)["type"] == "unknown"
+    assert engine.severity == {"exfiltration": 7, "scan": 5, "unknown": 5}
+
+
+def test_invalid_conditions_rejected(tmp_path):
+    path = tmp_path / "bad.json"
+    path.write_text(json.dumps({"rules": [{"type": "x", "condition": "network.packet_count >> 1"}]}))
+    with pytest.raises(ValueError):
+        RuleEngine(str(path))
+    path.write_text(json.dumps({"rules": [{"type": "x", "condition": "network.nope > 1"}]}))
+    with pytest.raises(ValueError):
+        RuleEngine(str(path))
+
+
+def test_threat_detector_uses_configured_rules(tmp_path, rules_file):
+    detector = ThreatDetector(model_dir=str(tmp_path), rules_path=str(rules_file))
+    result = detector.detect_threat({"network": {"port_count": 50}})
+    assert result["classification"] == "scan"
+    assert result["confidence"] == pytest.approx(0.7)
@@ -0,0 +1,137 @@
+"""Unit tests for SegmentedDownloader."""
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.segmented_downloader import ChecksumMismatch, SegmentedDownloader
+
+PAYLOAD = os.urandom(300 * 1024)
+SHA256 = hashlib.sha256(PAYLOAD).hexdigest()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serves PAYLOAD with Range support; behaviour is set on the server object"""
+
+    def log_message(self, *args):
+        pass
+
+    def _range(self):
+        header = self.headers.get('Range')
+        if not header or not self.server.ranges:
+            return None
+        start, _, end = header.split('=')[1].partition('-')
+        return int(start), int(end) if end else len(PAYLOAD) - 1
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(PAYLOAD)))
+        if self.server.ranges:
+            self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', '"v1"')
+        self.end_headers()
+
+    def do_GET(self):
+        byte_range = self._range()
+        start, end = byte_range or (0, len(PAYLOAD) - 1)
+        self.server.ranges_requested.append((start, end))
+        self.send_response(206 if byte_range else 200)
+        if byte_range:
+            self.send_header('Content-Range', f"bytes {start}-{end}/{len(PAYLOAD)}")
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('ETag', '"v1"')
+        self.end_headers()
+
+        body = PAYLOAD[start:end + 1]
+        with self.server.lock:
+            cut = self.server.fail_after
+            self.server.fail_after = None
+        if cut is not None:
+            # Drop the connection part-way through the body
+            self.wfile.write(body[:cut])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+        self.server.bytes_served += len(body)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    httpd.ranges = True
+    httpd.fail_after = None
+    httpd.bytes_served = 0
+    httpd.ranges_requested = []
+    httpd.lock = threading.Lock()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/flows.csv"
+
+
+def test_parallel_segments_and_checksum(server, tmp_path):
+    reports = []
+    downloader = SegmentedDownloader(segments=4, min_segment_bytes=64 * 1024, chunk_size=8192,
+                                     progress_interval=0.0, progress_callback=lambda done, total: reports.append(done))
+    result = downloader.download(_url(server), str(tmp_path / 'flows.csv'), sha256=SHA256)
+
+    assert (tmp_path / 'flows.csv').read_bytes() == PAYLOAD
+    assert result['segments'] == 4 and result['ranged'] is True
+    assert result['sha256'] == SHA256
+    assert len(server.ranges_requested) == 4
+    assert reports[-1] <= len(PAYLOAD) and reports == sorted(reports)
+    assert sorted(os.listdir(tmp_path)) == ['flows.csv']
+
+
+def test_progress_reports_are_rate_limited(server, tmp_path):
+    reports = []
+    downloader = SegmentedDownloader(segments=1, chunk_size=1024, progress_interval=3600,
+                                     progress_callback=lambda done, total: reports.append(done))
+    downloader.download(_url(server), str(tmp_path / 'flows.csv'))
+    assert reports == []
+
+
+def test_interrupted_download_resumes_from_state_file(server, tmp_path):
+    dest = tmp_path / 'flows.csv'
+    server.fail_after = 50 * 1024
+    downloader = SegmentedDownloader(segments=1, chunk_size=4096, retries=0, progress_interval=0.0)
+    with pytest.raises(Exception):
+        downloader.download(_url(server), str(dest))
+    assert not dest.exists()
+    assert (tmp_path / 'flows.csv.part.json').exists()
+
+    result = downloader.download(_url(server), str(dest), sha256=SHA256)
+    assert dest.read_bytes() == PAYLOAD
+    assert result['resumed_bytes'] > 0
+    assert result['resumed_bytes'] + result['downloaded_bytes'] == len(PAYLOAD)
+    assert server.ranges_requested[-1] == (result['resumed_bytes'], len(PAYLOAD) - 1)
+
+
+def test_failed_segment_is_retried_from_where_it_stopped(server, tmp_path):
+    server.fail_after = 10 * 1024
+    downloader = SegmentedDownloader(segments=2, min_segment_bytes=64 * 1024, retries=2, chunk_size=1024)
+    result = downloader.download(_url(server), str(tmp_path / 'flows.csv'), sha256=SHA256)
+    assert result['sha256'] == SHA256
+    assert len(server.ranges_requested) == 3
+
+
+def test_checksum_mismatch_discards_download(server, tmp_path):
+    with pytest.raises(ChecksumMismatch):
+        SegmentedDownloader().download(_url(server), str(tmp_path / 'flows.csv'), sha256='0' * 64)
+    assert os.listdir(tmp_path) == []
+
+
+def test_server_without_ranges_gets_single_stream(server, tmp_path):
+    server.ranges = False
+    result = SegmentedDownloader(segments=4, min_segment_bytes=1024).download(_url(server), str(tmp_path / 'f.csv'))
+    assert result['ranged'] is False
+    assert result['segments'] == 1
+    assert (tmp_path / 'f.csv').read_bytes() == PAYLOAD
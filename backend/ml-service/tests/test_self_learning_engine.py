@@ -0,0 +1,101 @@
+"""Unit tests for SelfLearningEngine batch training."""
+import numpy as np
+import pytest
+
+from services.self_learning_engine import SelfLearningEngine
+
+
+def _dataset(n, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 6))
+    return X, (X[:, 0] + X[:, 1] > 0).astype(int)
+
+
+def test_batch_training_records_per_model_wall_time(tmp_path):
+    engine = SelfLearningEngine(model_dir=str(tmp_path), parallel_training=False)
+    results = engine._train_models(*_dataset(300))
+    assert results['parallel'] is False
+    assert set(results) >= {'random_forest', 'gradient_boosting', 'best_model', 'accuracy'}
+
+    entry = engine.training_history[-1]
+    assert entry['samples'] == 300
+    assert set(entry['models']) == {'random_forest', 'gradient_boosting'}
+    assert all(model['train_seconds'] > 0 for model in entry['models'].values())
+    assert engine._evaluate_combined_models() == entry['accuracy']
+
+
+def test_large_datasets_use_hist_gradient_boosting(tmp_path, monkeypatch):
+    monkeypatch.setattr(SelfLearningEngine, 'HIST_GRADIENT_BOOSTING_MIN_SAMPLES', 200)
+    engine = SelfLearningEngine(model_dir=str(tmp_path), parallel_training=False)
+    engine._train_models(*_dataset(300))
+    assert sorted(engine.models) == ['hist_gradient_boosting', 'random_forest']
+
+    monkeypatch.setattr(SelfLearningEngine, 'HIST_GRADIENT_BOOSTING_MIN_SAMPLES', 10 ** 6)
+    engine._train_models(*_dataset(300))
+    assert sorted(engine.models) == ['gradient_boosting', 'random_forest']
+
+
+def test_candidate_models_train_in_worker_processes(tmp_path, monkeypatch):
+    monkeypatch.setattr(SelfLearningEngine, 'PARALLEL_TRAINING_MIN_SAMPLES', 0)
+    engine = SelfLearningEngine(model_dir=str(tmp_path), n_jobs=4)
+    assert engine._candidate_models(100)['random_forest'].n_jobs == 3
+
+    results = engine._train_models(*_dataset(300))
+    assert results['parallel'] is True
+    assert results['accuracy'] > 0.8
+    assert engine.models['random_forest'].predict(engine.scaler.transform(_dataset(5, seed=1)[0])).shape == (5,)
+
+
+def test_trained_models_are_versioned_and_warm_loaded(tmp_path):
+    engine = SelfLearningEngine(model_dir=str(tmp_path), parallel_training=False)
+    assert engine.serving_models is None
+
+    X, y = _dataset(300)
+    engine.feature_names = [f'f{i}' for i in range(6)]
+    engine.class_names = [0, 1]
+    engine._train_models(X, y)
+    engine._save_models(source='unit-test')
+    first = engine.model_version
+    assert engine.serving_models['version'] == first
+    manifest = engine.model_store.manifest(first)
+    assert manifest['feature_names'] == engine.feature_names
+    assert manifest['data_hash'] == engine.training_history[-1]['data_hash']
+    assert manifest['metrics']['random_forest']['accuracy'] > 0.8
+
+    restarted = SelfLearningEngine(model_dir=str(tmp_path))
+    assert restarted.model_version == first
+    assert restarted.feature_names == engine.feature_names
+    X_new = _dataset(5, seed=1)[0]
+    serving = restarted.serving_models
+    assert np.array_equal(serving['models']['random_forest'].predict(serving['scaler'].transform(X_new)),
+                          engine.models['random_forest'].predict(engine.scaler.transform(X_new)))
+
+    # A set trained elsewhere replaces the served one without a restart
+    engine._train_models(*_dataset(300, seed=2))
+    engine._save_models()
+    assert restarted.reload_models() is True
+    assert restarted.serving_models['version'] == engine.model_version != first
+    assert restarted.reload_models() is False
+    assert restarted.get_model_info()['stored_versions'] == [first, engine.model_version]
+
+
+def test_dataset_learning_reports_progress_and_can_be_stopped(tmp_path):
+    engine = SelfLearningEngine(model_dir=str(tmp_path / 'models'), parallel_training=False)
+    X, y = _dataset(300)
+    path = tmp_path / 'flows.csv'
+    header = ','.join(f'f{i}' for i in range(6)) + ',label'
+    np.savetxt(path, np.column_stack([X, y]), delimiter=',', header=header, comments='')
+
+    reports = []
+    result = engine.learn_from_dataset(str(path), progress_callback=lambda p, m=None: reports.append(round(p, 4)))
+    assert result['success']
+    assert reports == sorted(reports) and len(reports) == 4  # loaded, two models, saving
+
+    class Stop(BaseException):
+        pass
+
+    def stop(progress, message=None):
+        raise Stop()
+
+    with pytest.raises(Stop):
+        engine.hybrid_learn(datasets=[str(path)], progress_callback=stop)
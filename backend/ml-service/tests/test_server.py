@@ -0,0 +1,71 @@
+"""Unit tests for the server and worker entrypoints (spawned workers must not re-run startup)."""
+import os
+import shutil
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Stands in for app.py: records every process that imports it
+FAKE_APP = textwrap.dedent("""
+    import os
+
+    with open(os.environ["STARTUP_MARKER"], "a") as f:
+        f.write(f"{os.getpid()}\\n")
+
+    import numpy as np
+
+    from services.ingestion_pipeline import IngestionPipeline
+    from services.self_learning_engine import SelfLearningEngine
+
+
+    class _App:
+        def run(self, **kwargs):
+            if os.environ["WORKLOAD"] == "training":
+                engine = SelfLearningEngine(model_dir=os.environ["MODEL_DIR"], n_jobs=2)
+                engine.PARALLEL_TRAINING_MIN_SAMPLES = 0
+                rng = np.random.default_rng(0)
+                X = rng.normal(size=(200, 4))
+                results = engine._train_models(X, (X[:, 0] > 0).astype(int))
+                assert results["parallel"]
+                print(0)
+            else:
+                pipeline = IngestionPipeline(processor=None, process_workers=1)
+                worker_pid = pipeline._get_pool().submit(os.getpid).result()
+                pipeline.shutdown()
+                print(worker_pid)
+
+
+    app = _App()
+
+
+    def start_background_services():
+        pass
+""")
+
+
+@pytest.mark.parametrize("workload", ["ingestion", "training"])
+def test_spawned_workers_do_not_import_app(tmp_path, workload):
+    shutil.copy(os.path.join(ROOT, "server.py"), tmp_path / "server.py")
+    (tmp_path / "app.py").write_text(FAKE_APP)
+    marker = tmp_path / "startups"
+    env = {**os.environ, "PYTHONPATH": ROOT, "STARTUP_MARKER": str(marker),
+           "WORKLOAD": workload, "MODEL_DIR": str(tmp_path / "models")}
+
+    out = subprocess.run([sys.executable, str(tmp_path / "server.py")], env=env,
+                         capture_output=True, text=True, timeout=120)
+
+    assert out.returncode == 0, out.stderr
+    startups = marker.read_text().split()
+    assert len(startups) == 1  # the server process only
+    assert int(startups[0]) != int(out.stdout.split()[-1])
+
+
+@pytest.mark.parametrize("entrypoint", ["server", "worker"])
+def test_importing_entrypoint_has_no_side_effects(entrypoint):
+    out = subprocess.run([sys.executable, "-c", f"import sys, {entrypoint}; print('app' in sys.modules)"],
+                         cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert out.stdout.strip() == "False"
@@ -0,0 +1,91 @@
+"""Unit tests for TextIndex."""
+import random
+
+import pytest
+
+from services.text_index import TextIndex
+
+
+def _random_docs(n, seed=0):
+    rng = random.Random(seed)
+    words = ["".join(rng.choices("abcdefgh", k=rng.randint(2, 7))) for _ in range(300)]
+    return [(" ".join(rng.choices(words, k=2)).title(), " ".join(rng.choices(words, k=12)))
+            for _ in range(n)]
+
+
+def test_substring_search_matches_naive_scan():
+    docs = _random_docs(2000)
+    index = TextIndex()
+    for name, description in docs:
+        index.add(name, description)
+
+    for query in ("ab", "abc", "Bcd Ef", "defgha", "hhhhhhhh", "a", ""):
+        q = query.lower()
+        expected = [i for i, (n, d) in enumerate(docs) if q in n.lower() or q in d.lower()]
+        assert index.search(query) == expected
+        assert index.search(query, limit=5) == expected[:5]
+
+
+def test_substring_does_not_span_fields():
+    index = TextIndex()
+    index.add("sql", "injection")
+    assert index.search("sql") == [0]
+    assert index.search("sqlinjection") == []
+    assert index.search("l i") == []
+
+
+def test_prefix_search_requires_every_word():
+    index = TextIndex()
+    index.add("SQL Injection", "Attacks via web forms")
+    index.add("Blind SQL injection", None)
+    index.add("Phishing", "Email with injected links")
+
+    assert index.search("inject", mode="prefix") == [0, 1, 2]
+    assert index.search("sql inj", mode="prefix") == [0, 1]
+    assert index.search("njection", mode="prefix") == []
+    assert index.search("njection") == [0, 1]
+    with pytest.raises(ValueError):
+        index.search("x", mode="fuzzy")
+
+
+def test_get_stats():
+    index = TextIndex()
+    index.add("abcd")
+    index.add("ab")
+
+    stats = index.get_stats()
+    assert stats["documents"] == 2 == len(index)
+    assert stats["grams"] == 3  # abc, bcd, and "ab" (shorter than a gram)
+    assert stats["postings"] == 3
+
+
+def test_update_replaces_text():
+    index = TextIndex()
+    index.add("Phishing", "Email lures")
+    index.add("Malware", None)
+
+    index.update(0, "Phishing", None)
+    index.update(1, "Malware", "Email attachments")
+
+    assert index.search("email") == [1]
+    assert index.search("lures") == []
+    assert index.search("phish") == [0]
+
+
+def test_repeated_updates_keep_one_posting_per_document():
+    index = TextIndex()
+    index.add("SQL Injection", "Attacks via web forms")
+    index.add("Phishing", None)
+    size = index.get_stats()["postings"]
+
+    for _ in range(5):
+        index.update(0, "SQL Injection", None)
+        index.update(0, "SQL Injection", "Attacks via web forms")
+
+    assert index.search("injection") == [0]
+    assert index.search("web forms") == [0]
+    assert index.get_stats()["postings"] == size
+
+    index.update(0, "SQL Injection", None)
+    assert index.search("forms") == []
+    assert "orm" not in index._postings
@@ -0,0 +1,115 @@
+"""Unit tests for ThreatDetector."""
+import numpy as np
+import pytest
+
+from services.threat_detector import ThreatDetector
+
+
+EVENTS = [
+    {"behavior": {"suspicious_file_access": 25, "unusual_network_activity": 4}},
+    {"network": {"connection_count": 80}, "behavior": {"suspicious_file_access": 15}},
+    {"behavior": {"privilege_escalation": 1}},
+    {"email": {"suspicious_links": 2}},
+    {"behavior": {"unknown_processes": 6, "unusual_network_activity": 12}},
+    {"network": {"packet_count": 10}},
+]
+
+
+@pytest.fixture
+def detector(tmp_path):
+    return ThreatDetector(model_dir=str(tmp_path))
+
+
+def _baseline(n=200):
+    return [
+        {
+            "network": {"packet_count": 100 + i % 7, "connection_count": 5 + i % 3},
+            "behavior": {"suspicious_file_access": i % 2},
+        }
+        for i in range(n)
+    ]
+
+
+def test_detect_threats_empty_batch(detector):
+    assert detector.detect_threats([]) == []
+
+
+def test_detect_threats_matches_single_event_path(detector):
+    batch = detector.detect_threats(EVENTS)
+    assert len(batch) == len(EVENTS)
+    for event, result in zip(EVENTS, batch):
+        single = detector.detect_threat(event)
+        assert result["threat_detected"] == single["threat_detected"]
+        assert result["classification"] == single["classification"]
+        assert result["confidence"] == pytest.approx(single["confidence"])
+        assert result.get("severity") == single.get("severity")
+        assert result.get("recommendations") == single.get("recommendations")
+
+
+def test_detect_threats_classifications(detector):
+    types = [r["classification"] for r in detector.detect_threats(EVENTS)]
+    assert types == ["ransomware", "malware", "trojan", "phishing", "trojan", None]
+
+
+def test_unfitted_detector_relies_on_rules(detector):
+    assert detector.get_model_info()["fitted"] is False
+    result = detector.detect_threat({"network": {"packet_count": 10}})
+    assert result["threat_detected"] is False
+
+
+def test_fit_baseline_persists_and_reloads(detector, tmp_path):
+    info = detector.fit_baseline(_baseline())
+    assert info["fitted"] is True
+    assert info["baseline_samples"] == 200
+    assert (tmp_path / ThreatDetector.MODEL_FILENAME).exists()
+
+    reloaded = ThreatDetector(model_dir=str(tmp_path))
+    assert reloaded.get_model_info()["version"] == info["version"]
+
+    normal = {"network": {"packet_count": 103, "connection_count": 6}}
+    assert reloaded.detect_threat(normal)["threat_detected"] is False
+    outlier = {"network": {"packet_count": 10 ** 6, "connection_count": 900}}
+    result = reloaded.detect_threat(outlier)
+    assert result["threat_detected"] is True
+    assert result["classification"] == "malware"
+    assert [r["threat_detected"] for r in reloaded.detect_threats([normal, outlier])] == [False, True]
+
+
+
+class _FakeModelServer:
+    def __init__(self, classes, probabilities):
+        self.classes = classes
+        self.probabilities = np.asarray(probabilities, dtype=float)
+
+    def predict_proba(self, X):
+        return {'classes': self.classes, 'probabilities': self.probabilities[:len(X)],
+                'model': 'random_forest', 'version': 'v1', 'latency_ms': 0.5}
+
+
+def test_learned_classifier_replaces_rules(tmp_path):
+    server = _FakeModelServer(['BENIGN', 'ransomware', 'botnet'], [[0.1, 0.8, 0.1], [0.9, 0.05, 0.05], [0.2, 0.1, 0.7]])
+    detector = ThreatDetector(model_dir=str(tmp_path), model_server=server)
+
+    inference = {}
+    results = detector.detect_threats(EVENTS[:3], inference=inference)
+    assert inference == {'classifier': 'random_forest', 'version': 'v1', 'inference_ms': 0.5}
+    assert [r['classification'] for r in results] == ['ransomware', None, 'botnet']
+    assert results[0]['confidence'] == pytest.approx(0.8)
+    assert results[0]['recommendations']  # from the ransomware rule
+    assert results[2]['description'] == 'botnet (learned classifier)'
+    assert results[0]['classifier'] == 'random_forest'
+
+    single = detector.detect_threat(EVENTS[0])
+    assert single['classification'] == 'ransomware'
+    assert single['inference_ms'] == 0.5
+
+
+def test_rules_are_used_until_a_model_is_trained(tmp_path):
+    class Untrained:
+        def predict_proba(self, X):
+            return None
+
+    detector = ThreatDetector(model_dir=str(tmp_path), model_server=Untrained())
+    results = detector.detect_threats(EVENTS)
+    assert [r['classification'] for r in results] == ["ransomware", "malware", "trojan", "phishing", "trojan", None]
+    assert results[0]['classifier'] == 'rules'
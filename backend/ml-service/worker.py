@@ -0,0 +1,42 @@
+"""
+ML Service job worker
+
+    python worker.py
+
+Runs queued learning/training jobs (requests sent with "async": true) in a
+process of its own, so long jobs do not compete with the web service for
+CPU and memory. Jobs are shared through Redis; run as many workers as
+needed. JOB_WORKERS sets the jobs each worker runs at a time (default 2).
+
+Like server.py, this module does nothing at import: spawned worker
+processes (parallel model training) re-run it without starting anything.
+"""
+
+import logging
+import os
+import signal
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    from app import job_queue
+
+    if job_queue.backend != 'redis':
+        # Jobs in the in-memory store are only visible to the process that queued them
+        raise SystemExit('Job workers need Redis; without it the web service runs jobs itself')
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    job_queue.start_workers(int(os.getenv('JOB_WORKERS', 2)))
+    try:
+        stop.wait()
+    except KeyboardInterrupt:
+        pass
+    logger.info('Stopping job workers')
+    job_queue.stop_workers()
+
+
+if __name__ == '__main__':
+    main()